@@ -1,13 +1,26 @@
+import os
+
 import streamlit as st
-import pandas as pd
-import plotly.express as px
+
+from enem.instrumentacao import Execucao, Perfilador, execucao_do_fragmento, gravar_jsonl, painel
+from enem.mapas import presence_cols
+from enem.resultados import cache_resultados, chave_resultado, normalizar_filtros
 
 # -------------------- Config & Theming --------------------
 st.set_page_config(layout="wide", page_title="Dashboard de Insights do ENEM", page_icon="📊")
 
-# Global Plotly style
-PLOTLY_TEMPLATE = "plotly_white"
-COLOR_SEQUENCE = px.colors.sequential.Blues + px.colors.sequential.Greens
+# -------------------- Instrumentação --------------------
+# Tempo e memória de cada seção desta execução. O painel de diagnóstico aparece
+# com ?debug=1 na URL ou ENEM_DEBUG=1; com ENEM_LOG_DESEMPENHO (ou no modo de
+# diagnóstico) cada execução é acrescentada como uma linha JSON.
+execucao = Execucao('página')
+DEBUG = os.environ.get('ENEM_DEBUG') == '1' or st.query_params.get('debug') == '1'
+LOG_DESEMPENHO = os.environ.get('ENEM_LOG_DESEMPENHO') or ('.enem_cache/desempenho.jsonl' if DEBUG else None)
+perfilador = None
+if DEBUG and st.session_state.pop('perfilar_execucao', False):
+    perfilador = Perfilador('.enem_cache/perfis')
+    perfilador.iniciar()
+execucao.secao('Config & Theming')
 
 # Subtle CSS polish
 st.markdown(
@@ -24,542 +37,452 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
-# -------------------- Data --------------------
-df = pd.read_csv('dados_sample.csv', sep=';', encoding='ISO-8859-1')
-
-# Criar coluna de nota média a partir das notas das provas
-component_scores = ['NU_NOTA_CN', 'NU_NOTA_CH', 'NU_NOTA_LC', 'NU_NOTA_MT', 'NU_NOTA_REDACAO']
-# Garantir que as colunas existem antes de calcular
-existing_scores = [col for col in component_scores if col in df.columns]
-if existing_scores:
-    for col in existing_scores:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-    df['NOTA_MEDIA'] = df[existing_scores].mean(axis=1, skipna=True)
-
-# Mapear sexo para rótulos legíveis
-mapa_sexo = {'M': 'Masculino', 'F': 'Feminino'}
-if 'TP_SEXO' in df.columns:
-    df['SEXO'] = df['TP_SEXO'].map(mapa_sexo).fillna(df['TP_SEXO'])
+# -------------------- Seções --------------------
+# Cada seção é uma função com as entradas explícitas; a página executa só a aba
+# aberta, e o explorador é um fragmento (seus filtros não refazem as outras seções).
 
-# -------------------- Cabeçalho --------------------
-st.title("Decodificando o ENEM: Dos Dados Brutos às Estratégias Pedagógicas")
-st.markdown(
-    """
-    <div class="big-subtitle">Esta plataforma interativa, resultado do Projeto Integrador em Computação IV,
-    permite a exploração dos microdados do ENEM para extrair insights valiosos sobre o desempenho e o perfil dos estudantes.</div>
-    """,
-    unsafe_allow_html=True,
-)
+def concluir(execucao, **extras):
+    """Fecha a medição da execução (página ou fragmento) e grava o registro."""
+    execucao.encerrar()
+    if LOG_DESEMPENHO:
+        gravar_jsonl(LOG_DESEMPENHO, execucao.documento(**extras))
+    if DEBUG and execucao.escopo != 'página':
+        st.caption(f"⏱️ {execucao.escopo}: {execucao.total:.3f}s")
 
-# Métricas principais
-col1, col2 = st.columns(2, gap="large")
-with col1:
-    st.metric("Candidatos Analisados", "3.300.000+", help="Total aproximado de participantes considerados")
-with col2:
-    st.metric("Objetivo do Projeto", "Democratizar o acesso aos dados")
 
-st.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
+def em_cache(execucao, filtros, funcao, *args):
+    """`funcao(*args)` pelo cache de resultados compartilhado do processo.
 
-# -------------------- Filtros (Sidebar) --------------------
-st.sidebar.header("Filtros Globais")
-uf_selecionada = st.sidebar.selectbox(
-    "Estado (UF)", options=['Todos'] + sorted(df['SG_UF_PROVA'].dropna().unique().tolist())
-)
+    A chave é a versão dos dados, o nome qualificado da função e os filtros
+    normalizados; `args` não entram nela, então tudo o que muda o resultado
+    (a UF do título, a normalização...) precisa estar em `filtros`. Só as
+    faltas no cache são calculadas (e aparecem como etapas na instrumentação). O aquecimento em segundo plano
+    (`enem.aquecimento`) repete estas chamadas para preencher as mesmas chaves.
+    """
+    chave = chave_resultado(VERSAO_DADOS, funcao, filtros)
+    return cache_resultados.obter(chave, lambda: execucao.medir(funcao, *args))
 
-# Mapeamento dos códigos de cor/raça para nomes legíveis (usado mais abaixo)
-mapa_cor_raca = {
-    0: 'Não declarado',
-    1: 'Branca',
-    2: 'Preta',
-    3: 'Parda',
-    4: 'Amarela',
-    5: 'Indígena',
-    6: 'Não dispõe'
-}
 
-if uf_selecionada != 'Todos':
-    df_filtrado = df[df['SG_UF_PROVA'] == uf_selecionada].copy()
-else:
-    df_filtrado = df.copy()
+def registrar_acesso(tipo, filtros):
+    """Conta o recorte no registro de acessos (prioridade do aquecimento) quando ele muda na sessão."""
+    marca = (ano_selecionado, normalizar_filtros(filtros))
+    if st.session_state.get(f'ultimo_acesso_{tipo}') != marca:
+        st.session_state[f'ultimo_acesso_{tipo}'] = marca
+        registro_acessos.registrar(ano_selecionado, tipo, filtros)
 
-# -------------------- 1. O Problema --------------------
-st.header("O Tesouro Escondido nos Dados do ENEM")
-st.markdown(
-    "> <b>Problema:</b> Professores e gestores não possuem ferramentas acessíveis para explorar a imensa base de dados do ENEM, dificultando a extração de informações para embasar estratégias pedagógicas.",
-    unsafe_allow_html=True,
-)
 
-st.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
+# Depois da primeira renderização, calcula as abas de cada UF e os recortes do
+# explorador em segundo plano (ENEM_AQUECIMENTO=0 desliga; requer o cache de resultados)
+AQUECIMENTO = os.environ.get('ENEM_AQUECIMENTO', '1') != '0' and cache_resultados.orcamento > 0
 
-# -------------------- 2. Quem são os Candidatos? --------------------
-st.header("Um Retrato do Futuro do Brasil")
 
-col1, col2 = st.columns(2, gap="large")
+# -------------------- Renderização progressiva --------------------
+# Com a amostra estratificada (dados grandes), uma combinação de filtros nova é
+# mostrada primeiro como estimativa e refeita quando o valor exato fica pronto.
+# ENEM_PROGRESSIVO=0 (ou o cache de resultados desligado) calcula tudo na hora.
+PROGRESSIVO = os.environ.get('ENEM_PROGRESSIVO', '1') != '0' and cache_resultados.orcamento > 0
+# Segundos entre as verificações dos cálculos em segundo plano
+INTERVALO_REFINO = 1.0
 
-# Gráfico de Gênero - Barras
-st.info("📊 **Distribuição por Gênero**: Este gráfico mostra a distribuição dos candidatos por gênero. Permite identificar se há equilíbrio entre candidatos masculinos e femininos na região selecionada.")
-df_sexo = df_filtrado['SEXO'].value_counts(dropna=False).reset_index()
-df_sexo.columns = ['SEXO', 'Quantidade']
-fig_sexo = px.bar(
-    df_sexo,
-    x='SEXO',
-    y='Quantidade',
-    text='Quantidade',
-    title=f'Distribuição por Gênero em {uf_selecionada}',
-    color='SEXO',
-    template=PLOTLY_TEMPLATE,
-    color_discrete_sequence=px.colors.qualitative.Set2,
-)
-fig_sexo.update_traces(textposition='outside')
-fig_sexo.update_layout(showlegend=False, xaxis_title='', yaxis_title='Quantidade')
-col1.plotly_chart(fig_sexo, use_container_width=True)
-
-# Gráfico de Raça/Cor - Barras
-if 'TP_COR_RACA' in df_filtrado.columns:
-    st.info("🌍 **Distribuição por Cor/Raça**: Este gráfico mostra a distribuição dos candidatos por cor/raça. É importante para identificar a diversidade étnica dos participantes e possíveis desigualdades de acesso ao ensino superior.")
-    df_filtrado['COR/RACA'] = df_filtrado['TP_COR_RACA'].map(mapa_cor_raca)
-    df_raca = df_filtrado['COR/RACA'].value_counts(dropna=False).reset_index()
-    df_raca.columns = ['COR/RACA', 'Quantidade']
-    fig_raca = px.bar(
-        df_raca,
-        x='COR/RACA',
-        y='Quantidade',
-        text='Quantidade',
-        title=f'Distribuição por Cor/Raça em {uf_selecionada}',
-        color='COR/RACA',
-        color_discrete_sequence=px.colors.qualitative.Set3,
-        template=PLOTLY_TEMPLATE,
+
+def progressivo(execucao, filtros, funcao, consultas, *args):
+    """`funcao(consultas, *args)` exata ou, enquanto ela é calculada, estimada pela amostra.
+
+    Se o resultado exato ainda não está no cache, ele é agendado em segundo
+    plano e a mesma função responde sobre a amostra (`enem.amostra`);
+    `aguardar_exatos` refaz a página quando o cálculo termina. Retorna
+    (resultado, aproximado); o que for montado a partir de um resultado
+    aproximado usa `filtros_da_fonte` na chave do cache.
+    """
+    chave = chave_resultado(VERSAO_DADOS, funcao, filtros)
+    agendadas = st.session_state.setdefault('exatos_agendados', set())
+    if amostra is None or chave in cache_resultados or (chave in agendadas and not cache_resultados.pendente(chave)):
+        # Já agendado nesta sessão e terminado sem ficar no cache (falhou, não
+        # coube no orçamento ou foi despejado): calcula na hora
+        return em_cache(execucao, filtros, funcao, consultas, *args), False
+    futuro = cache_resultados.em_segundo_plano(chave, lambda: funcao(consultas, *args))
+    agendadas.add(chave)
+    if futuro.done():
+        if futuro.exception() is not None:
+            # A falha pode ter sido passageira; se não for, o erro aparece aqui
+            return em_cache(execucao, filtros, funcao, consultas, *args), False
+        return futuro.result(), False
+    execucao.aproximados.append(chave)
+    return em_cache(execucao, filtros_da_fonte(filtros, True), funcao, amostra, *args), True
+
+
+def filtros_da_fonte(filtros, aproximado):
+    """Filtros da chave do cache para resultados montados sobre uma estimativa (ou não)."""
+    return {**filtros, 'AMOSTRA': True} if aproximado else filtros
+
+
+def aviso_aproximado(container):
+    container.caption(
+        f"≈ **Estimativa** pela amostra estratificada por UF × renda ({amostra.n_amostra:,} de "
+        f"{amostra.total:,} candidatos); as barras de erro são intervalos de 95%. "
+        "O valor exato substitui a estimativa assim que termina de ser calculado."
     )
-    fig_raca.update_traces(textposition='outside')
-    fig_raca.update_layout(showlegend=False, xaxis_title='', yaxis_title='Quantidade')
-    col2.plotly_chart(fig_raca, use_container_width=True)
 
-st.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
 
-# -------------------- 3. A Desigualdade nos Números --------------------
-st.header("Onde o Desempenho Encontra a Desigualdade")
-
-ordem_renda = [
-    'Nenhuma Renda', 'Até R$ 1.100,00', 'De R$ 1.100,01 até R$ 1.650,00',
-    'De R$ 1.650,01 até R$ 2.200,00', 'De R$ 2.200,01 até R$ 2.750,00',
-    'De R$ 2.750,01 até R$ 3.300,00', 'De R$ 3.300,01 até R$ 3.850,00',
-    'De R$ 3.850,01 até R$ 4.400,00', 'De R$ 4.400,01 até R$ 5.500,00',
-    'De R$ 5.500,01 até R$ 6.600,00', 'De R$ 6.600,01 até R$ 7.700,00',
-    'De R$ 7.700,01 até R$ 8.800,00', 'De R$ 8.800,01 até R$ 9.900,00',
-    'De R$ 9.900,01 até R$ 11.000,00', 'De R$ 11.000,01 até R$ 13.200,00',
-    'De R$ 13.200,01 até R$ 16.500,00', 'De R$ 16.500,01 até R$ 22.000,00',
-    'Acima de R$ 22.000,00'
-]
-
-# Ordenar as categorias de renda para o gráfico
-map_renda = {
-    'A': 'Nenhuma Renda',
-    'B': 'Até R$ 1.100,00',
-    'C': 'De R$ 1.100,01 até R$ 1.650,00',
-    'D': 'De R$ 1.650,01 até R$ 2.200,00',
-    'E': 'De R$ 2.200,01 até R$ 2.750,00',
-    'F': 'De R$ 2.750,01 até R$ 3.300,00',
-    'G': 'De R$ 3.300,01 até R$ 3.850,00',
-    'H': 'De R$ 3.850,01 até R$ 4.400,00',
-    'I': 'De R$ 4.400,01 até R$ 5.500,00',
-    'J': 'De R$ 5.500,01 até R$ 6.600,00',
-    'K': 'De R$ 6.600,01 até R$ 7.700,00',
-    'L': 'De R$ 7.700,01 até R$ 8.800,00',
-    'M': 'De R$ 8.800,01 até R$ 9.900,00',
-    'N': 'De R$ 9.900,01 até R$ 11.000,00',
-    'O': 'De R$ 11.000,01 até R$ 13.200,00',
-    'P': 'De R$ 13.200,01 até R$ 16.500,00',
-    'Q': 'De R$ 16.500,01 até R$ 22.000,00',
-    'R': 'Acima de R$ 22.000,00'
-}
+def grafico(execucao, container, fig, aproximado=False):
+    """Envia a figura; estimativas saem com o título marcado e o aviso acima."""
+    if aproximado:
+        aviso_aproximado(container)
+        fig = secoes.figura_aproximada(fig)
+    execucao.plotly_chart(container, fig, use_container_width=True)
 
 
-if 'Q006' in df.columns:
-    # Criar coluna global de renda categorizada sem sobrescrever Q006
-    df['RENDA'] = df['Q006'].map(map_renda).fillna(df['Q006'])
-    df['RENDA'] = pd.Categorical(df['RENDA'], categories=ordem_renda, ordered=True)
+@st.fragment(run_every=INTERVALO_REFINO)
+def aguardar_exatos(chaves, execucao_id):
+    """Refaz a página quando terminam os cálculos exatos de `chaves`.
 
-    # Aplicar o mesmo recorte por UF
-    df_filtrado['RENDA'] = df_filtrado['Q006'].map(map_renda).fillna(df_filtrado['Q006'])
-    df_filtrado['RENDA'] = pd.Categorical(df_filtrado['RENDA'], categories=ordem_renda, ordered=True)
+    Na chamada da execução `execucao_id` (página ou explorador) só mostra o
+    aviso: quem refaz a página são as execuções periódicas do fragmento, com
+    a execução que o chamou já encerrada.
+    """
+    periodica = st.session_state.get('aguardar_exatos') == execucao_id
+    st.session_state['aguardar_exatos'] = execucao_id
+    if periodica and not any(cache_resultados.pendente(chave) for chave in chaves):
+        st.rerun()
+    st.caption(f"⏳ Calculando os valores exatos de {len(chaves)} resultado(s) estimado(s)...")
 
-    # Gráfico de linha da mediana da nota média por faixa de renda
-    medianas_renda = df_filtrado.groupby('RENDA', observed=True)['NOTA_MEDIA'].median()
-    df_line = medianas_renda.reset_index()
-    df_line.columns = ['RENDA', 'MEDIANA_NOTA_MEDIA']
-    if df_line.empty:
-        st.warning('Sem dados suficientes para calcular a mediana por faixa de renda neste filtro.')
-    else:
-        st.info("📈 **Mediana da Nota Média por Renda Familiar**: Este gráfico de linha mostra a relação entre renda familiar e desempenho acadêmico. A tendência crescente indica desigualdade educacional, onde estudantes de famílias com maior renda tendem a ter melhor desempenho no ENEM.")
-        fig_renda = px.line(
-            df_line.sort_values('RENDA'),
-            x='RENDA',
-            y='MEDIANA_NOTA_MEDIA',
-            markers=True,
-            title='Mediana da Nota Média por Renda Familiar',
-            labels={'RENDA': 'Faixa de Renda Familiar', 'MEDIANA_NOTA_MEDIA': 'Mediana da Nota Média'},
-            category_orders={'RENDA': ordem_renda},
-            template=PLOTLY_TEMPLATE,
-            color_discrete_sequence=["#2563eb"],
-        )
-        fig_renda.update_layout(xaxis_tickangle=-45)
-        st.plotly_chart(fig_renda, use_container_width=True)
 
-st.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
+def abas_sob_demanda(rotulos, key):
+    """Abas em que só a aberta executa: lista de (container, aberta).
 
-# -------------------- 3.1. Desigualdade Digital --------------------
-st.header("A Desigualdade Digital: O Abismo Tecnológico na Educação")
+    Em versões do Streamlit sem abas com estado, um seletor horizontal faz o
+    mesmo papel.
+    """
+    try:
+        abas = st.tabs(rotulos, key=key, on_change='rerun')
+    except TypeError:
+        escolhida = st.radio("Seção", rotulos, horizontal=True, key=key, label_visibility="collapsed")
+        return [(st.container(), rotulo == escolhida) for rotulo in rotulos]
+    return [(aba, aba.open is not False) for aba in abas]
 
-# Mapeamento das respostas para Q024 (computador) e Q025 (internet)
-mapa_computador = {
-    'A': 'Não',
-    'B': 'Sim, um',
-    'C': 'Sim, dois', 
-    'D': 'Sim, três',
-    'E': 'Sim, quatro ou mais'
-}
 
-mapa_internet = {
-    'A': 'Não',
-    'B': 'Sim'
-}
+def secao_candidatos(consultas, uf_selecionada, filtro_uf, execucao):
+    execucao.secao('2. Quem são os Candidatos?')
+    st.header("Um Retrato do Futuro do Brasil")
 
-# Verificar se as colunas existem
-if 'Q024' in df_filtrado.columns and 'Q025' in df_filtrado.columns:
-    # Criar colunas legíveis
-    df_filtrado['ACESSO_COMPUTADOR'] = df_filtrado['Q024'].map(mapa_computador).fillna(df_filtrado['Q024'])
-    df_filtrado['ACESSO_INTERNET'] = df_filtrado['Q025'].map(mapa_internet).fillna(df_filtrado['Q025'])
-    
     col1, col2 = st.columns(2, gap="large")
+
+    # Gráfico de Gênero - Barras
+    st.info("📊 **Distribuição por Gênero**: Este gráfico mostra a distribuição dos candidatos por gênero. Permite identificar se há equilíbrio entre candidatos masculinos e femininos na região selecionada.")
+    fig_sexo, aproximado = progressivo(execucao, filtro_uf, secoes.figura_genero, consultas, filtro_uf, uf_selecionada)
+    grafico(execucao, col1, fig_sexo, aproximado)
+
+    # Gráfico de Raça/Cor - Barras
+    if 'COR/RACA' in consultas.colunas:
+        st.info("🌍 **Distribuição por Cor/Raça**: Este gráfico mostra a distribuição dos candidatos por cor/raça. É importante para identificar a diversidade étnica dos participantes e possíveis desigualdades de acesso ao ensino superior.")
+        fig_raca, aproximado = progressivo(execucao, filtro_uf, secoes.figura_cor_raca, consultas, filtro_uf, uf_selecionada)
+        grafico(execucao, col2, fig_raca, aproximado)
+
+
+def secao_desigualdade(consultas, cubo, filtro_uf, edicoes, execucao):
+    execucao.secao('3. A Desigualdade nos Números')
+    st.header("Onde o Desempenho Encontra a Desigualdade")
+
+    if 'RENDA' in consultas.colunas:
+        # Gráfico de linha da mediana da nota média por faixa de renda, calculada
+        # pelos histogramas do cubo (sem ordenar as notas de cada grupo)
+        df_line = em_cache(execucao, filtro_uf, secoes.mediana_por_renda, cubo, filtro_uf)
+        if df_line.empty:
+            st.warning('Sem dados suficientes para calcular a mediana por faixa de renda neste filtro.')
+        else:
+            st.info("📈 **Mediana da Nota Média por Renda Familiar**: Este gráfico de linha mostra a relação entre renda familiar e desempenho acadêmico. A tendência crescente indica desigualdade educacional, onde estudantes de famílias com maior renda tendem a ter melhor desempenho no ENEM.")
+            fig_renda = em_cache(execucao, filtro_uf, secoes.figura_renda, df_line)
+            execucao.plotly_chart(st, fig_renda, use_container_width=True)
+
+        if len(edicoes) > 1:
+            st.subheader("Comparação entre Edições")
+            # Cada edição tem as suas faixas em reais; a comparação usa as faixas em salários mínimos
+            filtro_edicoes = {**filtro_uf, 'EDICOES': VERSAO_EDICOES}
+            cubos = {ano: carregar_cubo(e['csv'], e['destino']) for ano, e in edicoes.items()}
+            df_edicoes = em_cache(execucao, filtro_edicoes, secoes.mediana_por_renda_edicoes, cubos, filtro_uf)
+            st.info("📅 **Mediana por Renda em Cada Edição**: Uma linha por ano do ENEM, com as faixas de renda expressas em salários mínimos (os valores em reais mudam a cada edição com o salário mínimo). Permite ver se a distância entre as faixas de renda aumentou ou diminuiu ao longo do tempo.")
+            fig_renda_edicoes = em_cache(execucao, filtro_edicoes, secoes.figura_renda_edicoes, df_edicoes)
+            execucao.plotly_chart(st, fig_renda_edicoes, use_container_width=True)
+
+
+def secao_digital(consultas, uf_selecionada, cubo, estatisticas, filtro_uf, edicoes, execucao):
+    execucao.secao('3.1. Desigualdade Digital')
+    st.header("A Desigualdade Digital: O Abismo Tecnológico na Educação")
+
+    # Verificar se as colunas existem
+    if 'ACESSO_COMPUTADOR' in consultas.colunas and 'ACESSO_INTERNET' in consultas.colunas:
+        col1, col2 = st.columns(2, gap="large")
     
-    # Gráfico de acesso a computadores
-    with col1:
-        st.info("💻 **Acesso a Computadores**: Este gráfico mostra quantos candidatos têm acesso a computadores em casa. O acesso à tecnologia é fundamental para o aprendizado e pode impactar significativamente o desempenho acadêmico.")
-        df_computador = df_filtrado['ACESSO_COMPUTADOR'].value_counts(dropna=False).reset_index()
-        df_computador.columns = ['ACESSO_COMPUTADOR', 'Quantidade']
-        
-        # Ordenar por quantidade de computadores
-        ordem_computador = ['Não', 'Sim, um', 'Sim, dois', 'Sim, três', 'Sim, quatro ou mais']
-        df_computador['ACESSO_COMPUTADOR'] = pd.Categorical(df_computador['ACESSO_COMPUTADOR'], 
-                                                           categories=ordem_computador, ordered=True)
-        df_computador = df_computador.sort_values('ACESSO_COMPUTADOR')
-        
-        fig_computador = px.bar(
-            df_computador,
-            x='ACESSO_COMPUTADOR',
-            y='Quantidade',
-            text='Quantidade',
-            title=f'Acesso a Computadores em {uf_selecionada}',
-            color='ACESSO_COMPUTADOR',
-            color_discrete_sequence=px.colors.qualitative.Set3,
-            template=PLOTLY_TEMPLATE,
-        )
-        fig_computador.update_traces(textposition='outside')
-        fig_computador.update_layout(showlegend=False, xaxis_title='', yaxis_title='Quantidade')
-        fig_computador.update_xaxes(tickangle=-45)
-        st.plotly_chart(fig_computador, use_container_width=True)
+        # Gráfico de acesso a computadores
+        with col1:
+            st.info("💻 **Acesso a Computadores**: Este gráfico mostra quantos candidatos têm acesso a computadores em casa. O acesso à tecnologia é fundamental para o aprendizado e pode impactar significativamente o desempenho acadêmico.")
+            fig_computador, aproximado = progressivo(execucao, filtro_uf, secoes.figura_computador, consultas, filtro_uf, uf_selecionada)
+            grafico(execucao, st, fig_computador, aproximado)
     
-    # Gráfico de acesso à internet
-    with col2:
-        st.info("🌐 **Acesso à Internet**: Este gráfico de pizza mostra a proporção de candidatos que têm acesso à internet em casa. A conectividade é essencial para pesquisa, estudos online e acesso a recursos educacionais digitais.")
-        df_internet = df_filtrado['ACESSO_INTERNET'].value_counts(dropna=False).reset_index()
-        df_internet.columns = ['ACESSO_INTERNET', 'Quantidade']
-        
-        fig_internet = px.pie(
-            df_internet,
-            values='Quantidade',
-            names='ACESSO_INTERNET',
-            title=f'Acesso à Internet em {uf_selecionada}',
-            color_discrete_sequence=px.colors.qualitative.Set2,
-            template=PLOTLY_TEMPLATE,
-        )
-        fig_internet.update_traces(textposition='inside', textinfo='percent+label')
-        st.plotly_chart(fig_internet, use_container_width=True)
+        # Gráfico de acesso à internet
+        with col2:
+            st.info("🌐 **Acesso à Internet**: Este gráfico de pizza mostra a proporção de candidatos que têm acesso à internet em casa. A conectividade é essencial para pesquisa, estudos online e acesso a recursos educacionais digitais.")
+            fig_internet, aproximado = progressivo(execucao, filtro_uf, secoes.figura_internet, consultas, filtro_uf, uf_selecionada)
+            grafico(execucao, st, fig_internet, aproximado)
     
-    # Análise da relação entre acesso digital e renda
-    st.subheader("Acesso Digital vs. Renda Familiar")
+        # Análise da relação entre acesso digital e renda
+        st.subheader("Acesso Digital vs. Renda Familiar")
     
-    if 'RENDA' in df_filtrado.columns:
-        # Criar tabela de contingência para computadores
-        tabela_computador_renda = pd.crosstab(
-            df_filtrado['RENDA'], 
-            df_filtrado['ACESSO_COMPUTADOR'], 
-            normalize='index'
-        ) * 100
+        if 'RENDA' in consultas.colunas:
+            # Tabela de contingência renda x computador ("Não" e "Sim, um")
+            tabela_simples, aproximado = progressivo(execucao, filtro_uf, secoes.tabela_computador_renda, consultas, filtro_uf)
         
-        # Filtrar apenas "Não" e "Sim, um" para simplificar a visualização
-        colunas_simples = ['Não', 'Sim, um']
-        colunas_disponiveis = [col for col in colunas_simples if col in tabela_computador_renda.columns]
-        
-        if colunas_disponiveis:
-            st.info("🔥 **Mapa de Calor - Acesso a Computadores por Renda**: Este mapa de calor mostra a relação entre renda familiar e acesso a computadores. Cores mais escuras indicam maior percentual de acesso, revelando como a desigualdade econômica se reflete no acesso à tecnologia.")
-            tabela_simples = tabela_computador_renda[colunas_disponiveis]
-            
-            fig_heatmap = px.imshow(
-                tabela_simples.T,
-                title='Percentual de Acesso a Computadores por Faixa de Renda',
-                labels=dict(x="Faixa de Renda", y="Acesso a Computadores", color="Percentual (%)"),
-                color_continuous_scale='Blues',
-                template=PLOTLY_TEMPLATE,
-                aspect="auto"
-            )
-            fig_heatmap.update_layout(xaxis_tickangle=-45)
-            st.plotly_chart(fig_heatmap, use_container_width=True)
+            if tabela_simples is not None:
+                st.info("🔥 **Mapa de Calor - Acesso a Computadores por Renda**: Este mapa de calor mostra a relação entre renda familiar e acesso a computadores. Cores mais escuras indicam maior percentual de acesso, revelando como a desigualdade econômica se reflete no acesso à tecnologia.")
+                fig_heatmap = em_cache(execucao, filtros_da_fonte(filtro_uf, aproximado), secoes.figura_computador_renda, tabela_simples)
+                grafico(execucao, st, fig_heatmap, aproximado)
     
-    # Análise do impacto do acesso digital no desempenho
-    st.subheader("Impacto do Acesso Digital no Desempenho Acadêmico")
+        # Análise do impacto do acesso digital no desempenho
+        st.subheader("Impacto do Acesso Digital no Desempenho Acadêmico")
     
-    # Box plot: Nota média por acesso à internet
-    if 'NOTA_MEDIA' in df_filtrado.columns:
-        st.info("📊 **Desempenho Acadêmico por Acesso à Internet**: Este gráfico de caixa (box plot) compara o desempenho acadêmico entre estudantes com e sem acesso à internet. Mostra a distribuição das notas, incluindo mediana, quartis e valores extremos, evidenciando o impacto da conectividade no aprendizado.")
-        fig_digital_performance = px.box(
-            df_filtrado,
-            x='ACESSO_INTERNET',
-            y='NOTA_MEDIA',
-            title='Desempenho Acadêmico por Acesso à Internet',
-            labels={'ACESSO_INTERNET': 'Acesso à Internet', 'NOTA_MEDIA': 'Nota Média'},
-            color='ACESSO_INTERNET',
-            template=PLOTLY_TEMPLATE,
-            color_discrete_sequence=px.colors.qualitative.Set2,
-        )
-        st.plotly_chart(fig_digital_performance, use_container_width=True)
+        # Box plot: Nota média por acesso à internet
+        if 'NOTA_MEDIA' in consultas.colunas:
+            st.info("📊 **Desempenho Acadêmico por Acesso à Internet**: Este gráfico de caixa (box plot) compara o desempenho acadêmico entre estudantes com e sem acesso à internet. Mostra a distribuição das notas, incluindo mediana, quartis e valores extremos, evidenciando o impacto da conectividade no aprendizado.")
+            fig_digital_performance = em_cache(execucao, filtro_uf, secoes.figura_desempenho_internet, cubo, filtro_uf)
+            execucao.plotly_chart(st, fig_digital_performance, use_container_width=True)
     
-    # Estatísticas resumidas
-    col1, col2, col3 = st.columns(3)
+        # Estatísticas resumidas
+        # Contagens e médias dos acumuladores gravados na conversão
+        metricas = em_cache(execucao, filtro_uf, secoes.metricas_digitais, estatisticas, filtro_uf)
+        col1, col2, col3 = st.columns(3)
     
-    with col1:
-        sem_internet = (df_filtrado['ACESSO_INTERNET'] == 'Não').sum()
-        total = len(df_filtrado)
-        perc_sem_internet = (sem_internet / total * 100) if total > 0 else 0
-        st.metric("Sem Acesso à Internet", f"{perc_sem_internet:.1f}%")
+        with col1:
+            st.metric("Sem Acesso à Internet", f"{metricas['perc_sem_internet']:.1f}%")
     
-    with col2:
-        sem_computador = (df_filtrado['ACESSO_COMPUTADOR'] == 'Não').sum()
-        perc_sem_computador = (sem_computador / total * 100) if total > 0 else 0
-        st.metric("Sem Computador", f"{perc_sem_computador:.1f}%")
+        with col2:
+            st.metric("Sem Computador", f"{metricas['perc_sem_computador']:.1f}%")
     
-    with col3:
-        if 'NOTA_MEDIA' in df_filtrado.columns:
-            nota_com_internet = df_filtrado[df_filtrado['ACESSO_INTERNET'] == 'Sim']['NOTA_MEDIA'].mean()
-            nota_sem_internet = df_filtrado[df_filtrado['ACESSO_INTERNET'] == 'Não']['NOTA_MEDIA'].mean()
-            diferenca = nota_com_internet - nota_sem_internet
-            st.metric("Diferença de Nota (Com vs Sem Internet)", f"{diferenca:.1f}")
+        with col3:
+            if metricas['diferenca_internet'] is not None:
+                st.metric("Diferença de Nota (Com vs Sem Internet)", f"{metricas['diferenca_internet']:.1f}")
+
+        if len(edicoes) > 1:
+            st.subheader("Comparação entre Edições")
+            filtro_edicoes = {**filtro_uf, 'EDICOES': VERSAO_EDICOES}
+            estatisticas_por_ano = {ano: carregar_estatisticas(e['csv'], e['destino']) for ano, e in edicoes.items()}
+            df_digital = em_cache(execucao, filtro_edicoes, secoes.metricas_digitais_edicoes, estatisticas_por_ano, filtro_uf)
+            st.info("📅 **Desigualdade Digital em Cada Edição**: Percentual de candidatos sem internet e sem computador em cada ano do ENEM, para acompanhar a evolução do acesso digital.")
+            fig_digital_edicoes = em_cache(execucao, filtro_edicoes, secoes.figura_digital_edicoes, df_digital)
+            execucao.plotly_chart(st, fig_digital_edicoes, use_container_width=True)
+            tabela_digital = df_digital.rename(columns={
+                'ANO': 'Edição',
+                'perc_sem_internet': 'Sem Internet (%)',
+                'perc_sem_computador': 'Sem Computador (%)',
+                'diferenca_internet': 'Diferença de Nota (Com vs Sem Internet)',
+            }).set_index('Edição')
+            st.dataframe(tabela_digital.round(1), use_container_width=True)
 
-else:
-    st.warning("Dados de acesso digital (Q024 e Q025) não disponíveis no dataset atual.")
+    else:
+        st.warning("Dados de acesso digital (Q024 e Q025) não disponíveis no dataset atual.")
 
-st.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
 
-# -------------------- 4. Desempenho Acadêmico --------------------
-st.header("Análise das Disciplínas: Forças e Fraquezas")
-if 'NU_NOTA_MT' in df_filtrado.columns and 'SEXO' in df_filtrado.columns:
-    st.info("📚 **Desempenho em Matemática por Gênero**: Este gráfico de caixa compara o desempenho em Matemática entre gêneros. Mostra a distribuição das notas, mediana e quartis, permitindo identificar se há diferenças significativas no desempenho entre candidatos masculinos e femininos nesta disciplina.")
-    fig_mt_sexo = px.box(
-        df_filtrado,
-        x='SEXO', y='NU_NOTA_MT',
-        title='Desempenho em Matemática por Gênero',
-        labels={'SEXO': 'Gênero', 'NU_NOTA_MT': 'Nota de Matemática'},
-        color='SEXO',
-        template=PLOTLY_TEMPLATE,
-        color_discrete_sequence=px.colors.qualitative.Set2,
-    )
-    st.plotly_chart(fig_mt_sexo, use_container_width=True)
+def secao_disciplinas(consultas, filtro_uf, execucao):
+    execucao.secao('4. Desempenho Acadêmico')
+    st.header("Análise das Disciplínas: Forças e Fraquezas")
+    if 'NU_NOTA_MT' in consultas.colunas and 'SEXO' in consultas.colunas:
+        st.info("📚 **Desempenho em Matemática por Gênero**: Este gráfico de caixa compara o desempenho em Matemática entre gêneros. Mostra a distribuição das notas, mediana e quartis, permitindo identificar se há diferenças significativas no desempenho entre candidatos masculinos e femininos nesta disciplina.")
+        fig_mt_sexo, aproximado = progressivo(execucao, filtro_uf, secoes.figura_matematica_genero, consultas, filtro_uf)
+        grafico(execucao, st, fig_mt_sexo, aproximado)
 
-st.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
 
-# -------------------- 5. A Solução (Exploração) --------------------
-st.header("Frequência: Faltantes por Área")
+def secao_faltantes(consultas, uf_selecionada, filtro_uf, execucao):
+    execucao.secao('5. Faltantes por Área')
+    st.header("Frequência: Faltantes por Área")
 
-# Mapeia colunas de presença do ENEM para nomes legíveis das áreas
-presence_cols = {
-    'TP_PRESENCA_CN': 'Ciências da Natureza',
-    'TP_PRESENCA_CH': 'Ciências Humanas',
-    'TP_PRESENCA_LC': 'Linguagens e Códigos',
-    'TP_PRESENCA_MT': 'Matemática',
-}
+    df_faltas, aproximado = progressivo(execucao, filtro_uf, secoes.faltantes_por_area, consultas, filtro_uf)
 
-available_presence = [(col, label) for col, label in presence_cols.items() if col in df_filtrado.columns]
-
-if not available_presence:
-    st.info("Colunas de presença por área não foram encontradas no conjunto atual.")
-else:
-    stats_faltas = []
-    for col, label in available_presence:
-        serie = pd.to_numeric(df_filtrado[col], errors='coerce')
-        total_validos = serie.notna().sum()
-        num_faltantes = (serie == 0).sum()
-        perc_faltantes = (num_faltantes / total_validos * 100) if total_validos > 0 else 0
-        stats_faltas.append({
-            'Área': label,
-            'Faltantes': int(num_faltantes),
-            'Percentual': perc_faltantes,
-        })
-
-    df_faltas = pd.DataFrame(stats_faltas).sort_values('Faltantes', ascending=False)
-
-    c1, c2 = st.columns([2, 1], gap="large")
-    with c1:
-        st.info("📉 **Alunos Faltantes por Área**: Este gráfico mostra quantos candidatos faltaram em cada área de conhecimento do ENEM. A análise de faltas é importante para identificar padrões de abandono e áreas onde os estudantes podem ter mais dificuldades ou desinteresse.")
-        fig_faltas = px.bar(
-            df_faltas,
-            x='Área',
-            y='Faltantes',
-            text='Faltantes',
-            title=f'Alunos faltantes por área em {uf_selecionada}',
-            template=PLOTLY_TEMPLATE,
-            color='Área',
-            color_discrete_sequence=px.colors.qualitative.Pastel
+    if df_faltas is None:
+        st.info("Colunas de presença por área não foram encontradas no conjunto atual.")
+    else:
+        c1, c2 = st.columns([2, 1], gap="large")
+        with c1:
+            st.info("📉 **Alunos Faltantes por Área**: Este gráfico mostra quantos candidatos faltaram em cada área de conhecimento do ENEM. A análise de faltas é importante para identificar padrões de abandono e áreas onde os estudantes podem ter mais dificuldades ou desinteresse.")
+            fig_faltas = em_cache(execucao, filtros_da_fonte(filtro_uf, aproximado), secoes.figura_faltantes, df_faltas, uf_selecionada)
+            grafico(execucao, st, fig_faltas, aproximado)
+
+        with c2:
+            df_display = df_faltas.copy()
+            if aproximado:
+                # Percentual estimado com a margem do intervalo de 95%
+                df_display['Percentual'] = [
+                    f"≈ {v:.1f}% ± {m:.1f}" for v, m in zip(df_display['Percentual'], df_display.pop('Margem (%)'))
+                ]
+            else:
+                df_display['Percentual'] = df_display['Percentual'].map(lambda v: f"{v:.1f}%")
+            st.dataframe(df_display, use_container_width=True)
+
+
+@st.fragment
+def secao_cruzamentos(consultas, filtro_uf, execucao):
+    """Cruzamento livre de duas respostas do questionário; suas escolhas reexecutam apenas este fragmento."""
+    execucao, propria = execucao_do_fragmento(execucao, 'Cruzamentos')
+    execucao.secao('6. Cruzamentos')
+    st.header("Cruze Duas Variáveis")
+    st.markdown("Escolha duas respostas do questionário socioeconômico para ver como elas se combinam no recorte da barra lateral.")
+
+    dimensoes = [dim for dim in secoes.DIMENSOES if dim in consultas.colunas]
+    if len(dimensoes) < 2:
+        st.info("O conjunto atual não tem duas variáveis do questionário para cruzar.")
+    else:
+        col1, col2, col3 = st.columns(3, gap="large")
+        with col1:
+            linhas = st.selectbox(
+                "Linhas",
+                options=dimensoes,
+                index=dimensoes.index('RENDA') if 'RENDA' in dimensoes else 0,
+                format_func=secoes.DIMENSOES.get,
+                key="cruzamento_linhas",
+            )
+        with col2:
+            opcoes_colunas = [dim for dim in dimensoes if dim != linhas]
+            colunas = st.selectbox(
+                "Colunas",
+                options=opcoes_colunas,
+                index=opcoes_colunas.index('ACESSO_COMPUTADOR') if 'ACESSO_COMPUTADOR' in opcoes_colunas else 0,
+                format_func=secoes.DIMENSOES.get,
+                key="cruzamento_colunas",
+            )
+        with col3:
+            normalizacao = st.radio(
+                "Valores",
+                options=list(secoes.NORMALIZACOES),
+                index=1,
+                format_func=secoes.NORMALIZACOES.get,
+                key="cruzamento_normalizacao",
+                help="Percentual na linha: cada linha soma 100%. Percentual na coluna: cada coluna soma 100%.",
+            )
+
+        # As contagens servem às quatro normalizações
+        filtros_cruzamento = {**filtro_uf, 'LINHAS': linhas, 'COLUNAS': colunas}
+        contingencia = em_cache(execucao, filtros_cruzamento, secoes.tabela_contingencia, consultas, linhas, colunas, filtro_uf)
+        fig_cruzamento = em_cache(
+            execucao, {**filtros_cruzamento, 'NORMALIZACAO': normalizacao}, secoes.figura_contingencia, contingencia, normalizacao
         )
-        fig_faltas.update_traces(textposition='outside')
-        fig_faltas.update_layout(showlegend=False, yaxis_title='Quantidade', xaxis_title='')
-        st.plotly_chart(fig_faltas, use_container_width=True)
+        if fig_cruzamento is None:
+            st.warning("Nenhum candidato do recorte respondeu às duas perguntas.")
+        else:
+            st.caption(f"{contingencia.n:,} candidatos com as duas respostas".replace(',', '.'))
+            execucao.plotly_chart(st, fig_cruzamento, use_container_width=True)
 
-    with c2:
-        df_display = df_faltas.copy()
-        df_display['Percentual'] = df_display['Percentual'].map(lambda v: f"{v:.1f}%")
-        st.dataframe(df_display, use_container_width=True)
+    if propria:
+        concluir(execucao, linhas=linhas if len(dimensoes) >= 2 else None)
 
-st.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
 
-# -------------------- 5. A Solução (Exploração) --------------------
-st.header("Faça sua Própria Análise")
-st.markdown("Use os filtros abaixo para explorar os dados e encontrar seus próprios insights. Selecione 'Todos' para incluir todas as opções de uma categoria.")
+@st.fragment
+def secao_exploracao(consultas, cubo, opcoes_uf, execucao):
+    """Explorador: seus filtros reexecutam apenas este fragmento."""
+    execucao, propria = execucao_do_fragmento(execucao, 'Faça sua Própria Análise')
+    execucao.secao('5. Faça sua Própria Análise')
+    st.header("Faça sua Própria Análise")
+    st.markdown("Use os filtros abaixo para explorar os dados e encontrar seus próprios insights. Selecione 'Todos' para incluir todas as opções de uma categoria.")
 
-col1, col2, col3 = st.columns(3, gap="large")
+    col1, col2, col3 = st.columns(3, gap="large")
 
-# Preparar opções para os filtros
-opcoes_uf = ['Todos'] + sorted(df['SG_UF_PROVA'].dropna().unique().tolist())
-opcoes_renda = ['Todos'] + ordem_renda
-opcoes_sexo = ['Todos'] + sorted(df['SEXO'].dropna().unique().tolist())
+    # Preparar opções para os filtros (as UFs vêm da página)
+    # Faixas de renda da edição selecionada (os valores mudam com o salário mínimo)
+    opcoes_renda = ['Todos'] + list(cubo.celulas['RENDA'].cat.categories) if 'RENDA' in cubo.celulas else ['Todos']
+    contagem_sexo = em_cache(execucao, {'COLUNA': 'SEXO'}, secoes.contagens, consultas, 'SEXO', {})
+    opcoes_sexo = ['Todos'] + sorted(contagem_sexo['SEXO'].dropna().tolist())
 
-with col1:
-    uf_exp = st.selectbox(
-        "Estado", 
-        options=opcoes_uf, 
-        index=0,
-        key="uf_exp",
-        help="Selecione 'Todos' para incluir todos os estados ou escolha um estado específico"
-    )
-with col2:
-    renda_exp = st.selectbox(
-        "Renda", 
-        options=opcoes_renda, 
-        index=0,
-        key="renda_exp",
-        help="Selecione 'Todos' para incluir todas as faixas de renda ou escolha uma faixa específica"
-    )
-with col3:
-    sexo_exp = st.selectbox(
-        "Gênero", 
-        options=opcoes_sexo, 
-        index=0,
-        key="sexo_exp",
-        help="Selecione 'Todos' para incluir ambos os gêneros ou escolha um gênero específico"
-    )
+    with col1:
+        uf_exp = st.selectbox(
+            "Estado", 
+            options=opcoes_uf, 
+            index=0,
+            key="uf_exp",
+            help="Selecione 'Todos' para incluir todos os estados ou escolha um estado específico"
+        )
+    with col2:
+        renda_exp = st.selectbox(
+            "Renda", 
+            options=opcoes_renda, 
+            index=0,
+            key="renda_exp",
+            help="Selecione 'Todos' para incluir todas as faixas de renda ou escolha uma faixa específica"
+        )
+    with col3:
+        sexo_exp = st.selectbox(
+            "Gênero", 
+            options=opcoes_sexo, 
+            index=0,
+            key="sexo_exp",
+            help="Selecione 'Todos' para incluir ambos os gêneros ou escolha um gênero específico"
+        )
 
-# Aplicar filtros
-col_renda = 'RENDA' if 'RENDA' in df.columns else 'Q006'
-
-# Criar máscara para filtros
-if uf_exp == 'Todos':
-    mask_uf = pd.Series([True] * len(df), index=df.index)
-else:
-    mask_uf = df['SG_UF_PROVA'] == uf_exp
-
-if renda_exp == 'Todos':
-    mask_renda = pd.Series([True] * len(df), index=df.index)
-else:
-    mask_renda = df[col_renda] == renda_exp
-
-if sexo_exp == 'Todos':
-    mask_sexo = pd.Series([True] * len(df), index=df.index)
-else:
-    mask_sexo = df['SEXO'] == sexo_exp
-
-# Aplicar todas as máscaras
-df_exploracao = df[mask_uf & mask_renda & mask_sexo]
-
-if df_exploracao.empty:
-    st.warning("Nenhum dado encontrado para a combinação de filtros selecionada.")
-else:
-    # Mostrar informações sobre o grupo selecionado
-    col_info1, col_info2, col_info3 = st.columns(3)
+    # Aplicar filtros ('Todos' não restringe a dimensão)
+    filtros_exp = {}
+    if uf_exp != 'Todos':
+        filtros_exp['SG_UF_PROVA'] = uf_exp
+    if renda_exp != 'Todos':
+        filtros_exp['RENDA'] = renda_exp
+    if sexo_exp != 'Todos':
+        filtros_exp['SEXO'] = sexo_exp
+    registrar_acesso('explorador', filtros_exp)
+
+    # Métricas, histograma e presenças vêm do cubo pré-agregado (soma de células)
+    resumo_exp = em_cache(execucao, filtros_exp, cubo.agregar, filtros_exp)
+
+    if resumo_exp['n'] == 0:
+        st.warning("Nenhum dado encontrado para a combinação de filtros selecionada.")
+    else:
+        # Mostrar informações sobre o grupo selecionado
+        col_info1, col_info2, col_info3 = st.columns(3)
     
-    with col_info1:
-        st.metric("Registros Selecionados", f"{len(df_exploracao):,}")
+        with col_info1:
+            st.metric("Registros Selecionados", f"{resumo_exp['n']:,}")
     
-    with col_info2:
-        nota_media_filtrada = df_exploracao['NOTA_MEDIA'].mean()
-        st.metric("Nota Média", f"{nota_media_filtrada:.2f}")
+        with col_info2:
+            st.metric("Nota Média", f"{resumo_exp['media']:.2f}")
     
-    with col_info3:
-        if 'NOTA_MEDIA' in df_exploracao.columns:
-            nota_mediana = df_exploracao['NOTA_MEDIA'].median()
-            st.metric("Nota Mediana", f"{nota_mediana:.2f}")
+        with col_info3:
+            st.metric("Nota Mediana", f"{resumo_exp['mediana']:.2f}")
     
-    # Mostrar resumo dos filtros aplicados
-    st.markdown("**Filtros Aplicados:**")
-    filtros_info = []
-    if uf_exp != 'Todos':
-        filtros_info.append(f"Estado: {uf_exp}")
-    if renda_exp != 'Todos':
-        filtros_info.append(f"Renda: {renda_exp}")
-    if sexo_exp != 'Todos':
-        filtros_info.append(f"Gênero: {sexo_exp}")
+        # Mostrar resumo dos filtros aplicados
+        st.markdown("**Filtros Aplicados:**")
+        filtros_info = []
+        if uf_exp != 'Todos':
+            filtros_info.append(f"Estado: {uf_exp}")
+        if renda_exp != 'Todos':
+            filtros_info.append(f"Renda: {renda_exp}")
+        if sexo_exp != 'Todos':
+            filtros_info.append(f"Gênero: {sexo_exp}")
     
-    if filtros_info:
-        st.info(" | ".join(filtros_info))
-    else:
-        st.info("Todos os dados incluídos (nenhum filtro específico aplicado)")
-    # Gráfico 1: Distribuição das Notas por Área de Conhecimento
-    if all(col in df_exploracao.columns for col in ['NOTA_CN', 'NOTA_CH', 'NOTA_LC', 'NOTA_MT']):
-        st.info("📊 **Distribuição das Notas por Área de Conhecimento**: Este gráfico de caixa mostra a distribuição das notas em cada área de conhecimento do ENEM para o grupo selecionado. Permite comparar o desempenho entre as diferentes disciplinas e identificar quais áreas têm maior variabilidade nas notas.")
-        notas_areas = {
-            'Ciências da Natureza': df_exploracao['NOTA_CN'].dropna(),
-            'Ciências Humanas': df_exploracao['NOTA_CH'].dropna(),
-            'Linguagens': df_exploracao['NOTA_LC'].dropna(),
-            'Matemática': df_exploracao['NOTA_MT'].dropna()
-        }
-        df_notas_areas = pd.DataFrame({
-            'Área': [],
-            'Nota': []
-        })
-        for area, notas in notas_areas.items():
-            temp_df = pd.DataFrame({'Área': area, 'Nota': notas})
-            df_notas_areas = pd.concat([df_notas_areas, temp_df], ignore_index=True)
-        fig_box = px.box(
-            df_notas_areas,
-            x='Área',
-            y='Nota',
-            color='Área',
-            title='Distribuição das Notas por Área de Conhecimento',
-            template=PLOTLY_TEMPLATE,
-            color_discrete_sequence=px.colors.qualitative.Pastel
-        )
-        st.plotly_chart(fig_box, use_container_width=True)
-
-    # Gráfico 2: Histograma da Nota Média
-    if 'NOTA_MEDIA' in df_exploracao.columns:
+        if filtros_info:
+            st.info(" | ".join(filtros_info))
+        else:
+            st.info("Todos os dados incluídos (nenhum filtro específico aplicado)")
+        # Gráfico 1: Distribuição das Notas por Área de Conhecimento
+        if all(col in consultas.colunas for col in secoes.AREAS_NOTAS.values()):
+            st.info("📊 **Distribuição das Notas por Área de Conhecimento**: Este gráfico de caixa mostra a distribuição das notas em cada área de conhecimento do ENEM para o grupo selecionado. Permite comparar o desempenho entre as diferentes disciplinas e identificar quais áreas têm maior variabilidade nas notas.")
+            fig_box, aproximado = progressivo(execucao, filtros_exp, secoes.figura_areas, consultas, filtros_exp)
+            grafico(execucao, st, fig_box, aproximado)
+
+        # Gráfico 2: Histograma da Nota Média (20 faixas reagrupadas do histograma do cubo)
         st.info("📈 **Histograma da Nota Média**: Este histograma mostra a distribuição das notas médias do grupo selecionado. Permite visualizar a concentração de notas em diferentes faixas e identificar se a distribuição é normal, assimétrica ou tem outras características importantes.")
-        df_exploracao['NOTA_MEDIA'] = pd.to_numeric(df_exploracao['NOTA_MEDIA'], errors='coerce')
-    fig_hist = px.histogram(
-        df_exploracao,
-        x='NOTA_MEDIA',
-        nbins=20,
-        title='Histograma da Nota Média do Grupo Selecionado',
-        template=PLOTLY_TEMPLATE,
-        color_discrete_sequence=['#636EFA']
-    )
-    st.plotly_chart(fig_hist, use_container_width=True)
-
-    # Gráfico 3: Proporção de Presença/Falta por área
-    presence_cols_local = {
-        'TP_PRESENCA_CN': 'Ciências da Natureza',
-        'TP_PRESENCA_CH': 'Ciências Humanas',
-        'TP_PRESENCA_LC': 'Linguagens e Códigos',
-        'TP_PRESENCA_MT': 'Matemática',
-    }
-    available_presence_local = [col for col in presence_cols_local.keys() if col in df_exploracao.columns]
+        fig_hist = em_cache(execucao, filtros_exp, secoes.figura_histograma_media, resumo_exp)
+        execucao.plotly_chart(st, fig_hist, use_container_width=True)
+
+        # Gráfico 3: Proporção de Presença/Falta por área (fragmento próprio: trocar a
+        # área refaz apenas este gráfico)
+        grafico_presenca(resumo_exp, filtros_exp, cubo.presencas, execucao)
+
+    if propria:
+        concluir(execucao, filtros_exploracao=filtros_exp)
+        if execucao.aproximados:
+            aguardar_exatos(tuple(execucao.aproximados), execucao.id)
+
+
+@st.fragment
+def grafico_presenca(resumo_exp, filtros_exp, presencas_disponiveis, execucao):
+    """Proporção de presença/falta na área escolhida, a partir do resumo do explorador."""
+    execucao, propria = execucao_do_fragmento(execucao, 'Presença/Falta')
+    presence_cols_local = presence_cols
+    available_presence_local = [col for col in presence_cols_local.keys() if col in presencas_disponiveis]
     if not available_presence_local:
         st.info('Não há informações de presença/falta para este recorte.')
     else:
@@ -569,21 +492,199 @@ else:
             format_func=lambda c: presence_cols_local.get(c, c),
             key='area_presenca_exp'
         )
-        serie_presenca = pd.to_numeric(df_exploracao[col_presenca], errors='coerce')
-        mapa_presenca = {0: 'Faltou', 1: 'Presente', 2: 'Eliminado', 3: 'Anulado'}
-        presenca_counts = serie_presenca.map(mapa_presenca).value_counts(dropna=True).reset_index()
-        presenca_counts.columns = ['Situação', 'Quantidade']
+        filtros_area = {**filtros_exp, 'AREA_PRESENCA': col_presenca}
+        presenca_counts = em_cache(execucao, filtros_area, secoes.presenca_por_situacao, resumo_exp, col_presenca)
         st.info("📋 **Proporção de Presença/Falta**: Este gráfico mostra a distribuição dos candidatos por situação de presença na área selecionada. Inclui presentes, faltantes, eliminados e anulados, permitindo analisar padrões de abandono e participação efetiva no exame.")
-        fig_presenca = px.bar(
-            presenca_counts,
-            x='Situação',
-            y='Quantidade',
-            text='Quantidade',
-            title=f"Proporção de Presença/Falta - {presence_cols_local.get(col_presenca, col_presenca)}",
-            template=PLOTLY_TEMPLATE,
-            color='Situação',
-            color_discrete_sequence=px.colors.qualitative.Set2
+        fig_presenca = em_cache(execucao, filtros_area, secoes.figura_presenca, presenca_counts, col_presenca)
+        execucao.plotly_chart(st, fig_presenca, use_container_width=True)
+
+    if propria:
+        concluir(execucao, area=col_presenca if available_presence_local else None)
+
+
+# -------------------- Cabeçalho --------------------
+execucao.secao('Cabeçalho')
+st.title("Decodificando o ENEM: Dos Dados Brutos às Estratégias Pedagógicas")
+st.markdown(
+    """
+    <div class="big-subtitle">Esta plataforma interativa, resultado do Projeto Integrador em Computação IV,
+    permite a exploração dos microdados do ENEM para extrair insights valiosos sobre o desempenho e o perfil dos estudantes.</div>
+    """,
+    unsafe_allow_html=True,
+)
+
+# -------------------- Data --------------------
+execucao.secao('Data')
+# Os módulos de dados carregam pandas, NumPy e PyArrow: só depois do título
+from enem import aquecimento  # noqa: E402
+from enem.aquecimento import registro_acessos  # noqa: E402
+from enem.edicoes import edicoes_disponiveis  # noqa: E402
+from enem.ingestao import (  # noqa: E402
+    carregar_amostra,
+    carregar_consultas,
+    carregar_cubo,
+    carregar_estatisticas,
+    carregar_qualidade,
+    linhas_dados,
+    ufs_disponiveis,
+    ultima_atualizacao,
+    versao_dados,
+)
+from enem.qualidade import resumo as resumo_qualidade  # noqa: E402
+
+# Sem dados convertidos, a primeira leitura do manifesto converte o CSV: o
+# título já está na tela e a espera aparece com um aviso
+PREPARANDO = "Preparando os dados (a primeira execução converte o CSV)..."
+# Edições catalogadas (python -m enem.edicoes adicionar ...); sem catálogo, só a amostra
+with st.spinner(PREPARANDO):
+    EDICOES = edicoes_disponiveis('dados_sample.csv')
+st.sidebar.header("Filtros Globais")
+ano_selecionado = st.sidebar.selectbox("Edição (ano)", options=sorted(EDICOES, reverse=True), key="ano")
+EDICAO = EDICOES[ano_selecionado]
+# Convertido uma única vez para formato colunar (com NOTA_MEDIA, SEXO, RENDA etc. já
+# calculados); os reruns não relêem o CSV. Aqui só o manifesto é lido: os dados e
+# agregados são carregados depois do cabeçalho e da barra lateral.
+with st.spinner(PREPARANDO):
+    # Prefixo das chaves do cache de resultados: muda junto com os dados
+    VERSAO_DADOS = versao_dados(EDICAO['csv'], EDICAO['destino'])
+    # Versões de todas as edições, na chave dos resultados que comparam os anos
+    VERSAO_EDICOES = tuple(versao_dados(e['csv'], e['destino']) for e in EDICOES.values())
+
+# Métricas principais
+col1, col2 = st.columns(2, gap="large")
+with col1:
+    st.metric(
+        "Candidatos Analisados",
+        f"{linhas_dados(EDICAO['csv'], EDICAO['destino']):,}".replace(',', '.'),
+        help="Total de participantes nos dados carregados",
+    )
+with col2:
+    st.metric("Objetivo do Projeto", "Democratizar o acesso aos dados")
+
+st.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
+
+# -------------------- Filtros (Sidebar) --------------------
+execucao.secao('Filtros (Sidebar)')
+uf_selecionada = st.sidebar.selectbox(
+    "Estado (UF)", options=['Todos'] + ufs_disponiveis(EDICAO['csv'], EDICAO['destino'])
+)
+
+# Recorte por UF das consultas e do cubo; os dados estão ordenados por UF, então
+# o recorte é um intervalo contíguo de linhas
+filtro_uf = {} if uf_selecionada == 'Todos' else {'SG_UF_PROVA': uf_selecionada}
+registrar_acesso('uf', filtro_uf)
+
+# Relatório de qualidade gravado na conversão (duplicatas, ausentes, códigos fora do domínio)
+relatorio_qualidade = carregar_qualidade(EDICAO['csv'], EDICAO['destino'])
+if relatorio_qualidade is not None:
+    with st.sidebar.expander("Qualidade dos dados", expanded=bool(relatorio_qualidade['fora_do_dominio'])):
+        c1, c2 = st.columns(2)
+        c1.metric("Linhas", f"{relatorio_qualidade['linhas']:,}".replace(',', '.'))
+        c2.metric("Duplicadas", f"{relatorio_qualidade['duplicadas']:,}".replace(',', '.'))
+        for col, codigos in relatorio_qualidade['fora_do_dominio'].items():
+            st.warning(f"{col}: {sum(codigos.values()):,} linhas com códigos fora do domínio ({', '.join(codigos)})")
+        if relatorio_qualidade['blocos_sinalizados']:
+            st.caption(f"{len(relatorio_qualidade['blocos_sinalizados'])} bloco(s) do CSV sinalizado(s) na conversão")
+        st.dataframe(resumo_qualidade(relatorio_qualidade), use_container_width=True)
+
+# -------------------- 1. O Problema --------------------
+execucao.secao('1. O Problema')
+st.header("O Tesouro Escondido nos Dados do ENEM")
+st.markdown(
+    "> <b>Problema:</b> Professores e gestores não possuem ferramentas acessíveis para explorar a imensa base de dados do ENEM, dificultando a extração de informações para embasar estratégias pedagógicas.",
+    unsafe_allow_html=True,
+)
+
+st.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
+
+# -------------------- Carga --------------------
+# Depois do cabeçalho e da barra lateral, que já aparecem enquanto os dados carregam.
+# As seções consultam os dados em memória (pandas) ou lendo o arquivo convertido
+# sem carregá-lo (ENEM_BACKEND=arrow).
+execucao.secao('Carga')
+from enem import secoes  # noqa: E402 (Plotly e a montagem das figuras só depois do cabeçalho)
+
+consultas = execucao.medir(carregar_consultas, EDICAO['csv'], EDICAO['destino'])
+# Agregados pré-calculados (contagens, somas e histogramas por célula)
+cubo = execucao.medir(carregar_cubo, EDICAO['csv'], EDICAO['destino'])
+# Contagens, médias, variâncias e covariâncias das notas por UF e categoria
+estatisticas = execucao.medir(carregar_estatisticas, EDICAO['csv'], EDICAO['destino'])
+# Amostra estratificada para as estimativas imediatas (só existe para dados grandes)
+amostra = execucao.medir(carregar_amostra, EDICAO['csv'], EDICAO['destino']) if PROGRESSIVO else None
+
+# -------------------- Seções sob demanda --------------------
+secoes_da_pagina = {
+    "Quem são os Candidatos?": lambda: secao_candidatos(consultas, uf_selecionada, filtro_uf, execucao),
+    "Desigualdade": lambda: secao_desigualdade(consultas, cubo, filtro_uf, EDICOES, execucao),
+    "Desigualdade Digital": lambda: secao_digital(consultas, uf_selecionada, cubo, estatisticas, filtro_uf, EDICOES, execucao),
+    "Disciplinas": lambda: secao_disciplinas(consultas, filtro_uf, execucao),
+    "Faltantes": lambda: secao_faltantes(consultas, uf_selecionada, filtro_uf, execucao),
+    "Cruzamentos": lambda: secao_cruzamentos(consultas, filtro_uf, execucao),
+    "Faça sua Própria Análise": lambda: secao_exploracao(
+        consultas, cubo, ['Todos'] + ufs_disponiveis(EDICAO['csv'], EDICAO['destino']), execucao
+    ),
+}
+abas = abas_sob_demanda(list(secoes_da_pagina), key="aba_aberta")
+try:
+    for (container, aberta), executar_secao in zip(abas, secoes_da_pagina.values()):
+        if aberta:
+            with container:
+                executar_secao()
+finally:
+    # Também quando uma seção falha: a execução é registrada e o perfilador, parado
+    concluir(execucao, ano=ano_selecionado, uf=uf_selecionada, aba=st.session_state.get("aba_aberta"))
+    if perfilador is not None:
+        st.session_state['ultimo_perfil'] = perfilador.parar()
+
+# -------------------- Aquecimento --------------------
+# Uma vez por versão dos dados no processo: as próximas UFs e recortes já chegam calculados
+if AQUECIMENTO:
+    aquecimento_atual = aquecimento.iniciar(EDICAO['csv'], EDICAO['destino'])
+
+if execucao.aproximados:
+    aguardar_exatos(tuple(execucao.aproximados), execucao.id)
+
+# -------------------- Diagnóstico --------------------
+
+if DEBUG:
+    with st.sidebar.expander("Diagnóstico de desempenho", expanded=True):
+        painel(execucao, st)
+        st.markdown("**Cache de resultados**")
+        estatisticas_cache = cache_resultados.estatisticas()
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Acertos", f"{estatisticas_cache['acertos']:,}")
+        c2.metric("Faltas", f"{estatisticas_cache['faltas']:,}")
+        c3.metric("Despejos", f"{estatisticas_cache['despejos']:,}")
+        st.caption(
+            f"{estatisticas_cache['itens']} itens, {estatisticas_cache['mb']:.1f} de "
+            f"{estatisticas_cache['orcamento_mb']:.0f} MB (ENEM_CACHE_MB); "
+            f"{estatisticas_cache['em_segundo_plano']} em cálculo em segundo plano"
+        )
+        if AQUECIMENTO:
+            estado_aquecimento = aquecimento_atual.estado()
+            st.progress(
+                estado_aquecimento['concluidas'] / max(estado_aquecimento['total'], 1),
+                text=f"Aquecimento: {estado_aquecimento['concluidas']} de {estado_aquecimento['total']} recortes"
+                + (f" em {estado_aquecimento['segundos']:.1f}s" if estado_aquecimento['segundos'] is not None else ''),
+            )
+            for falha in estado_aquecimento['falhas']:
+                st.caption(f"⚠️ {falha}")
+        atualizacao = ultima_atualizacao(EDICAO['csv'], EDICAO['destino'])
+        if atualizacao:
+            st.caption(
+                f"Última atualização dos dados: {', '.join(atualizacao['ufs']) or 'nenhuma UF'} "
+                f"reprocessada(s) em {atualizacao['segundos']:.1f}s"
+                + (f"; {atualizacao['resultados_mantidos']} resultados mantidos e "
+                   f"{atualizacao['resultados_descartados']} descartados neste processo"
+                   if 'resultados_mantidos' in atualizacao else '')
+            )
+        st.button("Limpar cache de resultados", on_click=cache_resultados.limpar)
+        st.button(
+            "Perfilar a próxima execução",
+            on_click=lambda: st.session_state.update(perfilar_execucao=True),
+            help="Captura a próxima execução inteira com pyinstrument (se instalado) ou cProfile",
         )
-        fig_presenca.update_traces(textposition='outside')
-        fig_presenca.update_layout(showlegend=False, xaxis_title='', yaxis_title='Quantidade')
-        st.plotly_chart(fig_presenca, use_container_width=True)
\ No newline at end of file
+        if 'ultimo_perfil' in st.session_state:
+            caminho_perfil, texto_perfil = st.session_state['ultimo_perfil']
+            st.caption(f"Perfil gravado em {caminho_perfil}")
+            st.code(texto_perfil, language=None)
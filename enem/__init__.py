@@ -0,0 +1,5 @@
+"""Camada de dados do Dashboard de Insights do ENEM.
+
+Reúne a ingestão dos microdados do INEP e as estruturas derivadas usadas
+pelo `dashboard_enem.py`, sem depender do Streamlit.
+"""
@@ -0,0 +1,282 @@
+"""Amostra estratificada dos dados convertidos, para respostas aproximadas imediatas.
+
+Na conversão, além dos dados completos, é gravada uma amostra aleatória
+estratificada por UF × RENDA: cada estrato recebe uma parte proporcional ao
+seu tamanho, com um mínimo de linhas (ou o estrato inteiro, se for menor),
+para que UFs e faixas de renda pequenas não desapareçam. Cada linha guarda o
+seu estrato e o peso (tamanho do estrato / linhas sorteadas nele).
+
+`ConsultasAmostra` responde às mesmas consultas de `enem.consultas` sobre a
+amostra: as contagens são os totais ponderados (estimador de Horvitz-Thompson
+estratificado) e `margem` dá a meia largura do intervalo de 95% de cada
+contagem, pela variância com correção de população finita em cada estrato.
+O dashboard mostra essas estimativas enquanto os resultados exatos são
+calculados em segundo plano. A cobertura dos intervalos pode ser conferida
+contra os dados completos:
+
+    python -m enem.amostra dados.csv
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from .consultas import _indice_categorico
+from .contingencia import Contingencia, codigo_combinado, validar_dimensoes
+from .quantis import bins, contar_bins, n_bins, passo_de, separar
+from .resultados import normalizar_filtros
+
+ARQUIVO_AMOSTRA = 'amostra.feather'
+
+# Linhas da amostra (aproximadamente: os mínimos por estrato somam-se a elas)
+TAMANHO_AMOSTRA = int(os.environ.get('ENEM_AMOSTRA', 100_000))
+MINIMO_ESTRATO = 30
+ESTRATOS = ['SG_UF_PROVA', 'RENDA']
+
+ESTRATO = '_ESTRATO'
+PESO = '_PESO'
+
+# Quantil da normal para o intervalo de 95%
+Z_95 = 1.959964
+
+
+def sortear(estratos, tamanho=TAMANHO_AMOSTRA, minimo=MINIMO_ESTRATO, semente=0):
+    """Linhas sorteadas em cada estrato (códigos 0..H-1), em ordem crescente.
+
+    Retorna também o tamanho de cada estrato e quantas linhas foram sorteadas nele.
+    """
+    estratos = np.asarray(estratos, dtype=np.int64)
+    populacao = np.bincount(estratos)
+    alocacao = np.ceil(populacao * (tamanho / max(len(estratos), 1))).astype(np.int64)
+    amostrados = np.minimum(populacao, np.maximum(alocacao, minimo))
+    # Ordena as linhas por estrato e, dentro dele, por uma chave aleatória; as
+    # primeiras `amostrados[h]` linhas de cada estrato formam a amostra
+    chaves = np.random.default_rng(semente).random(len(estratos))
+    ordem = np.lexsort((chaves, estratos))
+    inicio = np.cumsum(populacao) - populacao
+    posicao = np.arange(len(ordem)) - inicio[estratos[ordem]]
+    linhas = np.sort(ordem[posicao < amostrados[estratos[ordem]]])
+    return linhas, populacao, amostrados
+
+
+def _ler_linhas(caminho_dados, linhas):
+    # Percorre os lotes do arquivo por memory map, copiando só as linhas sorteadas
+    leitor = pa.ipc.open_file(pa.memory_map(caminho_dados))
+    lotes = []
+    inicio = 0
+    for i in range(leitor.num_record_batches):
+        lote = leitor.get_batch(i)
+        fim = inicio + lote.num_rows
+        a, b = np.searchsorted(linhas, [inicio, fim])
+        if b > a:
+            lotes.append(lote.take(pa.array(linhas[a:b] - inicio)))
+        inicio = fim
+    return pa.Table.from_batches(lotes, schema=leitor.schema).to_pandas()
+
+
+def gravar_amostra(caminho_dados, destino, tamanho=TAMANHO_AMOSTRA, semente=0):
+    """Sorteia e grava a amostra estratificada do arquivo convertido `caminho_dados`.
+
+    Dados com até `tamanho` linhas não precisam de amostra: nada é gravado (e
+    uma amostra antiga é removida). Retorna o número de linhas da amostra.
+    """
+    caminho = os.path.join(destino, ARQUIVO_AMOSTRA)
+    colunas = pa.ipc.open_file(pa.memory_map(caminho_dados)).schema.names
+    estratos = pd.read_feather(caminho_dados, columns=[c for c in ESTRATOS if c in colunas])
+    if len(estratos) <= tamanho:
+        if os.path.exists(caminho):
+            os.remove(caminho)
+        return 0
+    # Um estrato por combinação observada (ausentes formam estratos próprios)
+    codigos = [estratos[c].cat.codes.to_numpy().astype(np.int64) + 1 for c in estratos.columns]
+    tamanhos = [len(estratos[c].cat.categories) + 1 for c in estratos.columns]
+    _, estrato = np.unique(np.ravel_multi_index(codigos, tamanhos), return_inverse=True)
+
+    linhas, populacao, amostrados = sortear(estrato, tamanho, semente=semente)
+    df = _ler_linhas(caminho_dados, linhas)
+    df[ESTRATO] = estrato[linhas].astype(np.int32)
+    df[PESO] = (populacao / amostrados)[estrato[linhas]]
+    temporario = caminho + '.tmp'
+    df.to_feather(temporario)
+    os.replace(temporario, caminho)
+    return len(df)
+
+
+class ConsultasAmostra:
+    """Estimativas das consultas de `enem.consultas` pela amostra estratificada.
+
+    Mesma interface de `ConsultasPandas`; as contagens (e os histogramas) são
+    os totais ponderados arredondados, e `margem` dá a meia largura do
+    intervalo de 95% das contagens de `contar`.
+    """
+
+    backend = 'amostra'
+    aproximada = True
+
+    def __init__(self, df):
+        self.estrato = df[ESTRATO].to_numpy().astype(np.int64)
+        self.peso = df[PESO].to_numpy()
+        self.df = df.drop(columns=[ESTRATO, PESO])
+        self.amostrados = np.bincount(self.estrato)
+        self.populacao = np.rint(np.bincount(self.estrato, weights=self.peso))
+        # Variância do total estimado por unidade de p(1 - p) em cada estrato:
+        # N² (1 - n/N) / (n - 1); zero nos estratos recenseados
+        n, N = self.amostrados, self.populacao
+        self._fator = np.where(n > 1, N ** 2 * (1 - n / N) / np.maximum(n - 1, 1), 0.0)
+        self.total = int(N.sum())
+
+    @classmethod
+    def carregar(cls, destino):
+        """Amostra gravada na conversão (`None` se os dados não precisaram de amostra)."""
+        caminho = os.path.join(destino, ARQUIVO_AMOSTRA)
+        if not os.path.exists(caminho):
+            return None
+        return cls(pd.read_feather(caminho))
+
+    @property
+    def colunas(self):
+        return self.df.columns.tolist()
+
+    @property
+    def n_amostra(self):
+        return len(self.df)
+
+    def _mascara(self, filtros):
+        mascara = np.ones(len(self.df), dtype=bool)
+        for dim, valor in normalizar_filtros(filtros):
+            mascara = mascara & (self.df[dim] == valor).to_numpy()
+        return mascara
+
+    def _estimar(self, codigos, k, mascara):
+        """Totais estimados e suas variâncias para os códigos 0..k-1 nas linhas da máscara."""
+        estrato, codigos = self.estrato[mascara], codigos[mascara]
+        validos = codigos >= 0
+        H = len(self.amostrados)
+        contagens = np.bincount(estrato[validos] * k + codigos[validos], minlength=H * k).reshape(H, k)
+        p = contagens / self.amostrados[:, None]
+        return self.populacao @ p, self._fator @ (p * (1 - p))
+
+    def _contagens(self, coluna, filtros):
+        dtype = self.df[coluna].dtype
+        k = len(dtype.categories)
+        codigos = self.df[coluna].cat.codes.to_numpy().astype(np.int64)
+        # Ausentes contados na última posição
+        total, variancia = self._estimar(np.where(codigos < 0, k, codigos), k + 1, self._mascara(filtros))
+        codigos = np.arange(k)
+        if total[k] > 0:
+            codigos = np.append(codigos, -1)
+        else:
+            total, variancia = total[:k], variancia[:k]
+        return _indice_categorico(codigos, dtype, coluna), total, variancia
+
+    def n_linhas(self, filtros=None):
+        return int(round(self.peso[self._mascara(filtros)].sum()))
+
+    def contar(self, coluna, filtros=None):
+        indice, total, _ = self._contagens(coluna, filtros)
+        return pd.Series(np.rint(total).astype(np.int64), index=indice, name='count')
+
+    def margem(self, coluna, filtros=None):
+        """Meia largura do intervalo de 95% de cada contagem de `contar`."""
+        indice, _, variancia = self._contagens(coluna, filtros)
+        return pd.Series(Z_95 * np.sqrt(variancia), index=indice, name='margem')
+
+    def contingencia(self, dimensoes, filtros=None):
+        validar_dimensoes(dimensoes)
+        dtypes = [self.df[dim].dtype for dim in dimensoes]
+        tamanhos = [len(t.categories) for t in dtypes]
+        codigos = codigo_combinado([self.df[dim].array.codes for dim in dimensoes], tamanhos)
+        total, _ = self._estimar(codigos, int(np.prod(tamanhos)), self._mascara(filtros))
+        return Contingencia(dimensoes, dtypes, np.rint(total).astype(np.int64).reshape(tamanhos))
+
+    def tabela_cruzada(self, linhas, colunas, filtros=None):
+        return self.contingencia([linhas, colunas], filtros).tabela()
+
+    def _histogramas(self, valores, pesos, passo, grupos=None, k=1):
+        validos = ~np.isnan(valores)
+        chave = bins(valores[validos], passo)
+        if grupos is not None:
+            chave = grupos[validos] * n_bins(passo) + chave
+        return separar(*contar_bins(chave, k * n_bins(passo), pesos[validos]), k, passo)
+
+    def histogramas_por(self, grupo, valor, filtros=None, passo=None):
+        passo = passo or passo_de(valor)
+        mascara = self._mascara(filtros)
+        categorias = self.df[grupo].cat.categories
+        codigos = self.df[grupo].cat.codes.to_numpy().astype(np.int64)[mascara]
+        valores = self.df[valor].to_numpy(dtype=np.float64)[mascara]
+        # Linhas sem grupo não entram em nenhum histograma
+        valores = np.where(codigos >= 0, valores, np.nan)
+        histogramas = self._histogramas(valores, self.peso[mascara], passo, np.maximum(codigos, 0), len(categorias))
+        observados = np.bincount(codigos[codigos >= 0], minlength=len(categorias))
+        return {
+            categoria: histogramas[i]
+            for i, categoria in enumerate(categorias)
+            if observados[i]
+        }
+
+    def histogramas(self, colunas, filtros=None, passo=None):
+        mascara = self._mascara(filtros)
+        return {
+            col: self._histogramas(
+                self.df[col].to_numpy(dtype=np.float64)[mascara], self.peso[mascara], passo or passo_de(col),
+            )[0]
+            for col in colunas
+        }
+
+
+# -------------------- Conferência contra os dados completos --------------------
+
+def conferir(exatas, amostra, filtros_lista, colunas):
+    """Erros das contagens estimadas e cobertura dos intervalos de 95%.
+
+    Uma linha por (filtros, coluna, categoria) com contagem exata positiva.
+    """
+    linhas = []
+    for filtros in filtros_lista:
+        for coluna in colunas:
+            exata = exatas.contar(coluna, filtros)
+            estimada = amostra.contar(coluna, filtros).reindex(exata.index, fill_value=0)
+            margem = amostra.margem(coluna, filtros).reindex(exata.index, fill_value=0)
+            for categoria in exata.index[exata.to_numpy() > 0]:
+                linhas.append({
+                    'filtros': str(dict(normalizar_filtros(filtros))),
+                    'coluna': coluna,
+                    'categoria': categoria,
+                    'exata': int(exata[categoria]),
+                    'estimada': int(estimada[categoria]),
+                    'margem': float(margem[categoria]),
+                })
+    tabela = pd.DataFrame(linhas)
+    tabela['erro_relativo'] = (tabela['estimada'] - tabela['exata']).abs() / tabela['exata']
+    tabela['coberta'] = (tabela['estimada'] - tabela['exata']).abs() <= tabela['margem']
+    return tabela
+
+
+def main(argv=None):
+    from .ingestao import carregar_amostra, carregar_consultas, ufs_disponiveis
+
+    parser = argparse.ArgumentParser(description='Confere as estimativas da amostra estratificada contra os dados completos.')
+    parser.add_argument('csv', help='CSV de origem (já convertido ou a converter)')
+    parser.add_argument('--destino', help='diretório dos dados convertidos (padrão: .enem_cache/<nome>)')
+    args = parser.parse_args(argv)
+
+    amostra = carregar_amostra(args.csv, args.destino)
+    if amostra is None:
+        print('dados pequenos: sem amostra (as consultas já são exatas)')
+        return 0
+    exatas = carregar_consultas(args.csv, args.destino)
+    colunas = [c for c in ['SEXO', 'COR/RACA', 'ACESSO_COMPUTADOR', 'ACESSO_INTERNET'] if c in exatas.colunas]
+    filtros_lista = [{}] + [{'SG_UF_PROVA': uf} for uf in ufs_disponiveis(args.csv, args.destino)]
+    tabela = conferir(exatas, amostra, filtros_lista, colunas)
+    print(f"amostra de {amostra.n_amostra:,} de {amostra.total:,} linhas; {len(tabela)} contagens conferidas")
+    print(f"erro relativo mediano {tabela['erro_relativo'].median():.2%}, máximo {tabela['erro_relativo'].max():.2%}")
+    print(f"cobertura dos intervalos de 95%: {tabela['coberta'].mean():.1%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
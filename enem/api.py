@@ -0,0 +1,414 @@
+"""API HTTP local, somente leitura, com os agregados do dashboard em JSON.
+
+Outras ferramentas consultam os mesmos números das seções sem passar pela
+interface do Streamlit. As respostas saem do cubo pré-calculado na conversão
+(`enem.cubo`), com os filtros do explorador (`uf`, `renda` e `sexo`; 'Todos'
+ou ausente não restringe), e ficam no cache de resultados do processo
+(`enem.resultados`) já serializadas.
+
+    GET /ufs                         UFs e valores aceitos em renda e sexo
+    GET /resumo?uf=SP                candidatos, nota média e mediana da NOTA_MEDIA
+    GET /renda?uf=SP&sexo=Feminino   mediana da NOTA_MEDIA por faixa de renda
+    GET /digital?uf=BA               % sem internet, % sem computador e diferença de nota
+    GET /faltantes?renda=...         faltantes e percentual por área
+
+Cada resposta leva um `ETag` derivado da versão dos dados, do recurso e dos
+filtros, calculável sem montar a resposta: um `If-None-Match` igual é
+respondido com 304 antes de qualquer consulta. A versão é conferida a cada
+requisição; depois de uma atualização dos dados, o cubo é recarregado e as
+ETags antigas deixam de valer. Erros também são JSON: 400 e
+404 para requisições inválidas e 500 (com o traceback no stderr do
+servidor) para falhas ao montar a resposta. As requisições são atendidas
+em threads (`ThreadingHTTPServer`), com conexões persistentes.
+
+    python -m enem.api dados.csv --porta 8765
+    python -m enem.api dados.csv --benchmark --clientes 8 --requisicoes 2000 --saida api.json
+
+O benchmark sobe o servidor em outro processo e mede vazão (requisições/s)
+e latência (mediana e p99) a frio, com o cache de resultados já cheio e
+com revalidação por ETag.
+"""
+import argparse
+import hashlib
+import http.client
+import json
+import math
+import multiprocessing
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from .mapas import presence_cols
+from .resultados import cache_resultados, chave_resultado, normalizar_filtros
+
+PORTA = 8765
+
+# Parâmetros da URL -> dimensões do cubo (os filtros do explorador)
+PARAMETROS = {'uf': 'SG_UF_PROVA', 'renda': 'RENDA', 'sexo': 'SEXO'}
+
+
+class ErroRequisicao(Exception):
+    """Requisição inválida; vira uma resposta JSON com `status`."""
+
+    def __init__(self, status, mensagem, **detalhes):
+        super().__init__(mensagem)
+        self.status = status
+        self.documento = {'erro': mensagem, **detalhes}
+
+
+def _limpo(valor):
+    """`valor` serializável em JSON estrito (NaN vira null, tipos do NumPy viram nativos)."""
+    if isinstance(valor, dict):
+        return {str(k): _limpo(v) for k, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [_limpo(v) for v in valor]
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+    if isinstance(valor, float) and math.isnan(valor):
+        return None
+    return valor
+
+
+# -------------------- Agregados --------------------
+
+def opcoes(cubo):
+    """Valores aceitos por parâmetro de filtro ({parâmetro: [valores]})."""
+    return {
+        parametro: [str(v) for v in cubo.celulas[dim].cat.categories]
+        for parametro, dim in PARAMETROS.items() if dim in cubo.celulas
+    }
+
+
+def resumo(cubo, filtros):
+    r = cubo.agregar(filtros)
+    return {'candidatos': r['n'], 'nota_media': r['media'], 'nota_mediana': r['mediana']}
+
+
+def renda(cubo, filtros):
+    from .secoes import mediana_por_renda
+
+    tabela = mediana_por_renda(cubo, filtros).sort_values('RENDA')
+    return [
+        {'renda': str(faixa), 'mediana_nota_media': mediana}
+        for faixa, mediana in zip(tabela['RENDA'], tabela['MEDIANA_NOTA_MEDIA'])
+    ]
+
+
+def digital(cubo, filtros):
+    """As métricas de `secoes.metricas_digitais`, pelas células do cubo.
+
+    As estatísticas acumuladas só filtram por UF; o cubo também por renda e
+    sexo, com os mesmos números quando só a UF é filtrada.
+    """
+    celulas = cubo.celulas[cubo.selecionar(filtros)]
+    total = int(celulas['N'].sum())
+
+    def grupo(dim, resposta):
+        return celulas[(celulas[dim] == resposta).to_numpy()]
+
+    def media(selecionadas):
+        n_nota = int(selecionadas['N_NOTA'].sum())
+        return selecionadas['SOMA_NOTA'].sum() / n_nota if n_nota else float('nan')
+
+    sem_internet = int(grupo('ACESSO_INTERNET', 'Não')['N'].sum())
+    sem_computador = int(grupo('ACESSO_COMPUTADOR', 'Não')['N'].sum())
+    return {
+        'candidatos': total,
+        'perc_sem_internet': sem_internet / total * 100 if total > 0 else 0,
+        'perc_sem_computador': sem_computador / total * 100 if total > 0 else 0,
+        'diferenca_internet': media(grupo('ACESSO_INTERNET', 'Sim')) - media(grupo('ACESSO_INTERNET', 'Não')),
+    }
+
+
+def faltantes(cubo, filtros):
+    """As linhas de `secoes.faltantes_por_area`, pelas contagens de presença do cubo."""
+    presencas = cubo.agregar(filtros)['presencas']
+    linhas = []
+    for col, area in presence_cols.items():
+        if col not in presencas:
+            continue
+        contagem = presencas[col]
+        total_validos = int(contagem.sum())
+        num_faltantes = int(contagem.get(0, 0))
+        linhas.append({
+            'area': area,
+            'faltantes': num_faltantes,
+            'percentual': num_faltantes / total_validos * 100 if total_validos > 0 else 0,
+        })
+    return sorted(linhas, key=lambda linha: -linha['faltantes'])
+
+
+RECURSOS = {
+    '/resumo': resumo,
+    '/renda': renda,
+    '/digital': digital,
+    '/faltantes': faltantes,
+}
+
+
+# -------------------- Serviço --------------------
+
+class Respostas:
+    """Respostas da API para uma versão dos dados convertidos."""
+
+    def __init__(self, caminho_csv, destino=None):
+        from .ingestao import ano_dados, carregar_cubo, ufs_disponiveis, versao_dados
+
+        # A versão antes do cubo: se os dados mudarem entre as duas leituras,
+        # o cubo novo fica sob a versão antiga (que logo deixa de ser usada),
+        # nunca o cubo antigo sob a versão nova
+        self.versao = versao_dados(caminho_csv, destino)
+        self.cubo = carregar_cubo(caminho_csv, destino)
+        self.ano = ano_dados(caminho_csv, destino)
+        self.opcoes = {**opcoes(self.cubo), 'uf': ufs_disponiveis(caminho_csv, destino)}
+
+    def filtros(self, consulta):
+        """Filtros do cubo a partir da query string, validados contra os valores existentes."""
+        parametros = parse_qs(consulta)
+        desconhecidos = sorted(set(parametros) - set(PARAMETROS))
+        if desconhecidos:
+            raise ErroRequisicao(400, f'parâmetros desconhecidos: {", ".join(desconhecidos)}', aceitos=list(PARAMETROS))
+        filtros = {}
+        for parametro, valores in parametros.items():
+            valor = valores[-1]
+            if valor == 'Todos':
+                continue
+            if valor not in self.opcoes.get(parametro, []):
+                raise ErroRequisicao(400, f'{parametro} inválido: {valor}', aceitos=self.opcoes.get(parametro, []))
+            filtros[PARAMETROS[parametro]] = valor
+        return filtros
+
+    def etag(self, caminho, filtros):
+        if caminho != '/ufs' and caminho not in RECURSOS:
+            raise ErroRequisicao(404, f'recurso inexistente: {caminho}', recursos=['/ufs', *RECURSOS])
+        texto = repr((self.versao, caminho, normalizar_filtros(filtros)))
+        return '"' + hashlib.sha1(texto.encode()).hexdigest()[:20] + '"'
+
+    def corpo(self, caminho, filtros):
+        """Resposta JSON (bytes) de `caminho`, guardada no cache de resultados."""
+        if caminho == '/ufs':
+            return json.dumps(_limpo({'ano': self.ano, 'filtros': self.opcoes}), ensure_ascii=False).encode()
+        funcao = RECURSOS[caminho]
+
+        def montar():
+            documento = {
+                'versao': self.versao,
+                'ano': self.ano,
+                'filtros': dict(normalizar_filtros(filtros)),
+                'dados': funcao(self.cubo, filtros),
+            }
+            return json.dumps(_limpo(documento), ensure_ascii=False).encode()
+
+        return cache_resultados.obter(chave_resultado(self.versao, funcao, {**filtros, 'FORMATO': 'json'}), montar)
+
+
+class Servico:
+    """Respostas da API para os dados convertidos de `caminho_csv`, sempre na versão atual.
+
+    A versão é conferida a cada requisição (`ingestao.versao_dados`, que só
+    consulta o mtime do CSV e do manifesto enquanto nada muda); quando uma
+    atualização (`enem.versionamento`) a altera, o cubo, as UFs e os valores
+    aceitos nos filtros são recarregados.
+    """
+
+    def __init__(self, caminho_csv, destino=None):
+        self.caminho_csv = caminho_csv
+        self.destino = destino
+        self._trava = threading.Lock()
+        self._respostas = Respostas(caminho_csv, destino)
+
+    def atual(self):
+        """`Respostas` da versão atual dos dados (a mesma durante toda a requisição)."""
+        from .ingestao import versao_dados
+
+        respostas = self._respostas
+        if respostas.versao != versao_dados(self.caminho_csv, self.destino):
+            with self._trava:
+                respostas = self._respostas
+                if respostas.versao != versao_dados(self.caminho_csv, self.destino):
+                    respostas = self._respostas = Respostas(self.caminho_csv, self.destino)
+        return respostas
+
+
+class _Manipulador(BaseHTTPRequestHandler):
+    # Conexões persistentes (os clientes reaproveitam o socket)
+    protocol_version = 'HTTP/1.1'
+    # Cabeçalhos e corpo saem em escritas separadas; sem o Nagle, o corpo não
+    # espera o ACK atrasado do cliente (~40 ms por resposta)
+    disable_nagle_algorithm = True
+    servico = None
+    registrar = False
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        caminho = url.path.rstrip('/') or '/ufs'
+        try:
+            respostas = self.servico.atual()
+            filtros = respostas.filtros(url.query)
+            etag = respostas.etag(caminho, filtros)
+            if etag in [e.strip() for e in self.headers.get('If-None-Match', '').split(',')]:
+                status, corpo = 304, b''
+            else:
+                status, corpo = 200, respostas.corpo(caminho, filtros)
+        except ErroRequisicao as erro:
+            status, corpo, etag = erro.status, json.dumps(erro.documento, ensure_ascii=False).encode(), None
+        except Exception as erro:
+            # Falha ao montar a resposta: o cliente recebe um 500 em JSON e a
+            # conexão continua servindo; o traceback vai para o stderr
+            traceback.print_exc()
+            documento = {'erro': 'erro interno ao montar a resposta', 'tipo': type(erro).__name__}
+            status, corpo, etag = 500, json.dumps(documento, ensure_ascii=False).encode(), None
+        self._responder(status, corpo, etag)
+
+    def _responder(self, status, corpo=b'', etag=None):
+        self.send_response(status)
+        if etag:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+        if status != 304:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, formato, *args):
+        if self.registrar:
+            super().log_message(formato, *args)
+
+
+def criar_servidor(caminho_csv, destino=None, host='127.0.0.1', porta=PORTA, registrar=False):
+    """`ThreadingHTTPServer` da API (ainda não iniciado); `porta=0` escolhe uma livre."""
+    servico = Servico(caminho_csv, destino)
+    manipulador = type('Manipulador', (_Manipulador,), {'servico': servico, 'registrar': registrar})
+    servidor = ThreadingHTTPServer((host, porta), manipulador)
+    servidor.daemon_threads = True
+    return servidor
+
+
+# -------------------- Benchmark --------------------
+
+def _servir(caminho_csv, destino, fila):
+    servidor = criar_servidor(caminho_csv, destino, porta=0)
+    fila.put(servidor.server_address[1])
+    servidor.serve_forever()
+
+
+def _cliente(porta, urls, etags, latencias, erros):
+    conexao = http.client.HTTPConnection('127.0.0.1', porta)
+    for url in urls:
+        cabecalhos = {'If-None-Match': etags[url]} if etags and url in etags else {}
+        inicio = time.perf_counter()
+        try:
+            conexao.request('GET', url, headers=cabecalhos)
+            resposta = conexao.getresponse()
+            resposta.read()
+            if resposta.status not in (200, 304):
+                erros.append(f'{url}: {resposta.status}')
+            elif etags is not None and url not in etags:
+                etags[url] = resposta.getheader('ETag')
+        except (OSError, http.client.HTTPException) as erro:
+            erros.append(f'{url}: {erro!r}')
+            conexao.close()
+            conexao = http.client.HTTPConnection('127.0.0.1', porta)
+        latencias.append(time.perf_counter() - inicio)
+    conexao.close()
+
+
+def _rodada(porta, urls, clientes, etags=None):
+    """Distribui `urls` entre `clientes` threads; retorna vazão e latências."""
+    latencias, erros = [], []
+    threads = [
+        threading.Thread(target=_cliente, args=(porta, urls[i::clientes], etags, latencias, erros))
+        for i in range(clientes)
+    ]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    segundos = time.perf_counter() - inicio
+    return {
+        'requisicoes': len(latencias),
+        'segundos': round(segundos, 3),
+        'requisicoes_por_segundo': round(len(latencias) / segundos, 1) if segundos else None,
+        'p50_ms': round(float(np.percentile(latencias, 50)) * 1000, 3) if latencias else None,
+        'p99_ms': round(float(np.percentile(latencias, 99)) * 1000, 3) if latencias else None,
+        'erros': erros[:10],
+    }
+
+
+def benchmark(caminho_csv, destino=None, clientes=8, requisicoes=2000, log=print):
+    """Vazão e latência da API a frio, com cache e com revalidação por ETag."""
+    from .ingestao import ufs_disponiveis
+
+    # Converte (se preciso) antes de subir o servidor
+    ufs = ['Todos'] + ufs_disponiveis(caminho_csv, destino)
+    contexto = multiprocessing.get_context('spawn')
+    fila = contexto.Queue()
+    processo = contexto.Process(target=_servir, args=(caminho_csv, destino, fila), daemon=True)
+    processo.start()
+    try:
+        porta = fila.get(timeout=600)
+        distintas = [f'{recurso}?uf={uf}' for uf in ufs for recurso in RECURSOS]
+        repetidas = (distintas * (requisicoes // len(distintas) + 1))[:requisicoes]
+        etags = {}
+        rodadas = {
+            # Cada URL uma vez, com o cache de resultados vazio
+            'frio': _rodada(porta, distintas, clientes, etags),
+            'cache': _rodada(porta, repetidas, clientes),
+            'etag': _rodada(porta, repetidas, clientes, etags),
+        }
+    finally:
+        processo.terminate()
+        processo.join()
+    log(f"{'rodada':>7} {'requisições':>12} {'req/s':>9} {'p50':>9} {'p99':>9}")
+    for nome, r in rodadas.items():
+        log(f"{nome:>7} {r['requisicoes']:>12} {r['requisicoes_por_segundo'] or 0:>9,.0f} "
+            f"{r['p50_ms'] or 0:>7.2f}ms {r['p99_ms'] or 0:>7.2f}ms"
+            + (f"  {len(r['erros'])} erro(s): {r['erros'][0]}" if r['erros'] else ''))
+    return {
+        'data': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'parametros': {'csv': caminho_csv, 'clientes': clientes, 'requisicoes': requisicoes},
+        'rodadas': rodadas,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='API HTTP local (JSON) com os agregados do dashboard.')
+    parser.add_argument('csv', help='CSV de origem (já convertido ou a converter)')
+    parser.add_argument('--destino', help='diretório dos dados convertidos (padrão: .enem_cache/<nome>)')
+    parser.add_argument('--host', default='127.0.0.1', help='endereço de escuta')
+    parser.add_argument('--porta', type=int, default=PORTA, help='porta de escuta')
+    parser.add_argument('--benchmark', action='store_true', help='mede vazão e latência em vez de servir')
+    parser.add_argument('--clientes', type=int, default=8, help='clientes simultâneos do benchmark')
+    parser.add_argument('--requisicoes', type=int, default=2000, help='requisições das rodadas do benchmark')
+    parser.add_argument('--saida', help='arquivo JSON com os resultados do benchmark')
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        documento = benchmark(args.csv, args.destino, args.clientes, args.requisicoes)
+        if args.saida:
+            with open(args.saida, 'w', encoding='utf-8') as f:
+                json.dump(documento, f, ensure_ascii=False, indent=2)
+            print(f"resultados -> {args.saida}")
+        return 1 if any(r['erros'] for r in documento['rodadas'].values()) else 0
+
+    servidor = criar_servidor(args.csv, args.destino, args.host, args.porta, registrar=True)
+    print(f"API em http://{args.host}:{servidor.server_address[1]}/ufs")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
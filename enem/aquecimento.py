@@ -0,0 +1,316 @@
+"""Aquecimento do cache de resultados em segundo plano.
+
+Depois de um deploy, o primeiro usuário a escolher cada UF pagaria o cálculo
+inteiro das seções. Depois da primeira renderização, o dashboard inicia
+(`iniciar`, uma vez por versão dos dados no processo) uma thread que calcula,
+em ordem de prioridade, os resultados de cada aba para o Brasil e para cada
+UF e os recortes do explorador, e os guarda no cache de resultados
+compartilhado (`enem.resultados`) sob as mesmas chaves do `em_cache` do
+dashboard. Uma thread (e não um pool de processos) porque o cache é do
+processo: os resultados precisam ficar na memória que as sessões consultam.
+
+A prioridade vem do registro de acessos persistido
+(`.enem_cache/acessos.json`, somado pelos processos do dashboard em segundo
+plano): as UFs e os filtros do explorador mais pedidos vêm primeiro; sem
+histórico, as UFs com mais candidatos.
+"""
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from .resultados import cache_resultados, chave_resultado, normalizar_filtros
+
+ARQUIVO_ACESSOS = os.path.join('.enem_cache', 'acessos.json')
+
+# Segundos de acessos juntados em cada gravação do registro
+INTERVALO_GRAVACAO = float(os.environ.get('ENEM_INTERVALO_ACESSOS', 2))
+
+# Combinações do explorador mais pedidas que são aquecidas (além do padrão de cada UF)
+LIMITE_EXPLORADOR = 20
+
+
+@contextmanager
+def _trava_arquivo(caminho):
+    """Trava exclusiva entre processos sobre o arquivo `caminho`."""
+    with open(caminho, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class RegistroAcessos:
+    """Contagem persistida dos recortes pedidos, por edição e tipo ('uf' ou 'explorador').
+
+    `registrar` só soma em memória: uma thread do processo grava os
+    incrementos acumulados, relendo o arquivo e somando a ele sob uma trava
+    entre processos, para que os vários processos do dashboard não apaguem
+    as contagens uns dos outros. A renderização nunca espera o disco.
+    """
+
+    def __init__(self, caminho=ARQUIVO_ACESSOS, intervalo=INTERVALO_GRAVACAO):
+        self.caminho = caminho
+        self.intervalo = intervalo
+        self._trava = threading.Lock()
+        self._contagens = None
+        self._pendentes = {}
+        self._aviso = threading.Event()
+        self._gravador = None
+
+    def _carregar(self):
+        if self._contagens is None:
+            self._contagens = self._ler()
+        return self._contagens
+
+    def _ler(self):
+        try:
+            with open(self.caminho, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _somar(contagens, incrementos):
+        for (ano, tipo, chave), n in incrementos.items():
+            destino = contagens.setdefault(ano, {}).setdefault(tipo, {})
+            destino[chave] = destino.get(chave, 0) + n
+
+    def registrar(self, ano, tipo, filtros):
+        chave = (str(ano), tipo, json.dumps(normalizar_filtros(filtros), ensure_ascii=False))
+        with self._trava:
+            self._somar(self._carregar(), {chave: 1})
+            self._pendentes[chave] = self._pendentes.get(chave, 0) + 1
+            if self._gravador is None:
+                self._gravador = threading.Thread(target=self._gravar_em_segundo_plano, name='enem-acessos', daemon=True)
+                self._gravador.start()
+                atexit.register(self.gravar)
+        self._aviso.set()
+
+    def _gravar_em_segundo_plano(self):
+        while True:
+            self._aviso.wait()
+            # Junta os acessos de alguns segundos em uma só gravação
+            time.sleep(self.intervalo)
+            self._aviso.clear()
+            try:
+                self.gravar()
+            except OSError as erro:
+                print(f'registro de acessos não gravado: {erro}', file=sys.stderr)
+
+    def gravar(self):
+        """Soma os acessos pendentes ao arquivo (relido sob a trava entre processos)."""
+        with self._trava:
+            pendentes, self._pendentes = self._pendentes, {}
+        if not pendentes:
+            return
+        pasta = os.path.dirname(self.caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        try:
+            with _trava_arquivo(self.caminho + '.lock'):
+                contagens = self._ler()
+                self._somar(contagens, pendentes)
+                temporario = self.caminho + '.tmp'
+                with open(temporario, 'w', encoding='utf-8') as f:
+                    json.dump(contagens, f, ensure_ascii=False)
+                os.replace(temporario, self.caminho)
+        except OSError:
+            # Voltam para a próxima gravação
+            with self._trava:
+                for chave, n in pendentes.items():
+                    self._pendentes[chave] = self._pendentes.get(chave, 0) + n
+            raise
+        with self._trava:
+            # O arquivo traz os acessos dos demais processos; os pedidos
+            # durante a gravação continuam pendentes
+            self._somar(contagens, self._pendentes)
+            self._contagens = contagens
+
+    def mais_pedidos(self, ano, tipo):
+        """[(filtros, acessos)] de `tipo` na edição `ano`, do mais ao menos pedido."""
+        with self._trava:
+            contagens = dict(self._carregar().get(str(ano), {}).get(tipo, {}))
+        ordenadas = sorted(contagens.items(), key=lambda item: -item[1])
+        return [(dict(json.loads(chave)), n) for chave, n in ordenadas]
+
+
+# Único por processo, como o cache de resultados
+registro_acessos = RegistroAcessos()
+
+
+# -------------------- Prioridade --------------------
+
+def ordem_ufs(linhas_uf, acessos, ano):
+    """'Todos' e as UFs, das mais às menos pedidas; empates pelas com mais candidatos."""
+    pedidos = {filtros.get('SG_UF_PROVA', 'Todos'): n for filtros, n in acessos.mais_pedidos(ano, 'uf')}
+    tamanhos = {'Todos': sum(linhas_uf.values()), **linhas_uf}
+    return sorted(tamanhos, key=lambda uf: (-pedidos.get(uf, 0), -tamanhos[uf]))
+
+
+def filtros_explorador(ufs, acessos, ano, limite=LIMITE_EXPLORADOR):
+    """Recortes do explorador a aquecer: os mais pedidos e depois o padrão de cada UF."""
+    candidatos = [filtros for filtros, _ in acessos.mais_pedidos(ano, 'explorador')[:limite]]
+    candidatos += [{} if uf == 'Todos' else {'SG_UF_PROVA': uf} for uf in ufs]
+    unicos = {}
+    for filtros in candidatos:
+        unicos.setdefault(normalizar_filtros(filtros), filtros)
+    return list(unicos.values())
+
+
+# -------------------- Tarefas --------------------
+
+def _obter(versao, filtros, funcao, *args):
+    return cache_resultados.obter(chave_resultado(versao, funcao, filtros), lambda: funcao(*args))
+
+
+def aquecer_uf(versao, consultas, cubo, estatisticas, uf):
+    """Resultados das abas do dashboard para `uf` ('Todos' para o Brasil).
+
+    Repete as chamadas de `em_cache` das seções do dashboard (mesmas funções
+    e filtros, portanto as mesmas chaves).
+    """
+    from . import secoes
+
+    filtro = {} if uf == 'Todos' else {'SG_UF_PROVA': uf}
+    colunas = consultas.colunas
+    _obter(versao, filtro, secoes.figura_genero, consultas, filtro, uf)
+    if 'COR/RACA' in colunas:
+        _obter(versao, filtro, secoes.figura_cor_raca, consultas, filtro, uf)
+    if 'RENDA' in colunas:
+        df_line = _obter(versao, filtro, secoes.mediana_por_renda, cubo, filtro)
+        if not df_line.empty:
+            _obter(versao, filtro, secoes.figura_renda, df_line)
+    if 'ACESSO_COMPUTADOR' in colunas and 'ACESSO_INTERNET' in colunas:
+        _obter(versao, filtro, secoes.figura_computador, consultas, filtro, uf)
+        _obter(versao, filtro, secoes.figura_internet, consultas, filtro, uf)
+        if 'RENDA' in colunas:
+            tabela = _obter(versao, filtro, secoes.tabela_computador_renda, consultas, filtro)
+            if tabela is not None:
+                _obter(versao, filtro, secoes.figura_computador_renda, tabela)
+        if 'NOTA_MEDIA' in colunas:
+            _obter(versao, filtro, secoes.figura_desempenho_internet, cubo, filtro)
+        _obter(versao, filtro, secoes.metricas_digitais, estatisticas, filtro)
+    if 'NU_NOTA_MT' in colunas and 'SEXO' in colunas:
+        _obter(versao, filtro, secoes.figura_matematica_genero, consultas, filtro)
+    df_faltas = _obter(versao, filtro, secoes.faltantes_por_area, consultas, filtro)
+    if df_faltas is not None:
+        _obter(versao, filtro, secoes.figura_faltantes, df_faltas, uf)
+
+
+def aquecer_explorador(versao, consultas, cubo, filtros):
+    """Resumo do cubo e figuras do explorador para `filtros`."""
+    from . import secoes
+
+    resumo = _obter(versao, filtros, cubo.agregar, filtros)
+    if resumo['n'] == 0:
+        return
+    if all(col in consultas.colunas for col in secoes.AREAS_NOTAS.values()):
+        _obter(versao, filtros, secoes.figura_areas, consultas, filtros)
+    _obter(versao, filtros, secoes.figura_histograma_media, resumo)
+
+
+# -------------------- Execução --------------------
+
+class Aquecimento:
+    """Thread que executa as tarefas [(rótulo, função)] em ordem, até o fim ou até `parar()`."""
+
+    def __init__(self, versao, tarefas):
+        self.versao = versao
+        self.tarefas = tarefas
+        self.concluidas = 0
+        self.falhas = []
+        self.segundos = None
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._executar, name='enem-aquecimento', daemon=True)
+
+    def iniciar(self):
+        self._thread.start()
+        return self
+
+    def _executar(self):
+        inicio = time.perf_counter()
+        for rotulo, tarefa in self.tarefas:
+            if self._parar.is_set():
+                break
+            try:
+                tarefa()
+            except Exception as erro:
+                # Um recorte com problema não impede os demais; a página mostra o erro quando o pedir
+                self.falhas.append(f'{rotulo}: {erro!r}')
+            self.concluidas += 1
+        self.segundos = round(time.perf_counter() - inicio, 3)
+
+    def parar(self):
+        self._parar.set()
+
+    @property
+    def ativo(self):
+        return self._thread.is_alive()
+
+    def estado(self):
+        return {
+            'concluidas': self.concluidas,
+            'total': len(self.tarefas),
+            'ativo': self.ativo,
+            'segundos': self.segundos,
+            'falhas': list(self.falhas),
+        }
+
+
+# Aquecimento em curso (ou concluído) de cada CSV no processo
+_aquecimentos = {}
+_trava = threading.Lock()
+
+
+def iniciar(caminho_csv, destino=None, acessos=registro_acessos):
+    """Inicia o aquecimento dos dados de `caminho_csv`, uma vez por versão dos dados.
+
+    Se os dados mudaram, o aquecimento da versão anterior é interrompido.
+    Retorna o `Aquecimento`.
+    """
+    from .ingestao import (
+        ano_dados, carregar_consultas, carregar_cubo, carregar_estatisticas, linhas_por_uf, versao_dados,
+    )
+
+    versao, ano = versao_dados(caminho_csv, destino), ano_dados(caminho_csv, destino)
+    caminho = os.path.abspath(caminho_csv)
+    with _trava:
+        atual = _aquecimentos.get(caminho)
+        if atual is not None and atual.versao == versao:
+            return atual
+        if atual is not None:
+            atual.parar()
+
+        # Carregados na thread (já estão no cache do processo depois da primeira renderização)
+        dados = lambda: (
+            carregar_consultas(caminho_csv, destino),
+            carregar_cubo(caminho_csv, destino),
+            carregar_estatisticas(caminho_csv, destino),
+        )
+        ufs = ordem_ufs(linhas_por_uf(caminho_csv, destino), acessos, ano)
+        tarefas = [(f'UF {uf}', lambda uf=uf: aquecer_uf(versao, *dados(), uf)) for uf in ufs]
+        for filtros in filtros_explorador(ufs, acessos, ano):
+            tarefas.append((
+                f'explorador {normalizar_filtros(filtros)}',
+                lambda filtros=filtros: aquecer_explorador(versao, dados()[0], dados()[1], filtros),
+            ))
+        _aquecimentos[caminho] = Aquecimento(versao, tarefas).iniciar()
+        return _aquecimentos[caminho]
@@ -0,0 +1,278 @@
+"""Benchmark do dashboard sobre microdados sintéticos em várias escalas.
+
+Para cada tamanho (100 mil, 1 milhão, 3,3 milhões e 10 milhões de linhas por
+padrão) gera um CSV com `enem.sintetico` (reaproveitado entre execuções),
+converte-o com o ETL e executa as seções do dashboard sem o Streamlit, pelas
+mesmas funções de `enem.secoes`, incluindo a serialização das figuras para
+JSON que o `st.plotly_chart` faria. Cada tamanho roda em um processo novo,
+de modo que a carga é medida a frio e o pico de memória não se acumula.
+`--backend arrow` mede as consultas fora da memória (`enem.consultas`).
+
+    python -m enem.benchmark --linhas 100k 1M --saida resultados.json
+    python -m enem.benchmark --linhas 10M --backend arrow --saida arrow.json
+    python -m enem.benchmark --comparar antes.json depois.json
+
+O arquivo de resultados (JSON) guarda tempo de parede (mediana e mínimo das
+repetições) e pico de RSS de cada etapa, junto com o commit e as versões das
+bibliotecas, para comparar versões.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+from .consultas import BACKENDS
+from .instrumentacao import pico_rss_mb, reiniciar_pico_rss
+
+TAMANHOS = ['100k', '1M', '3.3M', '10M']
+
+# Variação acima da qual --comparar aponta regressão
+TOLERANCIA = 0.2
+
+_SUFIXOS = {'k': 1_000, 'm': 1_000_000}
+
+
+def linhas(texto):
+    """'100k', '3.3M' ou '250000' -> número de linhas."""
+    texto = str(texto).strip().lower()
+    if texto and texto[-1] in _SUFIXOS:
+        return int(round(float(texto[:-1]) * _SUFIXOS[texto[-1]]))
+    return int(texto)
+
+
+def _medir(funcao, repeticoes=1):
+    reiniciar_pico_rss()
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return {
+        'segundos': round(statistics.median(tempos), 6),
+        'segundos_min': round(min(tempos), 6),
+        'rss_pico_mb': pico_rss_mb(),
+    }
+
+
+# -------------------- Seções --------------------
+
+def _serializar(*figuras):
+    # O st.plotly_chart envia a figura ao navegador como JSON
+    return [fig.to_json() for fig in figuras]
+
+
+def _secoes():
+    """Etapas do dashboard, na ordem da página, como funções do contexto."""
+    from . import secoes
+    from .ingestao import ufs_disponiveis
+
+    def filtro_lateral(c):
+        ufs_disponiveis(c['csv'], c['destino'])
+        c['consultas'].n_linhas(c['filtro'])
+
+    def perfil(c):
+        consultas, filtro = c['consultas'], c['filtro']
+        _serializar(
+            secoes.figura_genero(consultas, filtro, c['uf']),
+            secoes.figura_cor_raca(consultas, filtro, c['uf']),
+        )
+
+    def linha_renda(c):
+        _serializar(secoes.figura_renda(secoes.mediana_por_renda(c['cubo'], c['filtro'])))
+
+    def divisao_digital(c):
+        consultas, filtro = c['consultas'], c['filtro']
+        figuras = [
+            secoes.figura_computador(consultas, filtro, c['uf']),
+            secoes.figura_internet(consultas, filtro, c['uf']),
+        ]
+        tabela = secoes.tabela_computador_renda(consultas, filtro)
+        if tabela is not None:
+            figuras.append(secoes.figura_computador_renda(tabela))
+        secoes.metricas_digitais(c['estatisticas'], filtro)
+        _serializar(*figuras)
+
+    def caixas(c):
+        _serializar(
+            secoes.figura_desempenho_internet(c['cubo'], c['filtro']),
+            secoes.figura_matematica_genero(c['consultas'], c['filtro']),
+        )
+
+    def faltantes(c):
+        df_faltas = secoes.faltantes_por_area(c['consultas'], c['filtro'])
+        _serializar(secoes.figura_faltantes(df_faltas, c['uf']))
+
+    def explorador(c):
+        resumo = c['cubo'].agregar(c['filtro'])
+        figuras = [secoes.figura_areas(c['consultas'], c['filtro'])]
+        if resumo['n']:
+            figuras.append(secoes.figura_histograma_media(resumo))
+            tabela = secoes.presenca_por_situacao(resumo, 'TP_PRESENCA_CN')
+            figuras.append(secoes.figura_presenca(tabela, 'TP_PRESENCA_CN'))
+        _serializar(*figuras)
+
+    return {
+        'filtro_lateral': filtro_lateral,
+        'perfil': perfil,
+        'linha_renda': linha_renda,
+        'divisao_digital': divisao_digital,
+        'caixas': caixas,
+        'faltantes': faltantes,
+        'explorador': explorador,
+    }
+
+
+# -------------------- Execução --------------------
+
+def _preparar(csv, destino, n_linhas, semente, processos):
+    """Gera o CSV (se ainda não existe) e converte-o. Roda em processo próprio."""
+    from . import etl, sintetico
+
+    registros = []
+    if not os.path.exists(csv):
+        registros.append({'etapa': 'geracao', **_medir(lambda: sintetico.gravar_csv(csv, n_linhas, semente))})
+    registros.append({
+        'etapa': 'conversao',
+        **_medir(lambda: etl.executar(csv, destino, processos, log=lambda *_: None)),
+    })
+    return registros
+
+
+def _executar_secoes(csv, destino, ufs, repeticoes, backend='pandas'):
+    """Carga a frio e seções do dashboard para cada UF. Roda em processo próprio."""
+    from .ingestao import carregar_consultas, carregar_cubo, carregar_estatisticas
+
+    contexto = {'csv': csv, 'destino': destino}
+
+    def carga():
+        contexto['consultas'] = carregar_consultas(csv, destino, backend)
+        contexto['cubo'] = carregar_cubo(csv, destino)
+        contexto['estatisticas'] = carregar_estatisticas(csv, destino)
+
+    registros = [{'etapa': 'carga', 'uf': None, **_medir(carga)}]
+    secoes = _secoes()
+    for uf in ufs:
+        contexto['uf'] = uf
+        contexto['filtro'] = {} if uf == 'Todos' else {'SG_UF_PROVA': uf}
+        for etapa, funcao in secoes.items():
+            registros.append({'etapa': etapa, 'uf': uf, **_medir(lambda: funcao(contexto), repeticoes)})
+    return registros
+
+
+def _em_processo_novo(funcao, *args):
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(funcao, *args).result()
+
+
+def _versao():
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=raiz, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _ambiente():
+    import numpy as np
+    import pandas as pd
+    import pyarrow as pa
+
+    return {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'pyarrow': pa.__version__,
+        'sistema': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def executar(tamanhos=TAMANHOS, dir_dados='.enem_cache/benchmark', uf='SP', repeticoes=3,
+             semente=0, processos=None, backend='pandas', log=print):
+    """Roda o benchmark para cada tamanho e retorna o documento de resultados."""
+    os.makedirs(dir_dados, exist_ok=True)
+    resultados = []
+    for tamanho in tamanhos:
+        n_linhas = linhas(tamanho)
+        csv = os.path.join(dir_dados, f'sintetico_{n_linhas}_{semente}.csv')
+        destino = os.path.join(dir_dados, f'sintetico_{n_linhas}_{semente}')
+        log(f"{n_linhas:,} linhas")
+        registros = _em_processo_novo(_preparar, csv, destino, n_linhas, semente, processos)
+        registros += _em_processo_novo(_executar_secoes, csv, destino, ['Todos', uf], repeticoes, backend)
+        for registro in registros:
+            registro = {'linhas': n_linhas, 'uf': None, **registro}
+            resultados.append(registro)
+            rotulo = registro['etapa'] + (f" ({registro['uf']})" if registro['uf'] else '')
+            log(f"  {rotulo:<28} {registro['segundos']:>9.3f}s  {registro['rss_pico_mb'] or 0:>9.1f} MB")
+    return {
+        'versao': _versao(),
+        'data': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'ambiente': _ambiente(),
+        'parametros': {
+            'semente': semente, 'repeticoes': repeticoes, 'uf': uf, 'processos': processos, 'backend': backend,
+        },
+        'resultados': resultados,
+    }
+
+
+def comparar(antes, depois, tolerancia=TOLERANCIA, log=print):
+    """Compara dois arquivos de resultados; retorna as etapas que ficaram mais lentas."""
+    chave = lambda r: (r['linhas'], r['etapa'], r['uf'])
+    anteriores = {chave(r): r for r in antes['resultados']}
+    regressoes = []
+    log(f"{antes.get('versao')} -> {depois.get('versao')}")
+    for r in depois['resultados']:
+        a = anteriores.get(chave(r))
+        if a is None or not a['segundos']:
+            continue
+        razao = r['segundos'] / a['segundos']
+        marca = ''
+        if razao > 1 + tolerancia:
+            marca = '  <- regressão'
+            regressoes.append({**r, 'razao': razao})
+        rotulo = f"{r['linhas']:>10,} {r['etapa']}" + (f" ({r['uf']})" if r['uf'] else '')
+        log(f"{rotulo:<40} {a['segundos']:>9.3f}s -> {r['segundos']:>9.3f}s  x{razao:.2f}{marca}")
+    return regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark das seções do dashboard com dados sintéticos.')
+    parser.add_argument('--linhas', nargs='+', default=TAMANHOS, help='tamanhos (ex.: 100k 1M 3.3M 10M)')
+    parser.add_argument('--dados', default='.enem_cache/benchmark', help='diretório dos CSVs sintéticos e conversões')
+    parser.add_argument('--uf', default='SP', help='UF usada nas medições com filtro (além de "Todos")')
+    parser.add_argument('--repeticoes', type=int, default=3, help='repetições de cada seção (vale a mediana)')
+    parser.add_argument('--semente', type=int, default=0, help='semente do gerador sintético')
+    parser.add_argument('--processos', type=int, help='processos do ETL (padrão: número de CPUs)')
+    parser.add_argument('--backend', default='pandas', choices=BACKENDS, help='consultas em memória ou fora dela')
+    parser.add_argument('--saida', default='benchmark.json', help='arquivo JSON de resultados')
+    parser.add_argument('--comparar', nargs=2, metavar=('ANTES', 'DEPOIS'), help='compara dois arquivos de resultados')
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA, help='variação aceita em --comparar (0.2 = 20%%)')
+    args = parser.parse_args(argv)
+
+    if args.comparar:
+        with open(args.comparar[0], encoding='utf-8') as f:
+            antes = json.load(f)
+        with open(args.comparar[1], encoding='utf-8') as f:
+            depois = json.load(f)
+        return 1 if comparar(antes, depois, args.tolerancia) else 0
+
+    documento = executar(
+        args.linhas, args.dados, args.uf, args.repeticoes, args.semente, args.processos, args.backend
+    )
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump(documento, f, ensure_ascii=False, indent=2)
+    print(f"resultados -> {args.saida}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
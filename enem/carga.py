@@ -0,0 +1,153 @@
+"""Teste de carga com sessões simultâneas do dashboard.
+
+Simula N sessões de um mesmo processo do servidor: cada sessão é uma thread
+que faz `--reruns` reruns, cada um com o filtro da barra lateral e a aba
+aberta (as etapas de `enem.benchmark`, com as figuras serializadas como no
+`st.plotly_chart`), trocando de UF e de aba em um ciclo que difere entre as
+sessões. As sessões começam juntas e compartilham os dados carregados no
+processo, como no servidor. O cache de resultados não é usado: todo rerun
+calcula as suas consultas, o pior caso.
+
+Para cada N, em um processo novo, o teste registra a latência dos reruns
+(mediana, p95 e máximo) e a memória do processo depois da carga dos dados e
+depois das sessões: RSS e a parte anônima (heap), que exclui as páginas dos
+dados mapeados em memória (`enem.compartilhado`), comuns a todos os
+processos que os abrem.
+
+    python -m enem.carga dados.csv --sessoes 1 2 4 8 16 --reruns 10 --saida carga.json
+    ENEM_COMPARTILHADO=0 python -m enem.carga dados.csv --sessoes 1 4 16 --saida copia.json
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from .benchmark import _ambiente, _em_processo_novo, _secoes, _versao
+from .consultas import BACKENDS
+from .instrumentacao import memoria_anonima_mb, pico_rss_mb, rss_mb
+
+SESSOES = [1, 2, 4, 8, 16]
+
+# Abas que um rerun pode ter abertas (o filtro lateral roda em todos)
+ABAS = ['perfil', 'linha_renda', 'divisao_digital', 'caixas', 'faltantes', 'explorador']
+
+
+def _sessao(indice, reruns, contexto, largada, latencias, erros):
+    """Uma sessão: `reruns` reruns trocando de UF e de aba."""
+    etapas = _secoes()
+    ufs = ['Todos'] + contexto['ufs']
+    largada.wait()
+    for i in range(reruns):
+        uf = ufs[(indice * 7 + i) % len(ufs)]
+        c = {
+            **contexto,
+            'uf': uf,
+            'filtro': {} if uf == 'Todos' else {'SG_UF_PROVA': uf},
+        }
+        inicio = time.perf_counter()
+        try:
+            etapas['filtro_lateral'](c)
+            etapas[ABAS[(indice + i) % len(ABAS)]](c)
+        except Exception as erro:
+            erros.append(repr(erro))
+        latencias.append(time.perf_counter() - inicio)
+
+
+def _percentil(valores, p):
+    return round(float(np.percentile(valores, p)), 4) if valores else None
+
+
+def _executar(csv, destino, n_sessoes, reruns, backend):
+    """Carga dos dados e N sessões simultâneas. Roda em processo próprio."""
+    from .ingestao import carregar_consultas, carregar_cubo, carregar_estatisticas, ufs_disponiveis
+
+    inicio = time.perf_counter()
+    contexto = {
+        'csv': csv,
+        'destino': destino,
+        'consultas': carregar_consultas(csv, destino, backend),
+        'cubo': carregar_cubo(csv, destino),
+        'estatisticas': carregar_estatisticas(csv, destino),
+        'ufs': ufs_disponiveis(csv, destino),
+    }
+    registro = {
+        'sessoes': n_sessoes,
+        'carga_segundos': round(time.perf_counter() - inicio, 3),
+        'carga_rss_mb': rss_mb(),
+        'carga_anonima_mb': memoria_anonima_mb(),
+    }
+
+    latencias, erros = [], []
+    largada = threading.Barrier(n_sessoes)
+    threads = [
+        threading.Thread(target=_sessao, args=(i, reruns, contexto, largada, latencias, erros))
+        for i in range(n_sessoes)
+    ]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    registro.update({
+        'reruns': len(latencias),
+        'segundos': round(time.perf_counter() - inicio, 3),
+        'rerun_p50': _percentil(latencias, 50),
+        'rerun_p95': _percentil(latencias, 95),
+        'rerun_max': _percentil(latencias, 100),
+        'rss_mb': rss_mb(),
+        'anonima_mb': memoria_anonima_mb(),
+        'rss_pico_mb': pico_rss_mb(),
+        'erros': erros,
+    })
+    return registro
+
+
+def executar(csv, destino=None, sessoes=SESSOES, reruns=10, backend='pandas', log=print):
+    """Roda o teste para cada número de sessões e retorna o documento de resultados."""
+    resultados = []
+    log(f"{'sessões':>7} {'p50':>8} {'p95':>8} {'máx':>8} {'RSS':>9} {'anônima':>9} {'(após a carga)':>16}")
+    for n in sessoes:
+        r = _em_processo_novo(_executar, csv, destino, n, reruns, backend)
+        resultados.append(r)
+        log(f"{n:>7} {r['rerun_p50']:>7.3f}s {r['rerun_p95']:>7.3f}s {r['rerun_max']:>7.3f}s "
+            f"{r['rss_mb'] or 0:>6.0f} MB {r['anonima_mb'] or 0:>6.0f} MB "
+            f"{r['carga_rss_mb'] or 0:>6.0f} / {r['carga_anonima_mb'] or 0:.0f} MB"
+            + (f"  {len(r['erros'])} erro(s): {r['erros'][0]}" if r['erros'] else ''))
+    return {
+        'versao': _versao(),
+        'data': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'ambiente': _ambiente(),
+        'parametros': {
+            'csv': csv,
+            'reruns': reruns,
+            'backend': backend,
+            'compartilhado': os.environ.get('ENEM_COMPARTILHADO', '1') != '0',
+        },
+        'resultados': resultados,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Teste de carga com sessões simultâneas do dashboard.')
+    parser.add_argument('csv', help='CSV de origem (já convertido ou a converter)')
+    parser.add_argument('--destino', help='diretório dos dados convertidos (padrão: .enem_cache/<nome>)')
+    parser.add_argument('--sessoes', nargs='+', type=int, default=SESSOES, help='números de sessões simultâneas')
+    parser.add_argument('--reruns', type=int, default=10, help='reruns de cada sessão')
+    parser.add_argument('--backend', default='pandas', choices=BACKENDS, help='consultas em memória ou fora dela')
+    parser.add_argument('--saida', default='carga.json', help='arquivo JSON de resultados')
+    args = parser.parse_args(argv)
+
+    documento = executar(args.csv, args.destino, args.sessoes, args.reruns, args.backend)
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump(documento, f, ensure_ascii=False, indent=2)
+    print(f"resultados -> {args.saida}")
+    return 1 if any(r['erros'] for r in documento['resultados']) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
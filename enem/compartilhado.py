@@ -0,0 +1,96 @@
+"""Dataset somente leitura compartilhado por memory map.
+
+O Feather convertido é comprimido e dividido em lotes, então lê-lo com o
+pandas cria uma cópia do dataset inteiro no heap de cada processo do
+servidor. Na conversão, cada coluna também é gravada como um array NumPy
+(`.npy`) sem compressão: os códigos das categorias ou os valores das notas,
+com os tipos (categorias e ordem) descritos em `colunas.json` ao lado.
+
+`abrir_colunas` monta o DataFrame do dashboard sobre esses arquivos mapeados
+em memória, sem cópia: as páginas vêm do cache de páginas do sistema
+operacional, são carregadas sob demanda e são as mesmas para todas as
+sessões e processos que abrem os mesmos dados. Os arrays são somente
+leitura; com o copy-on-write do pandas, qualquer modificação cria uma cópia
+local em vez de alterar os dados compartilhados.
+"""
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+DIRETORIO_COLUNAS = 'colunas'
+ARQUIVO_DESCRICAO = 'colunas.json'
+
+
+def _arquivo_coluna(pasta, i):
+    # Pelo índice: há nomes de coluna com '/' (COR/RACA)
+    return os.path.join(pasta, f'{i:03d}.npy')
+
+
+def gravar_colunas(caminho_dados, destino):
+    """Grava as colunas do arquivo convertido `caminho_dados` como arrays `.npy`.
+
+    As colunas são lidas uma a uma (a memória usada é a de uma coluna). São
+    aceitas as colunas categóricas e numéricas do esquema.
+    """
+    pasta = os.path.join(destino, DIRETORIO_COLUNAS)
+    temporario = pasta + '.tmp'
+    shutil.rmtree(temporario, ignore_errors=True)
+    os.makedirs(temporario)
+    nomes = pa.ipc.open_file(pa.memory_map(caminho_dados)).schema.names
+    descricao = []
+    for i, nome in enumerate(nomes):
+        serie = pd.read_feather(caminho_dados, columns=[nome])[nome]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            valores = serie.cat.codes.to_numpy()
+            descricao.append({
+                'nome': nome,
+                'categorias': serie.cat.categories.tolist(),
+                'ordenada': bool(serie.cat.ordered),
+            })
+        elif pd.api.types.is_numeric_dtype(serie.dtype):
+            valores = serie.to_numpy()
+            descricao.append({'nome': nome})
+        else:
+            raise ValueError(f'coluna {nome} ({serie.dtype}) não pode ser mapeada em memória')
+        np.save(_arquivo_coluna(temporario, i), valores)
+    with open(os.path.join(temporario, ARQUIVO_DESCRICAO), 'w', encoding='utf-8') as f:
+        json.dump(descricao, f, ensure_ascii=False)
+    # Processos com a versão anterior mapeada continuam lendo os arquivos antigos
+    shutil.rmtree(pasta, ignore_errors=True)
+    os.replace(temporario, pasta)
+
+
+def colunas_gravadas(destino):
+    return os.path.exists(os.path.join(destino, DIRETORIO_COLUNAS, ARQUIVO_DESCRICAO))
+
+
+def abrir_colunas(destino):
+    """DataFrame sobre as colunas mapeadas em memória, sem cópia e somente leitura."""
+    pasta = os.path.join(destino, DIRETORIO_COLUNAS)
+    with open(os.path.join(pasta, ARQUIVO_DESCRICAO), encoding='utf-8') as f:
+        descricao = json.load(f)
+    colunas = {}
+    for i, coluna in enumerate(descricao):
+        valores = np.load(_arquivo_coluna(pasta, i), mmap_mode='r')
+        # ndarray comum sobre o mesmo mapeamento (o memmap continua vivo como base)
+        valores = valores.view(np.ndarray)
+        if 'categorias' in coluna:
+            dtype = pd.CategoricalDtype(pd.Index(coluna['categorias']), ordered=coluna['ordenada'])
+            valores = pd.Categorical.from_codes(valores, dtype=dtype, validate=False)
+        colunas[coluna['nome']] = pd.Series(valores, name=coluna['nome'], copy=False)
+    return pd.DataFrame(colunas, copy=False)
+
+
+def mapeado(df):
+    """Se todas as colunas de `df` estão sobre arrays mapeados (e não no heap)."""
+    for _, serie in df.items():
+        base = serie.array.codes if isinstance(serie.dtype, pd.CategoricalDtype) else serie.to_numpy()
+        while isinstance(base, np.ndarray) and not isinstance(base, np.memmap):
+            base = base.base
+        if not isinstance(base, np.memmap):
+            return False
+    return True
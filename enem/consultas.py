@@ -0,0 +1,344 @@
+"""Consultas do dashboard sobre os dados convertidos, em memória ou fora dela.
+
+As seções (`enem.secoes`) não manipulam o DataFrame: pedem contagens, tabelas
+de contingência e histogramas a um objeto de consultas, com filtros no formato
+{dimensão: valor}. Há duas implementações com a mesma interface:
+
+- `ConsultasPandas` responde sobre o DataFrame carregado em memória (o caminho
+  original do dashboard, com as fatias por UF e o índice de bitmaps);
+- `ConsultasArrow` lê o arquivo Feather por memory map, lote a lote e só com
+  as colunas de cada consulta, sem nunca carregar o dataset inteiro; o
+  intervalo da UF no manifesto limita os lotes lidos. Só as contagens (poucas
+  linhas) viram objetos do pandas.
+
+Uma terceira, `enem.amostra.ConsultasAmostra`, estima as mesmas respostas
+por uma amostra estratificada (`aproximada = True`).
+
+As tabelas de contingência (`contingencia`, e `tabela_cruzada` para duas
+colunas) cruzam os códigos das categorias com `enem.contingencia`.
+
+Todas as respostas são contagens inteiras (médias e quantis saem dos
+histogramas de `enem.quantis`), então as duas implementações devem coincidir
+exatamente. A conferência percorre todas as UFs e alguns filtros combinados:
+
+    python -m enem.consultas dados.csv
+"""
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from .contingencia import Contingencia, contar, validar_dimensoes
+from .quantis import Histograma, bins, contar_bins, n_bins, passo_de, por_grupo, separar
+from .resultados import normalizar_filtros
+
+BACKENDS = ['pandas', 'arrow']
+
+
+def _indice_categorico(codigos, dtype, nome):
+    return pd.CategoricalIndex(pd.Categorical.from_codes(codigos, dtype=dtype), name=nome)
+
+
+# -------------------- Em memória (pandas) --------------------
+
+class ConsultasPandas:
+    """Consultas sobre o DataFrame carregado.
+
+    `particoes` ({uf: [início, fim)}) e `indice` (`IndiceFiltros`) são
+    opcionais e só aceleram a seleção das linhas.
+    """
+
+    backend = 'pandas'
+    aproximada = False
+
+    def __init__(self, df, particoes=None, indice=None):
+        self.df = df
+        self.particoes = particoes
+        self.indice = indice
+
+    @property
+    def colunas(self):
+        return self.df.columns.tolist()
+
+    def selecionar(self, filtros=None):
+        """Linhas que atendem a `filtros` ('Todos' e `None` não restringem)."""
+        filtros = dict(normalizar_filtros(filtros))
+        if not filtros:
+            return self.df
+        if list(filtros) == ['SG_UF_PROVA'] and self.particoes is not None:
+            inicio, fim = self.particoes.get(filtros['SG_UF_PROVA'], (0, 0))
+            return self.df.iloc[inicio:fim]
+        if self.indice is not None and all(dim in self.indice.dimensoes for dim in filtros):
+            return self.indice.selecionar(self.df, filtros)
+        mascara = np.ones(len(self.df), dtype=bool)
+        for dim, valor in filtros.items():
+            mascara &= (self.df[dim] == valor).to_numpy()
+        return self.df[mascara]
+
+    def n_linhas(self, filtros=None):
+        return len(self.selecionar(filtros))
+
+    def contar(self, coluna, filtros=None):
+        """Contagem por categoria de `coluna`, na ordem das categorias, com os
+        ausentes (NaN) ao final quando existem."""
+        return self.selecionar(filtros)[coluna].value_counts(sort=False, dropna=False)
+
+    def contingencia(self, dimensoes, filtros=None):
+        """Contagens de cada combinação das categorias de 2 ou 3 `dimensoes` (`Contingencia`)."""
+        validar_dimensoes(dimensoes)
+        df = self.selecionar(filtros)
+        dtypes = [df[dim].dtype for dim in dimensoes]
+        codigos = [df[dim].array.codes for dim in dimensoes]
+        return Contingencia(dimensoes, dtypes, contar(codigos, [len(t.categories) for t in dtypes]))
+
+    def tabela_cruzada(self, linhas, colunas, filtros=None):
+        """Contagens de `linhas` × `colunas` com todas as categorias das duas."""
+        return self.contingencia([linhas, colunas], filtros).tabela()
+
+    def histogramas_por(self, grupo, valor, filtros=None, passo=None):
+        """Histogramas de `valor` para cada categoria observada de `grupo`.
+
+        Sem `passo`, usa a grade exata da coluna (`quantis.passo_de`).
+        """
+        df = self.selecionar(filtros)
+        return por_grupo(df[grupo], df[valor], passo or passo_de(valor))
+
+    def histogramas(self, colunas, filtros=None, passo=None):
+        """Histograma de cada coluna de nota em `colunas`."""
+        df = self.selecionar(filtros)
+        return {col: Histograma.de_valores(df[col], passo or passo_de(col)) for col in colunas}
+
+
+# -------------------- Fora da memória (Arrow) --------------------
+
+class ConsultasArrow:
+    """Consultas lendo o arquivo Arrow IPC (Feather) lote a lote por memory map.
+
+    Cada consulta abre o arquivo só com as colunas que usa; os códigos das
+    categorias são acumulados com `np.bincount`, lote por lote, de modo que a
+    memória usada é a de um lote e não a do dataset.
+    """
+
+    backend = 'arrow'
+    aproximada = False
+
+    def __init__(self, caminho, particoes=None):
+        self.caminho = caminho
+        self.particoes = particoes
+        self._mapa = pa.memory_map(caminho)
+        leitor = pa.ipc.open_file(self._mapa)
+        self.schema = leitor.schema
+        # Tipos do pandas (categorias e ordem); as categorias vêm nos dicionários dos lotes
+        amostra = leitor.get_batch(0).slice(0, 0) if leitor.num_record_batches else self.schema.empty_table()
+        self._dtypes = amostra.to_pandas().dtypes
+        leitor = pa.ipc.open_file(self._mapa, options=self._opcoes([0]))
+        self._limites = []
+        inicio = 0
+        for i in range(leitor.num_record_batches):
+            fim = inicio + leitor.get_batch(i).num_rows
+            self._limites.append((inicio, fim))
+            inicio = fim
+        self.total = inicio
+
+    @staticmethod
+    def _opcoes(campos):
+        return pa.ipc.IpcReadOptions(included_fields=campos)
+
+    @property
+    def colunas(self):
+        return self.schema.names
+
+    def _categorias(self, coluna):
+        return self._dtypes[coluna].categories
+
+    def _numpy(self, coluna, array):
+        """Códigos nas categorias do esquema (-1 para ausentes) ou valores com NaN."""
+        if pa.types.is_dictionary(array.type):
+            # Posição de cada valor do dicionário do lote nas categorias do esquema
+            tabela = np.append(self._categorias(coluna).get_indexer(array.dictionary.to_pandas()), -1)
+            return tabela[array.indices.fill_null(-1).to_numpy()]
+        return array.to_numpy(zero_copy_only=False)
+
+    def _codigo(self, dim, valor):
+        try:
+            return self._categorias(dim).get_loc(valor)
+        except KeyError:
+            # Valor fora do domínio: nenhum código (>= -1) coincide
+            return -2
+
+    def _intervalo(self, filtros):
+        """Intervalo de linhas [início, fim) e filtros que ainda precisam de máscara."""
+        uf = filtros.get('SG_UF_PROVA')
+        if uf is None or self.particoes is None:
+            return (0, self.total), filtros
+        restantes = {dim: valor for dim, valor in filtros.items() if dim != 'SG_UF_PROVA'}
+        return tuple(self.particoes.get(uf, (0, 0))), restantes
+
+    def lotes(self, colunas, filtros=None):
+        """Gera, lote a lote, {coluna: array numpy} das linhas selecionadas."""
+        (inicio, fim), filtros = self._intervalo(dict(normalizar_filtros(filtros)))
+        necessarias = list(dict.fromkeys([*colunas, *filtros]))
+        leitor = pa.ipc.open_file(
+            self._mapa, options=self._opcoes([self.schema.get_field_index(c) for c in necessarias])
+        )
+        codigos = {dim: self._codigo(dim, valor) for dim, valor in filtros.items()}
+        for i, (inicio_lote, fim_lote) in enumerate(self._limites):
+            a, b = max(inicio, inicio_lote), min(fim, fim_lote)
+            if a >= b:
+                continue
+            lote = leitor.get_batch(i).slice(a - inicio_lote, b - a)
+            arrays = {col: self._numpy(col, lote.column(col)) for col in necessarias}
+            if codigos:
+                mascara = np.ones(b - a, dtype=bool)
+                for dim, codigo in codigos.items():
+                    mascara &= arrays[dim] == codigo
+                arrays = {col: v[mascara] for col, v in arrays.items()}
+            yield arrays
+
+    def n_linhas(self, filtros=None):
+        (inicio, fim), restantes = self._intervalo(dict(normalizar_filtros(filtros)))
+        if not restantes:
+            return max(fim - inicio, 0)
+        dim = next(iter(restantes))
+        return sum(len(arrays[dim]) for arrays in self.lotes([], filtros))
+
+    def contar(self, coluna, filtros=None):
+        dtype = self._dtypes[coluna]
+        k = len(dtype.categories)
+        # Posição 0 conta os ausentes (código -1)
+        contagens = np.zeros(k + 1, dtype=np.int64)
+        for arrays in self.lotes([coluna], filtros):
+            contagens += np.bincount(arrays[coluna] + 1, minlength=k + 1)
+        codigos, valores = np.arange(k), contagens[1:]
+        if contagens[0]:
+            codigos, valores = np.append(codigos, -1), np.append(valores, contagens[0])
+        return pd.Series(valores, index=_indice_categorico(codigos, dtype, coluna), name='count')
+
+    def contingencia(self, dimensoes, filtros=None):
+        validar_dimensoes(dimensoes)
+        dtypes = [self._dtypes[dim] for dim in dimensoes]
+        tamanhos = [len(t.categories) for t in dtypes]
+        contagens = np.zeros(tamanhos, dtype=np.int64)
+        for arrays in self.lotes(dimensoes, filtros):
+            contagens += contar([arrays[dim] for dim in dimensoes], tamanhos)
+        return Contingencia(dimensoes, dtypes, contagens)
+
+    def tabela_cruzada(self, linhas, colunas, filtros=None):
+        return self.contingencia([linhas, colunas], filtros).tabela()
+
+    def histogramas_por(self, grupo, valor, filtros=None, passo=None):
+        passo = passo or passo_de(valor)
+        categorias = self._categorias(grupo)
+        nb = n_bins(passo)
+        tamanho = len(categorias) * nb
+        # Contagens esparsas de cada lote, somadas no fim
+        chaves, contagens = [], []
+        observados = np.zeros(len(categorias), dtype=np.int64)
+        for arrays in self.lotes([grupo, valor], filtros):
+            codigos, valores = arrays[grupo].astype(np.int64), arrays[valor].astype(np.float64)
+            validos = (codigos >= 0) & ~np.isnan(valores)
+            ocupadas, quantidades = contar_bins(codigos[validos] * nb + bins(valores[validos], passo), tamanho)
+            chaves.append(ocupadas)
+            contagens.append(quantidades)
+            observados += np.bincount(codigos[codigos >= 0], minlength=len(categorias))
+        histogramas = separar(
+            *contar_bins(np.concatenate(chaves or [np.array([], dtype=np.int64)]), tamanho,
+                    np.concatenate(contagens or [np.array([])]).astype(np.float64)),
+            len(categorias), passo,
+        )
+        return {
+            categoria: histogramas[i]
+            for i, categoria in enumerate(categorias)
+            if observados[i]
+        }
+
+    def histogramas(self, colunas, filtros=None, passo=None):
+        passos = {col: passo or passo_de(col) for col in colunas}
+        partes = {col: [] for col in colunas}
+        for arrays in self.lotes(colunas, filtros):
+            for col in colunas:
+                partes[col].append(Histograma.de_valores(arrays[col], passos[col]))
+        return {col: sum(partes[col], Histograma.vazio(passos[col])) for col in colunas}
+
+
+# -------------------- Conferência entre as implementações --------------------
+
+def _histogramas_iguais(a, b):
+    return list(a) == list(b) and all(
+        a[k].passo == b[k].passo
+        and np.array_equal(a[k].indices, b[k].indices)
+        and np.array_equal(a[k].quantidades, b[k].quantidades)
+        for k in a
+    )
+
+
+def consultas_de_conferencia(consultas):
+    """Consultas feitas pelas seções do dashboard: (nome, função)."""
+    from .secoes import AREAS_NOTAS
+
+    colunas = consultas.colunas
+    pedidos = [('n_linhas', lambda c, f: c.n_linhas(f))]
+    for col in ['SEXO', 'COR/RACA', 'ACESSO_COMPUTADOR', 'ACESSO_INTERNET',
+                'TP_PRESENCA_CN', 'TP_PRESENCA_CH', 'TP_PRESENCA_LC', 'TP_PRESENCA_MT']:
+        if col in colunas:
+            pedidos.append((f'contar {col}', lambda c, f, col=col: c.contar(col, f)))
+    if 'RENDA' in colunas and 'ACESSO_COMPUTADOR' in colunas:
+        pedidos.append(('tabela_cruzada RENDA x ACESSO_COMPUTADOR',
+                        lambda c, f: c.tabela_cruzada('RENDA', 'ACESSO_COMPUTADOR', f)))
+    if all(col in colunas for col in ['Q001', 'TP_ESCOLA', 'RENDA']):
+        pedidos.append(('contingencia Q001 x TP_ESCOLA x RENDA',
+                        lambda c, f: c.contingencia(['Q001', 'TP_ESCOLA', 'RENDA'], f).contagens))
+    for grupo, valor in [('SEXO', 'NU_NOTA_MT'), ('ACESSO_INTERNET', 'NOTA_MEDIA')]:
+        if grupo in colunas and valor in colunas:
+            pedidos.append((f'histogramas_por {grupo} {valor}',
+                            lambda c, f, g=grupo, v=valor: c.histogramas_por(g, v, f)))
+    areas = [col for col in AREAS_NOTAS.values() if col in colunas]
+    pedidos.append(('histogramas áreas', lambda c, f: c.histogramas(areas, f)))
+    return pedidos
+
+
+def conferir(a, b, filtros_lista, log=print):
+    """Compara as respostas de duas implementações; retorna as divergências."""
+    divergencias = []
+    for filtros in filtros_lista:
+        for nome, consulta in consultas_de_conferencia(a):
+            ra, rb = consulta(a, filtros), consulta(b, filtros)
+            if isinstance(ra, dict):
+                iguais = _histogramas_iguais(ra, rb)
+            elif isinstance(ra, (pd.Series, pd.DataFrame)):
+                iguais = ra.equals(rb) and ra.index.equals(rb.index)
+            elif isinstance(ra, np.ndarray):
+                iguais = np.array_equal(ra, rb)
+            else:
+                iguais = ra == rb
+            if not iguais:
+                divergencias.append({'filtros': filtros, 'consulta': nome})
+                log(f"  divergência: {nome} com {filtros}")
+    return divergencias
+
+
+def main(argv=None):
+    from .ingestao import carregar_consultas, ufs_disponiveis
+
+    parser = argparse.ArgumentParser(description='Confere as consultas do backend Arrow contra as do pandas.')
+    parser.add_argument('csv', help='CSV de origem (já convertido ou a converter)')
+    parser.add_argument('--destino', help='diretório dos dados convertidos (padrão: .enem_cache/<nome>)')
+    args = parser.parse_args(argv)
+
+    pandas_, arrow = (carregar_consultas(args.csv, args.destino, b) for b in BACKENDS)
+    ufs = ufs_disponiveis(args.csv, args.destino)
+    filtros_lista = [{}] + [{'SG_UF_PROVA': uf} for uf in ufs]
+    # Combinações que passam pela máscara por lote (além do intervalo da UF)
+    for uf in ufs[:3]:
+        filtros_lista.append({'SG_UF_PROVA': uf, 'SEXO': 'Feminino'})
+    filtros_lista += [{'RENDA': 'Nenhuma Renda'}, {'SEXO': 'Masculino', 'ACESSO_INTERNET': 'Não'}]
+    divergencias = conferir(pandas_, arrow, filtros_lista)
+    print(f"{len(filtros_lista)} filtros x {len(consultas_de_conferencia(pandas_))} consultas: "
+          f"{len(divergencias)} divergência(s)")
+    return 1 if divergencias else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""Tabelas de contingência sobre os códigos das categorias.
+
+As consultas (`enem.consultas`, `enem.amostra`) cruzam duas ou três colunas
+categóricas sem tocar nos rótulos: os códigos de cada coluna (0..k-1, -1
+para ausente) são combinados em um único inteiro,
+(c1 × k2 + c2) × k3 + c3, e contados com um `np.bincount`, bloco a bloco.
+Linhas com alguma dimensão ausente ficam de fora, como no `pd.crosstab`.
+
+`Contingencia` guarda as contagens de todas as combinações de categorias e
+as normaliza por linha, por coluna ou pelo total. Com três dimensões, a
+terceira separa camadas (uma tabela por categoria) e cada camada é
+normalizada por si.
+"""
+import numpy as np
+import pandas as pd
+
+from .mapas import mapa_celular, mapa_escola, mapa_escolaridade
+
+# Linhas por bloco na combinação dos códigos (limita os temporários int64)
+LOTE = 1_000_000
+
+# Dimensões do questionário oferecidas no cruzamento livre do dashboard. As
+# respostas já decodificadas na conversão (RENDA = Q006, ACESSO_COMPUTADOR =
+# Q024, ACESSO_INTERNET = Q025, COR/RACA = TP_COR_RACA) têm os mesmos códigos.
+DIMENSOES = {
+    'Q001': 'Escolaridade do pai',
+    'Q002': 'Escolaridade da mãe',
+    'RENDA': 'Renda familiar',
+    'Q022': 'Celulares na residência',
+    'ACESSO_COMPUTADOR': 'Computador na residência',
+    'ACESSO_INTERNET': 'Internet na residência',
+    'TP_ESCOLA': 'Tipo de escola',
+    'COR/RACA': 'Cor/raça',
+    'SG_UF_PROVA': 'UF da prova',
+}
+
+# Rótulos das colunas que continuam com os códigos do INEP
+ROTULOS = {
+    'Q001': mapa_escolaridade,
+    'Q002': mapa_escolaridade,
+    'Q022': mapa_celular,
+    'TP_ESCOLA': mapa_escola,
+}
+
+NORMALIZACOES = {
+    None: 'Contagens',
+    'linha': 'Percentual na linha',
+    'coluna': 'Percentual na coluna',
+    'total': 'Percentual do total',
+}
+
+
+def codigo_combinado(codigos, tamanhos):
+    """Código único de cada linha para a combinação de `codigos` (-1 se algum é ausente)."""
+    combinado = np.zeros(len(codigos[0]), dtype=np.int64)
+    validos = np.ones(len(codigos[0]), dtype=bool)
+    for c, k in zip(codigos, tamanhos):
+        validos &= c >= 0
+        combinado *= k
+        combinado += c
+    combinado[~validos] = -1
+    return combinado
+
+
+def contar(codigos, tamanhos, lote=LOTE):
+    """Contagens de cada combinação de `codigos` (arrays de mesmo tamanho), no formato `tamanhos`."""
+    total = int(np.prod(tamanhos))
+    contagens = np.zeros(total, dtype=np.int64)
+    for inicio in range(0, len(codigos[0]), lote):
+        combinado = codigo_combinado([c[inicio:inicio + lote] for c in codigos], tamanhos)
+        contagens += np.bincount(combinado[combinado >= 0], minlength=total)
+    return contagens.reshape(tamanhos)
+
+
+def validar_dimensoes(dimensoes):
+    if not 2 <= len(dimensoes) <= 3 or len(set(dimensoes)) != len(dimensoes):
+        raise ValueError(f'cruzamento de 2 ou 3 colunas distintas, não {list(dimensoes)}')
+
+
+class Contingencia:
+    """Contagens de cada combinação das categorias de 2 ou 3 dimensões.
+
+    `contagens` tem uma posição por categoria de cada dimensão, na ordem das
+    categorias (`dtypes`, tipos categóricos do pandas).
+    """
+
+    def __init__(self, dimensoes, dtypes, contagens):
+        validar_dimensoes(dimensoes)
+        self.dimensoes = list(dimensoes)
+        self.dtypes = list(dtypes)
+        self.contagens = contagens
+
+    @property
+    def n(self):
+        return int(self.contagens.sum())
+
+    def normalizar(self, modo=None):
+        """Percentuais por 'linha', 'coluna' ou 'total' (por camada); `None` devolve as contagens."""
+        if modo is None:
+            return self.contagens
+        eixos = {'linha': (1,), 'coluna': (0,), 'total': (0, 1)}[modo]
+        somas = self.contagens.sum(axis=eixos, keepdims=True)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(somas > 0, self.contagens / np.maximum(somas, 1) * 100, np.nan)
+
+    def _indice(self, eixo):
+        dtype, nome = self.dtypes[eixo], self.dimensoes[eixo]
+        return pd.CategoricalIndex(
+            pd.Categorical.from_codes(np.arange(len(dtype.categories)), dtype=dtype), name=nome
+        )
+
+    def tabela(self, modo=None, camada=None):
+        """DataFrame linhas × colunas (da categoria `camada` da terceira dimensão, se houver)."""
+        valores = self.normalizar(modo)
+        if len(self.dimensoes) == 3:
+            valores = valores[..., self.dtypes[2].categories.get_loc(camada)]
+        return pd.DataFrame(valores, index=self._indice(0), columns=self._indice(1))
+
+
+def rotular(tabela):
+    """`tabela` só com as linhas e colunas observadas e com os rótulos legíveis das categorias."""
+    observadas = tabela.fillna(0)
+    tabela = tabela.loc[observadas.abs().sum(axis=1) > 0, observadas.abs().sum(axis=0) > 0]
+    linhas, colunas = tabela.index.name, tabela.columns.name
+    tabela = tabela.copy()
+    tabela.index = pd.Index([ROTULOS.get(linhas, {}).get(v, v) for v in tabela.index], name=linhas)
+    tabela.columns = pd.Index([ROTULOS.get(colunas, {}).get(v, v) for v in tabela.columns], name=colunas)
+    return tabela
@@ -0,0 +1,281 @@
+"""Cubo OLAP pré-agregado para a seção "Faça sua Própria Análise".
+
+Cada célula do cubo corresponde a uma combinação observada das dimensões
+(UF × RENDA × SEXO × COR/RACA × computador × internet) e guarda contagens,
+soma da `NOTA_MEDIA` e contagens por situação de presença em cada área.
+Contagens, médias e presenças de qualquer combinação de filtros saem da soma
+das células, em O(células) em vez de O(linhas).
+
+A distribuição da `NOTA_MEDIA` fica em um histograma à parte, por grupo das
+dimensões que o explorador filtra ou agrupa (`DIMENSOES_HISTOGRAMA`), em
+duas escalas (`enem.quantis.ResumoQuantis`):
+
+- contagens por faixa de 1 ponto, uma matriz grupos × faixas montada ao
+  carregar o cubo: o histograma grosso de uma seleção é a soma das linhas
+  dos grupos selecionados, em O(grupos × faixas);
+- os bins finos de cada grupo (grade exata da média, `PASSO_MEDIA`),
+  ordenados pelo valor: os quartis e os
+  bigodes exatos leem só as faixas que os contêm e as caudas.
+
+Nenhuma consulta percorre a tabela fina inteira, que tem quase uma linha por
+candidato com nota.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from .esquema import NOTAS, PRESENCAS
+from .quantis import PASSO_MEDIA, Histograma, ResumoQuantis, bins_media, n_bins
+
+DIMENSOES = ['SG_UF_PROVA', 'RENDA', 'SEXO', 'COR/RACA', 'ACESSO_COMPUTADOR', 'ACESSO_INTERNET']
+
+# Filtros do explorador (UF, renda, sexo) e agrupamentos das seções (renda, internet)
+DIMENSOES_HISTOGRAMA = ['SG_UF_PROVA', 'RENDA', 'SEXO', 'ACESSO_INTERNET']
+
+# Largura das faixas do histograma grosso (em pontos)
+PASSO_FAIXA = 1.0
+N_FAIXAS = n_bins(PASSO_FAIXA)
+BINS_POR_FAIXA = int(round(PASSO_FAIXA / PASSO_MEDIA))
+
+# Situações de presença contadas por área (0 a 3, como em mapa_presenca)
+SITUACOES = [0, 1, 2, 3]
+
+ARQUIVO_CELULAS = 'cubo_celulas.feather'
+ARQUIVO_HISTOGRAMA = 'cubo_histograma.feather'
+
+
+def _coluna_presenca(col, situacao):
+    return f'{col}_{situacao}'
+
+
+def _chaves(colunas):
+    """Código combinado de cada linha das colunas categóricas (0 reservado para ausentes)."""
+    codigos = [c.cat.codes.to_numpy().astype(np.int64) + 1 for c in colunas]
+    tamanhos = [len(c.cat.categories) + 1 for c in colunas]
+    return np.ravel_multi_index(codigos, tamanhos), tamanhos
+
+
+def _histograma(colunas, bins_, quantidades):
+    """Tabela (dimensões, BIN, N) somando as quantidades por grupo e bin,
+    ordenada pelo bin."""
+    grupo, tamanhos = _chaves(colunas)
+    n_grupos = int(np.prod(tamanhos))
+    chaves, posicao = np.unique(np.asarray(bins_, dtype=np.int64) * n_grupos + grupo, return_inverse=True)
+    tabela = {
+        c.name: pd.Categorical.from_codes(cod - 1, dtype=c.dtype)
+        for c, cod in zip(colunas, np.unravel_index(chaves % n_grupos, tamanhos))
+    }
+    tabela['BIN'] = (chaves // n_grupos).astype(np.int32)
+    tabela['N'] = np.bincount(posicao, weights=quantidades).astype(np.int32)
+    return pd.DataFrame(tabela)
+
+
+class Cubo:
+    """Células agregadas e histograma da NOTA_MEDIA por grupo (dimensões, BIN, N)."""
+
+    def __init__(self, celulas, histograma):
+        self.celulas = celulas
+        self.histograma = histograma
+        self._dimensoes = [d for d in DIMENSOES if d in celulas.columns]
+        # Códigos das dimensões e colunas somáveis em arrays: as consultas não passam pelo pandas
+        self._codigos = {d: celulas[d].cat.codes.to_numpy() for d in self._dimensoes}
+        self._posicoes = {d: {c: i for i, c in enumerate(celulas[d].cat.categories)} for d in self._dimensoes}
+        self._somaveis = celulas.columns.difference(self._dimensoes, sort=False).tolist()
+        self._valores = celulas[self._somaveis].to_numpy(dtype=np.float64)
+        self._dimensoes_histograma = [d for d in DIMENSOES_HISTOGRAMA if d in histograma.columns]
+        self._bin = histograma['BIN'].to_numpy()
+        self._n = histograma['N'].to_numpy()
+        # A tabela vem ordenada pelo bin: cada faixa é um intervalo contíguo
+        faixa = self._bin // BINS_POR_FAIXA
+        self._inicio_faixa = np.searchsorted(faixa, np.arange(N_FAIXAS + 1))
+        chave, tamanhos = _chaves([histograma[d] for d in self._dimensoes_histograma])
+        chaves, self._grupo = np.unique(chave, return_inverse=True)
+        self._grupos = {
+            d: cod - 1 for d, cod in zip(self._dimensoes_histograma, np.unravel_index(chaves, tamanhos))
+        }
+        self._grosso = np.bincount(
+            self._grupo * N_FAIXAS + faixa, weights=self._n, minlength=len(chaves) * N_FAIXAS
+        ).astype(np.int32).reshape(len(chaves), N_FAIXAS)
+        self._grosso_total = self._grosso.sum(axis=0, dtype=np.int64)
+
+    @classmethod
+    def construir(cls, df):
+        """Agrega `df` (já com as colunas derivadas) em um cubo."""
+        dimensoes = [d for d in DIMENSOES if d in df.columns]
+        chave, tamanhos = _chaves([df[d] for d in dimensoes])
+        chaves, celula = np.unique(chave, return_inverse=True)
+        n_celulas = len(chaves)
+
+        celulas = {}
+        for d, cod in zip(dimensoes, np.unravel_index(chaves, tamanhos)):
+            celulas[d] = pd.Categorical.from_codes(cod - 1, dtype=df[d].dtype)
+        celulas['N'] = np.bincount(celula, minlength=n_celulas)
+
+        nota = df['NOTA_MEDIA'].to_numpy(dtype=np.float64)
+        valida = ~np.isnan(nota)
+        celulas['N_NOTA'] = np.bincount(celula[valida], minlength=n_celulas)
+        celulas['SOMA_NOTA'] = np.bincount(celula[valida], weights=nota[valida], minlength=n_celulas)
+
+        for col in PRESENCAS:
+            if col not in df.columns:
+                continue
+            situacao = df[col].cat.codes.to_numpy()
+            for s in SITUACOES:
+                celulas[_coluna_presenca(col, s)] = np.bincount(celula[situacao == s], minlength=n_celulas)
+
+        # Bins exatos pela soma dos décimos das notas que entraram na média
+        notas = df[[col for col in NOTAS if col in df.columns]].to_numpy(dtype=np.float64)
+        histograma = _histograma(
+            [df[d][valida] for d in DIMENSOES_HISTOGRAMA if d in df.columns],
+            bins_media(notas[valida]),
+            np.ones(int(valida.sum())),
+        )
+        return cls(pd.DataFrame(celulas), histograma)
+
+    @classmethod
+    def combinar(cls, cubos):
+        """Soma cubos parciais (blocos ou partições) em um único cubo.
+
+        Células com a mesma combinação de dimensões são somadas, assim como os
+        bins dos histogramas de cada grupo.
+        """
+        cubos = [c for c in cubos if len(c.celulas)]
+        if len(cubos) == 1:
+            return cubos[0]
+        celulas = pd.concat([c.celulas for c in cubos], ignore_index=True)
+        dimensoes = [d for d in DIMENSOES if d in celulas.columns]
+        chaves, celula = np.unique(_chaves([celulas[d] for d in dimensoes])[0], return_inverse=True)
+        n_celulas = len(chaves)
+
+        combinadas = {}
+        primeira = np.zeros(n_celulas, dtype=np.int64)
+        primeira[celula[::-1]] = np.arange(len(celula))[::-1]
+        for d in dimensoes:
+            combinadas[d] = celulas[d].iloc[primeira].reset_index(drop=True)
+        for col in celulas.columns.difference(dimensoes, sort=False):
+            soma = np.bincount(celula, weights=celulas[col].to_numpy(), minlength=n_celulas)
+            combinadas[col] = soma if col == 'SOMA_NOTA' else soma.astype(np.int64)
+
+        histogramas = pd.concat([c.histograma for c in cubos], ignore_index=True)
+        histograma = _histograma(
+            [histogramas[d] for d in DIMENSOES_HISTOGRAMA if d in histogramas.columns],
+            histogramas['BIN'].to_numpy(),
+            histogramas['N'].to_numpy(),
+        )
+        return cls(pd.DataFrame(combinadas), histograma)
+
+    def sem_ufs(self, ufs):
+        """Cubo sem as células das UFs `ufs` (`None` remove as linhas sem UF).
+
+        Cada célula e cada grupo do histograma pertencem a uma única UF: somar
+        o resultado com o cubo das novas linhas dessas UFs (`combinar`) dá o
+        cubo de todos os dados.
+        """
+        def manter(tabela):
+            uf = tabela['SG_UF_PROVA']
+            remover = uf.isin([u for u in ufs if u is not None]).to_numpy()
+            if None in ufs:
+                remover |= uf.isna().to_numpy()
+            return tabela[~remover].reset_index(drop=True)
+
+        return Cubo(manter(self.celulas), manter(self.histograma))
+
+    def salvar(self, destino):
+        self.celulas.to_feather(os.path.join(destino, ARQUIVO_CELULAS))
+        self.histograma.to_feather(os.path.join(destino, ARQUIVO_HISTOGRAMA))
+
+    @classmethod
+    def carregar(cls, destino):
+        return cls(
+            pd.read_feather(os.path.join(destino, ARQUIVO_CELULAS)),
+            pd.read_feather(os.path.join(destino, ARQUIVO_HISTOGRAMA)),
+        )
+
+    @property
+    def presencas(self):
+        """Colunas de presença disponíveis no cubo."""
+        return [col for col in PRESENCAS if _coluna_presenca(col, SITUACOES[0]) in self.celulas.columns]
+
+    def _mascara(self, codigos, n, filtros):
+        mascara = np.ones(n, dtype=bool)
+        for dim, valor in filtros.items():
+            codigo = self._posicoes[dim].get(valor)
+            mascara &= (codigos[dim] == codigo) if codigo is not None else False
+        return mascara
+
+    def selecionar(self, filtros):
+        """Máscara das células que atendem a `filtros` ({dimensão: valor})."""
+        return self._mascara(self._codigos, len(self.celulas), filtros)
+
+    def _selecionar_grupos(self, filtros):
+        """Máscara dos grupos do histograma que atendem a `filtros`."""
+        for dim in filtros:
+            if dim not in self._grupos:
+                raise ValueError(f'o histograma do cubo não é separado por {dim}')
+        return self._mascara(self._grupos, len(self._grosso), filtros)
+
+    def _somar(self, mascara):
+        """{coluna: soma} das colunas somáveis nas células da `mascara`."""
+        return dict(zip(self._somaveis, mascara.astype(np.float64) @ self._valores))
+
+    def _fino(self, grupos, faixas):
+        """Histograma exato (grade `PASSO_MEDIA`) dos `grupos` selecionados nas `faixas`."""
+        faixas = np.asarray(faixas, dtype=np.int64)
+        inicio, fim = self._inicio_faixa[faixas], self._inicio_faixa[faixas + 1]
+        # Índices dos intervalos [início, fim) de todas as faixas, em um único array
+        tamanhos = fim - inicio
+        linhas = np.arange(tamanhos.sum()) + np.repeat(inicio - np.cumsum(tamanhos) + tamanhos, tamanhos)
+        linhas = linhas[grupos[self._grupo[linhas]]]
+        indices, posicao = np.unique(self._bin[linhas], return_inverse=True)
+        return Histograma.esparso(indices, np.bincount(posicao, weights=self._n[linhas]), PASSO_MEDIA)
+
+    def _resumo(self, grupos):
+        # Com a maior parte dos grupos selecionada, soma os demais e subtrai do total
+        if 2 * grupos.sum() > len(grupos):
+            contagens = self._grosso_total - self._grosso[~grupos].sum(axis=0, dtype=np.int64)
+        else:
+            contagens = self._grosso[grupos].sum(axis=0, dtype=np.int64)
+        grosso = Histograma(contagens, PASSO_FAIXA)
+        return ResumoQuantis(grosso, lambda faixas: self._fino(grupos, faixas))
+
+    def agregar(self, filtros):
+        """Soma as células selecionadas pelos filtros.
+
+        Retorna um dict com `n`, `media`, `mediana`, `histograma` (o
+        `ResumoQuantis` da NOTA_MEDIA) e `presencas` ({coluna: contagens por
+        situação}).
+        """
+        soma = self._somar(self.selecionar(filtros))
+        resumo = self._resumo(self._selecionar_grupos(filtros))
+        presencas = {
+            col: pd.Series([int(soma[_coluna_presenca(col, s)]) for s in SITUACOES], index=SITUACOES)
+            for col in self.presencas
+        }
+        return {
+            'n': int(soma['N']),
+            'media': soma['SOMA_NOTA'] / soma['N_NOTA'] if soma['N_NOTA'] else float('nan'),
+            'mediana': resumo.mediana(),
+            'histograma': resumo,
+            'presencas': presencas,
+        }
+
+    def histogramas_por(self, dim, filtros=None):
+        """Resumos da NOTA_MEDIA (`ResumoQuantis`) para cada categoria de `dim`
+        presente nas células selecionadas por `filtros`."""
+        filtros = filtros or {}
+        mascara = self.selecionar(filtros)
+        grupos = self._selecionar_grupos(filtros)
+        if dim not in self._grupos:
+            raise ValueError(f'o histograma do cubo não é separado por {dim}')
+        codigos = self._codigos[dim]
+        categorias = self.celulas[dim].cat.categories
+        com_grupo = mascara & (codigos >= 0)
+        observados = np.bincount(
+            codigos[com_grupo], weights=self._valores[com_grupo, self._somaveis.index('N')], minlength=len(categorias)
+        ) > 0
+        return {
+            categoria: self._resumo(grupos & (self._grupos[dim] == i))
+            for i, categoria in enumerate(categorias)
+            if observados[i]
+        }
@@ -0,0 +1,105 @@
+"""Catálogo das edições (anos) do ENEM servidas pelo mesmo dashboard.
+
+Cada edição é convertida no seu próprio diretório, com dados ordenados por
+UF, cubo e manifesto como em `enem.ingestao`, e com as faixas de renda da
+edição (`enem.mapas.FAIXAS_RENDA`). O catálogo (`.enem_cache/edicoes.json`)
+registra, por ano, o CSV de origem e o diretório convertido. Acrescentar uma
+edição converte apenas o CSV novo e grava a sua entrada: as partições e as
+células do cubo das edições anteriores não são reprocessadas.
+
+    python -m enem.edicoes adicionar microdados_enem_2022.csv --processos 8
+    python -m enem.edicoes listar
+"""
+import argparse
+import json
+import os
+import time
+
+from .ingestao import _artefatos, _ler_manifesto, _manifesto_valido, diretorio_padrao
+
+ARQUIVO_CATALOGO = os.path.join('.enem_cache', 'edicoes.json')
+
+
+def ler_catalogo(caminho=ARQUIVO_CATALOGO):
+    """{ano: {'csv', 'destino', 'linhas', 'versao', ...}} em ordem de ano (vazio sem catálogo)."""
+    try:
+        with open(caminho, encoding='utf-8') as f:
+            edicoes = json.load(f)['edicoes']
+    except (OSError, ValueError, KeyError):
+        return {}
+    return {int(ano): edicoes[ano] for ano in sorted(edicoes, key=int)}
+
+
+def _gravar_catalogo(caminho, edicoes):
+    pasta = os.path.dirname(caminho)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+    temporario = caminho + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump({'edicoes': {str(ano): e for ano, e in sorted(edicoes.items())}}, f, ensure_ascii=False, indent=2)
+    os.replace(temporario, caminho)
+
+
+def _convertido(caminho_csv, destino):
+    manifesto = _ler_manifesto(destino)
+    if not _manifesto_valido(manifesto, destino):
+        return False
+    st = os.stat(caminho_csv)
+    return manifesto['origem']['tamanho'] == st.st_size and manifesto['origem']['mtime_ns'] == st.st_mtime_ns
+
+
+def adicionar(caminho_csv, destino=None, processos=None, catalogo=ARQUIVO_CATALOGO, log=print):
+    """Converte `caminho_csv` (se ainda não convertido) e registra a edição no catálogo.
+
+    Com `processos`, a conversão usa o ETL paralelo (`enem.etl`). Uma edição
+    já catalogada com o mesmo ano é substituída. Retorna o ano da edição.
+    """
+    destino = destino or diretorio_padrao(caminho_csv)
+    inicio = time.perf_counter()
+    if processos and not _convertido(caminho_csv, destino):
+        from .etl import executar
+
+        executar(caminho_csv, destino, processos, log=log)
+    artefatos = _artefatos(caminho_csv, destino)
+    manifesto = _ler_manifesto(destino)
+    ano = artefatos['ano']
+    edicoes = ler_catalogo(catalogo)
+    edicoes[ano] = {
+        'csv': os.path.abspath(caminho_csv),
+        'destino': os.path.abspath(destino),
+        'linhas': manifesto['linhas'],
+        'versao': artefatos['versao'],
+    }
+    _gravar_catalogo(catalogo, edicoes)
+    log(f"edição {ano}: {manifesto['linhas']:,} linhas em {time.perf_counter() - inicio:.1f}s -> {catalogo}")
+    return ano
+
+
+def edicoes_disponiveis(csv_padrao, catalogo=ARQUIVO_CATALOGO):
+    """Edições do catálogo ({ano: {'csv', 'destino'}}); sem catálogo, só `csv_padrao`."""
+    edicoes = ler_catalogo(catalogo)
+    if edicoes:
+        return {ano: {'csv': e['csv'], 'destino': e['destino']} for ano, e in edicoes.items()}
+    return {_artefatos(csv_padrao)['ano']: {'csv': csv_padrao, 'destino': None}}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Catálogo das edições do ENEM usadas pelo dashboard.')
+    parser.add_argument('--catalogo', default=ARQUIVO_CATALOGO, help='arquivo do catálogo')
+    comandos = parser.add_subparsers(dest='comando', required=True)
+    novo = comandos.add_parser('adicionar', help='converte um CSV e acrescenta a sua edição (NU_ANO)')
+    novo.add_argument('csv', help='arquivo CSV dos microdados da edição')
+    novo.add_argument('--destino', help='diretório de saída (padrão: .enem_cache/<nome> ao lado do CSV)')
+    novo.add_argument('--processos', type=int, help='usa o ETL paralelo com este número de processos')
+    comandos.add_parser('listar', help='mostra as edições catalogadas')
+    args = parser.parse_args(argv)
+
+    if args.comando == 'adicionar':
+        adicionar(args.csv, args.destino, args.processos, args.catalogo)
+    else:
+        for ano, e in ler_catalogo(args.catalogo).items():
+            print(f"{ano}  {e['linhas']:>12,} linhas  {e['csv']}")
+
+
+if __name__ == '__main__':
+    main()
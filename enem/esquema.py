@@ -0,0 +1,139 @@
+"""Esquema tipado e compacto do DataFrame do ENEM.
+
+Cada coluna de código vira um `pd.Categorical` com categorias fixas (códigos
+int8 por linha) e as notas são guardadas como float32. Os rótulos legíveis
+(`SEXO`, `RENDA`, `COR/RACA`, `ACESSO_*`) são obtidos renomeando as categorias,
+sem construir uma coluna de strings linha a linha. Notas fora da escala de 0
+a 1000 são tratadas como ausentes.
+"""
+import numpy as np
+import pandas as pd
+
+from .mapas import (
+    ANO_PADRAO,
+    map_renda,
+    mapa_renda,
+    mapa_computador,
+    mapa_cor_raca,
+    mapa_internet,
+    mapa_sexo,
+)
+from .quantis import NOTA_MAXIMA
+
+UFS = [
+    'AC', 'AL', 'AM', 'AP', 'BA', 'CE', 'DF', 'ES', 'GO', 'MA', 'MG', 'MS', 'MT', 'PA',
+    'PB', 'PE', 'PI', 'PR', 'RJ', 'RN', 'RO', 'RR', 'RS', 'SC', 'SE', 'SP', 'TO',
+]
+
+NOTAS = ['NU_NOTA_CN', 'NU_NOTA_CH', 'NU_NOTA_LC', 'NU_NOTA_MT', 'NU_NOTA_REDACAO']
+
+PRESENCAS = ['TP_PRESENCA_CN', 'TP_PRESENCA_CH', 'TP_PRESENCA_LC', 'TP_PRESENCA_MT']
+
+
+def _letras(ultima):
+    return [chr(c) for c in range(ord('A'), ord(ultima) + 1)]
+
+
+# Domínio de cada coluna de código, na ordem dos dicionários do INEP
+CATEGORIAS = {
+    'TP_FAIXA_ETARIA': list(range(1, 21)),
+    'TP_SEXO': ['F', 'M'],
+    'TP_COR_RACA': list(range(0, 7)),
+    'TP_ST_CONCLUSAO': [1, 2, 3, 4],
+    'TP_ESCOLA': [1, 2, 3, 4],
+    'SG_UF_PROVA': UFS,
+    'TP_LINGUA': [0, 1],  # inglês ou espanhol
+    'Q001': _letras('H'),  # Escolaridade pai
+    'Q002': _letras('H'),  # Escolaridade mãe
+    'Q006': _letras('R'),  # Renda familiar
+    'Q022': _letras('E'),  # Existência de telefone celular
+    'Q024': _letras('E'),  # Possui computador
+    'Q025': _letras('B'),  # Acesso à internet
+    'TP_PRESENCA_CN': [0, 1, 2, 3],
+    'TP_PRESENCA_CH': [0, 1, 2, 3],
+    'TP_PRESENCA_LC': [0, 1, 2, 3],
+    'TP_PRESENCA_MT': [0, 1, 2, 3],
+}
+
+# Mesma lista do notebook, acrescida das presenças usadas pelo dashboard
+COLUNAS_DE_INTERESSE = [
+    'TP_FAIXA_ETARIA', 'TP_SEXO', 'TP_COR_RACA', 'TP_ST_CONCLUSAO', 'TP_ESCOLA',
+    'SG_UF_PROVA', *NOTAS, 'TP_LINGUA', 'Q001', 'Q002', 'Q006', 'Q022', 'Q024', 'Q025',
+    *PRESENCAS,
+]
+
+# Coluna legível -> (coluna de código, rótulos por código, ordenada)
+ROTULOS = {
+    'SEXO': ('TP_SEXO', mapa_sexo, False),
+    'COR/RACA': ('TP_COR_RACA', mapa_cor_raca, False),
+    'RENDA': ('Q006', map_renda, True),
+    'ACESSO_COMPUTADOR': ('Q024', mapa_computador, False),
+    'ACESSO_INTERNET': ('Q025', mapa_internet, False),
+}
+
+
+def dtypes_leitura(colunas=COLUNAS_DE_INTERESSE):
+    """Tipos para o `pd.read_csv`: códigos como categoria, notas como float32."""
+    dtypes = {}
+    for col in colunas:
+        if col in CATEGORIAS:
+            dtypes[col] = 'category'
+        elif col in NOTAS:
+            dtypes[col] = 'float32'
+    return dtypes
+
+
+def _chave(valor):
+    # Códigos numéricos podem chegar como 1, 1.0 ou '1'
+    if isinstance(valor, (float, np.floating)) and float(valor).is_integer():
+        valor = int(valor)
+    return str(valor)
+
+
+def para_categoria(serie, categorias, ordenada=False):
+    """Converte `serie` para um Categorical com as `categorias` fixas.
+
+    Valores fora do domínio viram NaN. A conversão só visita as categorias
+    distintas da série; as linhas são recodificadas por indexação vetorizada.
+    """
+    if not isinstance(serie.dtype, pd.CategoricalDtype):
+        serie = serie.astype('category')
+    posicao = {_chave(c): i for i, c in enumerate(categorias)}
+    tabela = np.array([posicao.get(_chave(c), -1) for c in serie.cat.categories] + [-1], dtype=np.int8)
+    # Código -1 (NaN) indexa a última posição da tabela, que também é -1
+    codigos = tabela[serie.cat.codes.to_numpy()]
+    dtype = pd.CategoricalDtype(categorias, ordered=ordenada)
+    return pd.Series(pd.Categorical.from_codes(codigos, dtype=dtype), index=serie.index, name=serie.name)
+
+
+def aplicar_esquema(df):
+    """Converte as colunas conhecidas de `df` para os tipos compactos do esquema."""
+    for col in df.columns:
+        if col in CATEGORIAS:
+            df[col] = para_categoria(df[col], CATEGORIAS[col])
+        elif col in NOTAS:
+            nota = pd.to_numeric(df[col], errors='coerce').astype('float32')
+            # Mesma regra de notas válidas do notebook (sem notas negativas)
+            df[col] = nota.where((nota >= 0) & (nota <= NOTA_MAXIMA))
+    return df
+
+
+def decodificar(df, ano=ANO_PADRAO):
+    """Adiciona as colunas legíveis renomeando as categorias dos códigos.
+
+    As faixas de renda seguem o salário mínimo da edição `ano`; códigos sem
+    rótulo na edição (a letra R nas edições de 17 faixas) ficam ausentes.
+    """
+    for nome, (col, mapa, ordenada) in ROTULOS.items():
+        if col not in df.columns:
+            continue
+        if nome == 'RENDA':
+            mapa = mapa_renda(ano)
+        serie = df[col]
+        sem_rotulo = [c for c in serie.cat.categories if c not in mapa]
+        if sem_rotulo:
+            serie = serie.cat.remove_categories(sem_rotulo)
+        rotulos = [mapa[c] for c in serie.cat.categories]
+        categorias = serie.cat.rename_categories(rotulos)
+        df[nome] = categorias.cat.as_ordered() if ordenada else categorias
+    return df
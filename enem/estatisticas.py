@@ -0,0 +1,337 @@
+"""Estatísticas das notas em uma única passada, combináveis entre blocos e grupos.
+
+Para as cinco notas e a `NOTA_MEDIA`, cada acumulador guarda o número de
+linhas, os válidos (e ausentes) de cada coluna, a média e a soma dos
+quadrados dos desvios (Welford), mínimo e máximo e, nas linhas com todas as
+notas, as médias e a matriz de co-momentos (covariância). Acumuladores se
+combinam pelas fórmulas de Chan et al., sem voltar aos dados: os blocos do
+ETL são somados no fim, e UFs e categorias somam-se na consulta.
+
+Na conversão (`enem.ingestao`, `enem.etl`) os acumuladores são calculados por
+UF e, dentro de cada UF, por categoria de cada dimensão do cubo, e gravados em
+`estatisticas.feather`. As métricas do dashboard saem deles, sem varrer as
+linhas; o notebook acumula o DataFrame em memória (`Estatisticas.construir`)
+para a correlação e as médias por UF.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from .cubo import DIMENSOES
+from .esquema import NOTAS
+
+COLUNAS = NOTAS + ['NOTA_MEDIA']
+
+ARQUIVO_ESTATISTICAS = 'estatisticas.feather'
+
+CHAVES = ['SG_UF_PROVA', 'DIMENSAO', 'VALOR']
+
+# Campos por coluna de nota (matrizes grupos × colunas)
+_CAMPOS = ['VALIDOS', 'MEDIA', 'M2', 'MINIMO', 'MAXIMO', 'MEDIA_COMPLETAS']
+
+
+def _dividir(numerador, denominador):
+    # Grupos vazios ficam com média 0 (e não NaN) para não contaminar as combinações
+    return np.divide(numerador, denominador, out=np.zeros(np.shape(numerador)), where=denominador > 0)
+
+
+def _de_valores(valores, grupo, n_grupos):
+    """Acumuladores de `n_grupos` grupos a partir das linhas (`grupo` de cada linha)."""
+    k = valores.shape[1]
+    contar = lambda g, pesos=None: np.bincount(g, weights=pesos, minlength=n_grupos)
+    a = {
+        'N': contar(grupo).astype(np.int64),
+        'VALIDOS': np.zeros((n_grupos, k), dtype=np.int64),
+        'MEDIA': np.zeros((n_grupos, k)),
+        'M2': np.zeros((n_grupos, k)),
+        'MINIMO': np.full((n_grupos, k), np.nan),
+        'MAXIMO': np.full((n_grupos, k), np.nan),
+    }
+    for j in range(k):
+        x = valores[:, j]
+        valido = ~np.isnan(x)
+        g, x = grupo[valido], x[valido]
+        a['VALIDOS'][:, j] = contar(g)
+        a['MEDIA'][:, j] = _dividir(contar(g, x), a['VALIDOS'][:, j])
+        # Duas passadas sobre o bloco em memória; entre blocos vale a combinação
+        a['M2'][:, j] = contar(g, (x - a['MEDIA'][g, j]) ** 2)
+        np.fmin.at(a['MINIMO'][:, j], g, x)
+        np.fmax.at(a['MAXIMO'][:, j], g, x)
+
+    completa = ~np.isnan(valores).any(axis=1)
+    g, x = grupo[completa], valores[completa]
+    a['N_COMPLETAS'] = contar(g).astype(np.int64)
+    a['MEDIA_COMPLETAS'] = np.stack([_dividir(contar(g, x[:, j]), a['N_COMPLETAS']) for j in range(k)], axis=1)
+    desvios = x - a['MEDIA_COMPLETAS'][g]
+    a['COMOMENTOS'] = np.zeros((n_grupos, k, k))
+    for i in range(k):
+        for j in range(i, k):
+            a['COMOMENTOS'][:, i, j] = a['COMOMENTOS'][:, j, i] = contar(g, desvios[:, i] * desvios[:, j])
+    return a
+
+
+def _filtrar(a, linhas):
+    return {campo: valor[linhas] for campo, valor in a.items()}
+
+
+def _concatenar(acumuladores):
+    return {campo: np.concatenate([a[campo] for a in acumuladores]) for campo in acumuladores[0]}
+
+
+def _reduzir(a, destino, n_destino):
+    """Combina os grupos de `a` em `n_destino` grupos (`destino` de cada grupo)."""
+    somar = lambda v: np.bincount(destino, weights=v, minlength=n_destino)
+    por_coluna = lambda m: np.stack([somar(m[:, j]) for j in range(m.shape[1])], axis=1)
+    k = a['MEDIA'].shape[1]
+
+    r = {'N': np.rint(somar(a['N'])).astype(np.int64)}
+    r['VALIDOS'] = np.rint(por_coluna(a['VALIDOS'])).astype(np.int64)
+    r['MEDIA'] = _dividir(por_coluna(a['VALIDOS'] * a['MEDIA']), r['VALIDOS'])
+    desvio = a['MEDIA'] - r['MEDIA'][destino]
+    r['M2'] = por_coluna(a['M2'] + a['VALIDOS'] * desvio ** 2)
+    r['MINIMO'] = np.full((n_destino, k), np.nan)
+    r['MAXIMO'] = np.full((n_destino, k), np.nan)
+    np.fmin.at(r['MINIMO'], destino, a['MINIMO'])
+    np.fmax.at(r['MAXIMO'], destino, a['MAXIMO'])
+
+    n_completas = a['N_COMPLETAS']
+    r['N_COMPLETAS'] = np.rint(somar(n_completas)).astype(np.int64)
+    r['MEDIA_COMPLETAS'] = _dividir(por_coluna(n_completas[:, None] * a['MEDIA_COMPLETAS']), r['N_COMPLETAS'][:, None])
+    desvio = a['MEDIA_COMPLETAS'] - r['MEDIA_COMPLETAS'][destino]
+    comomentos = a['COMOMENTOS'] + n_completas[:, None, None] * desvio[:, :, None] * desvio[:, None, :]
+    r['COMOMENTOS'] = por_coluna(comomentos.reshape(len(destino), k * k)).reshape(n_destino, k, k)
+    return r
+
+
+# -------------------- Um acumulador --------------------
+
+class Momentos:
+    """Estatísticas das notas de um grupo de linhas.
+
+    `Momentos` se somam (`a + b`, `sum(...)`) como se as linhas de ambos
+    tivessem sido acumuladas juntas.
+    """
+
+    def __init__(self, colunas, acumulador):
+        self.colunas = list(colunas)
+        self._a = acumulador
+
+    def __add__(self, outro):
+        if self.colunas != outro.colunas:
+            raise ValueError('acumuladores com colunas diferentes não podem ser somados')
+        return Momentos(self.colunas, _reduzir(_concatenar([self._a, outro._a]), np.zeros(2, dtype=np.int64), 1))
+
+    def __radd__(self, outro):
+        # Permite sum(acumuladores)
+        if outro == 0:
+            return self
+        return self.__add__(outro)
+
+    def _serie(self, valores):
+        return pd.Series(valores[0], index=self.colunas, dtype='float64')
+
+    def _sem_validos(self, valores):
+        return self._serie(np.where(self._a['VALIDOS'][0] > 0, valores[0], np.nan)[None])
+
+    @property
+    def n(self):
+        """Linhas acumuladas (com ou sem notas)."""
+        return int(self._a['N'][0])
+
+    @property
+    def n_completas(self):
+        """Linhas com todas as colunas preenchidas (base da covariância)."""
+        return int(self._a['N_COMPLETAS'][0])
+
+    @property
+    def contagem(self):
+        return self._serie(self._a['VALIDOS']).astype('int64')
+
+    @property
+    def ausentes(self):
+        return (self.n - self.contagem).astype('int64')
+
+    @property
+    def soma(self):
+        return self._serie(self._a['VALIDOS'] * self._a['MEDIA'])
+
+    @property
+    def media(self):
+        return self._sem_validos(self._a['MEDIA'])
+
+    @property
+    def media_completas(self):
+        """Média de cada coluna nas linhas completas (como `df.dropna().mean()`)."""
+        if not self.n_completas:
+            return self._serie(np.full((1, len(self.colunas)), np.nan))
+        return self._serie(self._a['MEDIA_COMPLETAS'])
+
+    @property
+    def variancia(self):
+        """Variância amostral (ddof=1, como no pandas)."""
+        validos = self._a['VALIDOS'][0]
+        return self._serie(np.where(validos > 1, self._a['M2'][0] / np.maximum(validos - 1, 1), np.nan)[None])
+
+    @property
+    def desvio(self):
+        return np.sqrt(self.variancia)
+
+    @property
+    def minimo(self):
+        return self._serie(self._a['MINIMO'])
+
+    @property
+    def maximo(self):
+        return self._serie(self._a['MAXIMO'])
+
+    def covariancia(self):
+        """Covariância amostral nas linhas completas."""
+        n = self.n_completas
+        matriz = self._a['COMOMENTOS'][0] / (n - 1) if n > 1 else np.full((len(self.colunas),) * 2, np.nan)
+        return pd.DataFrame(matriz, index=self.colunas, columns=self.colunas)
+
+    def correlacao(self):
+        """Correlação de Pearson nas linhas completas (como `df.dropna().corr()`)."""
+        covariancia = self.covariancia()
+        desvios = np.sqrt(np.diag(covariancia.to_numpy()))
+        return covariancia / np.outer(desvios, desvios)
+
+    def descrever(self):
+        """Contagem, média, desvio, mínimo e máximo por coluna, no formato do `describe()`."""
+        return pd.DataFrame({
+            'count': self.contagem.astype('float64'),
+            'mean': self.media,
+            'std': self.desvio,
+            'min': self.minimo,
+            'max': self.maximo,
+        }).T
+
+
+# -------------------- Acumuladores por UF e categoria --------------------
+
+class Estatisticas:
+    """Acumuladores por UF e, em cada UF, por categoria de cada dimensão.
+
+    `chaves` tem uma linha por acumulador: (UF, '', None) para o total da UF
+    e (UF, dimensão, categoria) para os grupos; linhas sem UF ficam com UF
+    ausente.
+    """
+
+    def __init__(self, chaves, colunas, acumuladores):
+        self.chaves = chaves.reset_index(drop=True)
+        self.colunas = list(colunas)
+        self._a = acumuladores
+
+    @classmethod
+    def construir(cls, df):
+        """Acumula `df` (já com as colunas derivadas) em uma passada."""
+        colunas = [c for c in COLUNAS if c in df.columns]
+        dimensoes = [d for d in DIMENSOES if d in df.columns]
+        # Acumula por célula (combinação das dimensões) e combina as células em cada agrupamento
+        codigos = [df[d].cat.codes.to_numpy().astype(np.int64) + 1 for d in dimensoes]
+        tamanhos = [len(df[d].cat.categories) + 1 for d in dimensoes]
+        chaves, celula = np.unique(np.ravel_multi_index(codigos, tamanhos), return_inverse=True)
+        valores = df[colunas].to_numpy(dtype=np.float64)
+        por_celula = _de_valores(valores, celula.reshape(-1), len(chaves))
+        codigos_celula = dict(zip(dimensoes, np.unravel_index(chaves, tamanhos)))
+
+        categorias = {d: df[d].cat.categories for d in dimensoes}
+        rotulo = lambda d, codigo: categorias[d][codigo - 1] if codigo else None
+        uf = codigos_celula.get('SG_UF_PROVA', np.zeros(len(chaves), dtype=np.int64))
+        n_ufs = len(df['SG_UF_PROVA'].cat.categories) + 1 if 'SG_UF_PROVA' in dimensoes else 1
+        tabelas, acumuladores = [], []
+        for d in [None] + [d for d in dimensoes if d != 'SG_UF_PROVA']:
+            if d is None:
+                linhas, grupo = np.ones(len(chaves), dtype=bool), uf
+            else:
+                # Categoria antes da UF: os grupos saem na ordem das categorias
+                linhas = codigos_celula[d] > 0
+                grupo = codigos_celula[d][linhas] * n_ufs + uf[linhas]
+            grupos, destino = np.unique(grupo, return_inverse=True)
+            acumuladores.append(_reduzir(_filtrar(por_celula, linhas), destino.reshape(-1), len(grupos)))
+            tabelas.append(pd.DataFrame({
+                'SG_UF_PROVA': [rotulo('SG_UF_PROVA', g % n_ufs) if n_ufs > 1 else None for g in grupos],
+                'DIMENSAO': d or '',
+                'VALOR': [rotulo(d, g // n_ufs) if d else None for g in grupos],
+            }, dtype=object))
+        return cls(pd.concat(tabelas, ignore_index=True), colunas, _concatenar(acumuladores))
+
+    @classmethod
+    def combinar(cls, lista):
+        """Soma acumuladores parciais (blocos ou partições) com as mesmas chaves."""
+        lista = [e for e in lista if len(e.chaves)]
+        if len(lista) == 1:
+            return lista[0]
+        chaves = pd.concat([e.chaves for e in lista], ignore_index=True)
+        destino = chaves.groupby(CHAVES, dropna=False, sort=False).ngroup().to_numpy()
+        n_destino = int(destino.max()) + 1
+        primeira = np.zeros(n_destino, dtype=np.int64)
+        primeira[destino[::-1]] = np.arange(len(destino))[::-1]
+        acumuladores = _reduzir(_concatenar([e._a for e in lista]), destino, n_destino)
+        return cls(chaves.iloc[primeira], lista[0].colunas, acumuladores)
+
+    def sem_ufs(self, ufs):
+        """Acumuladores sem as linhas das UFs `ufs` (`None` remove as linhas sem UF)."""
+        uf = self.chaves['SG_UF_PROVA']
+        remover = uf.isin([u for u in ufs if u is not None]).to_numpy()
+        if None in ufs:
+            remover |= uf.isna().to_numpy()
+        return Estatisticas(self.chaves[~remover], self.colunas, _filtrar(self._a, ~remover))
+
+    def salvar(self, destino):
+        tabela = self.chaves.astype(object).copy()
+        tabela['N'] = self._a['N']
+        tabela['N_COMPLETAS'] = self._a['N_COMPLETAS']
+        for campo in _CAMPOS:
+            for j, col in enumerate(self.colunas):
+                tabela[f'{campo}_{col}'] = self._a[campo][:, j]
+        for i, a in enumerate(self.colunas):
+            for j, b in enumerate(self.colunas):
+                tabela[f'COMOMENTOS_{a}_{b}'] = self._a['COMOMENTOS'][:, i, j]
+        tabela.to_feather(os.path.join(destino, ARQUIVO_ESTATISTICAS))
+
+    @classmethod
+    def carregar(cls, destino):
+        tabela = pd.read_feather(os.path.join(destino, ARQUIVO_ESTATISTICAS))
+        colunas = [c for c in COLUNAS if f'MEDIA_{c}' in tabela.columns]
+        acumuladores = {
+            'N': tabela['N'].to_numpy(),
+            'N_COMPLETAS': tabela['N_COMPLETAS'].to_numpy(),
+            'COMOMENTOS': np.stack([
+                tabela[[f'COMOMENTOS_{a}_{b}' for b in colunas]].to_numpy() for a in colunas
+            ], axis=1),
+        }
+        for campo in _CAMPOS:
+            acumuladores[campo] = tabela[[f'{campo}_{c}' for c in colunas]].to_numpy()
+        chaves = tabela[CHAVES].astype(object).where(tabela[CHAVES].notna(), None)
+        return cls(chaves, colunas, acumuladores)
+
+    def _linhas(self, dimensao, filtros):
+        linhas = (self.chaves['DIMENSAO'] == dimensao).to_numpy()
+        for dim, valor in (filtros or {}).items():
+            if dim != 'SG_UF_PROVA':
+                raise ValueError(f'estatísticas acumuladas só filtram por SG_UF_PROVA (pedido: {dim})')
+            linhas = linhas & (self.chaves['SG_UF_PROVA'] == valor).to_numpy()
+        return linhas
+
+    def _agrupar(self, linhas, valores):
+        codigos, unicos = pd.factorize(pd.Series(valores, dtype=object))
+        acumuladores = _reduzir(_filtrar(self._a, linhas), codigos, len(unicos))
+        return {
+            valor: Momentos(self.colunas, _filtrar(acumuladores, [i])) for i, valor in enumerate(unicos)
+        }
+
+    def agregar(self, filtros=None):
+        """Acumulador das linhas selecionadas por `filtros` (só `SG_UF_PROVA`)."""
+        linhas = self._linhas('', filtros)
+        acumuladores = _reduzir(_filtrar(self._a, linhas), np.zeros(int(linhas.sum()), dtype=np.int64), 1)
+        return Momentos(self.colunas, acumuladores)
+
+    def por(self, dim, filtros=None):
+        """{categoria: Momentos} de `dim` nas linhas selecionadas por `filtros`."""
+        if dim == 'SG_UF_PROVA':
+            linhas = self._linhas('', filtros) & self.chaves['SG_UF_PROVA'].notna().to_numpy()
+            return self._agrupar(linhas, self.chaves['SG_UF_PROVA'][linhas])
+        linhas = self._linhas(dim, filtros)
+        return self._agrupar(linhas, self.chaves['VALOR'][linhas])
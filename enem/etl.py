@@ -0,0 +1,199 @@
+"""ETL em blocos e em paralelo dos microdados completos do INEP.
+
+O CSV (vários GB, ISO-8859-1) é dividido em faixas de bytes alinhadas em
+quebras de linha. Cada faixa é lida, tipada e limpa em um processo do pool,
+com as mesmas regras de `enem.ingestao` (esquema compacto, notas válidas,
+`NOTA_MEDIA` e rótulos decodificados), e gravada como uma parte ordenada por
+UF junto com o seu cubo parcial, os acumuladores das notas e o perfil de
+qualidade do bloco (`enem.qualidade`). No fim as partes são costuradas, UF a
+UF, no mesmo armazenamento particionado que o dashboard carrega, sem nunca ter
+o arquivo inteiro em memória, os cubos, acumuladores e perfis parciais são
+combinados, a amostra estratificada é sorteada do arquivo costurado e as
+colunas são regravadas, uma a uma, no formato mapeado em memória
+(`enem.compartilhado`).
+
+    python -m enem.etl dados.csv --processos 8
+
+A saída vai por padrão para o diretório que `carregar_dados('dados.csv')`
+consulta, então o dashboard passa a usá-la sem reconverter o CSV.
+"""
+import argparse
+import io
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from .amostra import gravar_amostra
+from .compartilhado import abrir_colunas, gravar_colunas
+from .cubo import Cubo
+from .esquema import UFS
+from .estatisticas import Estatisticas
+from .ingestao import (
+    ARQUIVO_DADOS,
+    VERSAO_FORMATO,
+    _gravar_manifesto,
+    _origem,
+    derivar_colunas,
+    detectar_ano,
+    diretorio_padrao,
+    impressoes_particoes,
+    ler_csv,
+    ordenar_por_uf,
+)
+from .qualidade import PerfilQualidade
+
+TAMANHO_BLOCO = 64 * 1024 * 1024
+
+
+def dividir_arquivo(caminho_csv, tamanho_bloco=TAMANHO_BLOCO):
+    """Cabeçalho e faixas (início, fim) de bytes terminadas em quebra de linha."""
+    faixas = []
+    with open(caminho_csv, 'rb') as f:
+        cabecalho = f.readline()
+        inicio = f.tell()
+        tamanho = os.fstat(f.fileno()).st_size
+        while inicio < tamanho:
+            f.seek(min(inicio + tamanho_bloco, tamanho))
+            f.readline()
+            fim = f.tell()
+            faixas.append((inicio, fim))
+            inicio = fim
+    return cabecalho, faixas
+
+
+def _processar_bloco(tarefa):
+    caminho_csv, cabecalho, inicio, fim, caminho_parte, ano, bloco = tarefa
+    with open(caminho_csv, 'rb') as f:
+        f.seek(inicio)
+        dados = f.read(fim - inicio)
+    bruto = ler_csv(io.BytesIO(cabecalho + dados))
+    qualidade = PerfilQualidade.construir(bruto, ano, bloco, (inicio, fim))
+    df, particoes = ordenar_por_uf(derivar_colunas(bruto, ano))
+    # Partes sem compressão para serem lidas por memory map na costura
+    feather.write_feather(pa.Table.from_pandas(df, preserve_index=False), caminho_parte, compression='uncompressed')
+    return {
+        'parte': caminho_parte,
+        'linhas': len(df),
+        'particoes': particoes,
+        'cubo': Cubo.construir(df),
+        'estatisticas': Estatisticas.construir(df),
+        'qualidade': qualidade,
+    }
+
+
+def _costurar(resultados, caminho_saida):
+    """Grava as partes UF a UF em um único arquivo.
+
+    Retorna os intervalos de cada UF, o total de linhas e as colunas gravadas.
+    """
+    tabelas = [pa.ipc.open_file(pa.memory_map(r['parte'])).read_all() for r in resultados]
+    particoes = {}
+    inicio = 0
+    opcoes = pa.ipc.IpcWriteOptions(compression='lz4')
+    with pa.ipc.new_file(caminho_saida, tabelas[0].schema, options=opcoes) as escritor:
+        for uf in UFS + [None]:
+            total = 0
+            for tabela, r in zip(tabelas, resultados):
+                if uf is None:
+                    # Linhas sem UF ficam ao final de cada parte
+                    ini = sum(f - i for i, f in r['particoes'].values())
+                    fim = r['linhas']
+                elif uf in r['particoes']:
+                    ini, fim = r['particoes'][uf]
+                else:
+                    continue
+                if fim > ini:
+                    escritor.write_table(tabela.slice(ini, fim - ini))
+                    total += fim - ini
+            if uf is not None and total:
+                particoes[uf] = [inicio, inicio + total]
+            inicio += total
+    return particoes, inicio, tabelas[0].schema.names
+
+
+def executar(caminho_csv, destino=None, processos=None, tamanho_bloco=TAMANHO_BLOCO, log=print):
+    """Converte `caminho_csv` para o armazenamento do dashboard em paralelo.
+
+    Retorna o manifesto gravado.
+    """
+    destino = destino or diretorio_padrao(caminho_csv)
+    dir_partes = os.path.join(destino, '_partes')
+    os.makedirs(dir_partes, exist_ok=True)
+    processos = processos or os.cpu_count() or 1
+
+    inicio = time.perf_counter()
+    cabecalho, faixas = dividir_arquivo(caminho_csv, tamanho_bloco)
+    if not faixas:
+        raise ValueError(f'{caminho_csv} não tem linhas de dados')
+    # Os rótulos de renda dependem da edição
+    ano = detectar_ano(caminho_csv)
+    tarefas = [
+        (caminho_csv, cabecalho, ini, fim, os.path.join(dir_partes, f'parte-{i:05d}.feather'), ano, i)
+        for i, (ini, fim) in enumerate(faixas)
+    ]
+    log(f"{len(tarefas)} blocos de até {tamanho_bloco // (1024 * 1024)} MB em {processos} processos")
+
+    resultados = []
+    linhas = 0
+    # O hash do CSV (para o manifesto) é calculado enquanto os blocos são processados
+    with ThreadPoolExecutor(1) as hashing, ProcessPoolExecutor(processos) as pool:
+        futura_origem = hashing.submit(_origem, caminho_csv)
+        for resultado in pool.map(_processar_bloco, tarefas):
+            resultados.append(resultado)
+            linhas += resultado['linhas']
+            decorrido = time.perf_counter() - inicio
+            log(f"  bloco {len(resultados)}/{len(tarefas)}: {linhas:,} linhas ({linhas / decorrido:,.0f} linhas/s)")
+            for sinalizado in resultado['qualidade'].blocos:
+                colunas = ', '.join(sinalizado['fora_do_dominio'])
+                log(f"  atenção: bloco {sinalizado['bloco'] + 1} (bytes {sinalizado['faixa_bytes']}) "
+                    f"tem códigos fora do domínio em {colunas}")
+        origem = futura_origem.result()
+
+    caminho_saida = os.path.join(destino, ARQUIVO_DADOS)
+    temporario = caminho_saida + '.tmp'
+    particoes, total, colunas = _costurar(resultados, temporario)
+    os.replace(temporario, caminho_saida)
+    gravar_colunas(caminho_saida, destino)
+    gravar_amostra(caminho_saida, destino)
+    Cubo.combinar([r['cubo'] for r in resultados]).salvar(destino)
+    Estatisticas.combinar([r['estatisticas'] for r in resultados]).salvar(destino)
+    qualidade = PerfilQualidade.combinar([r['qualidade'] for r in resultados])
+    qualidade.salvar(destino, ano)
+    shutil.rmtree(dir_partes, ignore_errors=True)
+
+    segundos = time.perf_counter() - inicio
+    manifesto = {
+        'versao_formato': VERSAO_FORMATO,
+        'origem': origem,
+        'ano': ano,
+        'linhas': total,
+        'colunas': colunas,
+        'particoes': particoes,
+        # Pelas colunas mapeadas, sem carregar o arquivo inteiro
+        'impressoes': impressoes_particoes(abrir_colunas(destino), particoes),
+        'segundos_conversao': round(segundos, 3),
+        'linhas_por_segundo': round(total / segundos) if segundos else None,
+        'processos': processos,
+    }
+    _gravar_manifesto(destino, manifesto)
+    log(f"{total:,} linhas em {segundos:.1f}s ({total / segundos:,.0f} linhas/s) -> {destino}")
+    log(f"{qualidade.duplicadas:,} linhas duplicadas, {len(qualidade.blocos)} bloco(s) com códigos fora do domínio")
+    return manifesto
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='ETL paralelo do CSV completo do INEP para o armazenamento do dashboard.')
+    parser.add_argument('csv', help='arquivo CSV dos microdados (separador ";", ISO-8859-1)')
+    parser.add_argument('--destino', help='diretório de saída (padrão: .enem_cache/<nome> ao lado do CSV)')
+    parser.add_argument('--processos', type=int, help='processos do pool (padrão: número de CPUs)')
+    parser.add_argument('--bloco-mb', type=int, default=TAMANHO_BLOCO // (1024 * 1024), help='tamanho de cada bloco em MB')
+    args = parser.parse_args(argv)
+    executar(args.csv, args.destino, args.processos, args.bloco_mb * 1024 * 1024)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Figuras Plotly montadas a partir de resumos calculados no servidor.
+
+Em vez de enviar todas as linhas para o navegador (como `px.box` e
+`px.histogram` fazem), as caixas recebem quartis e bigodes já calculados e
+uma amostra limitada de outliers, e os histogramas recebem as faixas já
+contadas. O JSON da figura passa a ter tamanho fixo, independente do número
+de candidatos.
+
+O Plotly lê os templates compartilhados do processo sem proteção entre
+threads; com resultados calculados em segundo plano (`enem.resultados`), a
+aplicação do template e o Plotly Express rodam sob `trava_plotly`.
+"""
+import threading
+
+import numpy as np
+import plotly.graph_objects as go
+
+# Máximo de outliers desenhados por caixa
+LIMITE_OUTLIERS = 200
+
+trava_plotly = threading.RLock()
+
+
+def figura_caixas(histogramas, titulo, rotulo_x, rotulo_y, cores, template, limite_outliers=LIMITE_OUTLIERS):
+    """Box plot com uma caixa por grupo a partir de `histogramas` ({rótulo: Histograma})."""
+    fig = go.Figure()
+    grupos = [g for g, h in histogramas.items() if h.n > 0]
+    for i, grupo in enumerate(grupos):
+        h = histogramas[grupo]
+        cor = cores[i % len(cores)]
+        q1, mediana, q3 = h.quartis()
+        bigode_inf, bigode_sup = h.bigodes()
+        fig.add_trace(go.Box(
+            x=[grupo],
+            name=str(grupo),
+            q1=[q1],
+            median=[mediana],
+            q3=[q3],
+            lowerfence=[bigode_inf],
+            upperfence=[bigode_sup],
+            marker_color=cor,
+            legendgroup=str(grupo),
+            offsetgroup=str(grupo),
+            alignmentgroup='True',
+            boxpoints=False,
+        ))
+        outliers = h.amostra_outliers(limite=limite_outliers)
+        if len(outliers):
+            fig.add_trace(go.Scatter(
+                x=[grupo] * len(outliers),
+                y=outliers,
+                mode='markers',
+                marker=dict(color=cor, size=4),
+                legendgroup=str(grupo),
+                showlegend=False,
+                hovertemplate=f'{rotulo_x}=%{{x}}<br>{rotulo_y}=%{{y}}<extra></extra>',
+            ))
+    with trava_plotly:
+        fig.update_layout(
+            title=titulo,
+            template=template,
+            boxmode='overlay',
+            xaxis_title=rotulo_x,
+            yaxis_title=rotulo_y,
+            legend_title_text=rotulo_x,
+            xaxis=dict(categoryorder='array', categoryarray=grupos),
+        )
+    return fig
+
+
+def figura_histograma(histograma, titulo, rotulo_x, cor, template, n_faixas=20):
+    """Histograma em barras a partir das faixas já contadas de um `Histograma`."""
+    faixas = histograma.em_faixas(n_faixas)
+    fig = go.Figure(go.Bar(
+        x=((faixas['inicio'] + faixas['fim']) / 2).tolist(),
+        y=faixas['count'].tolist(),
+        width=(faixas['fim'] - faixas['inicio']).tolist(),
+        marker_color=cor,
+        customdata=np.column_stack([faixas['inicio'], faixas['fim']]),
+        hovertemplate=f'{rotulo_x}=%{{customdata[0]:.1f}} - %{{customdata[1]:.1f}}<br>count=%{{y}}<extra></extra>',
+    ))
+    with trava_plotly:
+        fig.update_layout(
+            title=titulo,
+            template=template,
+            bargap=0,
+            xaxis_title=rotulo_x,
+            yaxis_title='count',
+        )
+    return fig
@@ -0,0 +1,95 @@
+"""Índice de bitmaps para os filtros do dashboard.
+
+Para cada valor de cada dimensão filtrável guarda-se um bitmap compactado
+(`np.packbits`, 1 bit por linha) das linhas que têm aquele valor. Uma
+combinação de filtros vira a interseção (AND) dos bitmaps escolhidos; "Todos"
+simplesmente não entra na interseção. O índice é montado uma vez, na carga
+dos dados, e novas dimensões (TP_ESCOLA, TP_FAIXA_ETARIA, ...) entram apenas
+acrescentando o nome da coluna em `DIMENSOES_FILTRO`.
+"""
+import numpy as np
+
+DIMENSOES_FILTRO = [
+    'SG_UF_PROVA',
+    'RENDA',
+    'SEXO',
+    'COR/RACA',
+    'ACESSO_COMPUTADOR',
+    'ACESSO_INTERNET',
+    'TP_ESCOLA',
+    'TP_FAIXA_ETARIA',
+]
+
+# Número de bits 1 em cada byte, para contar linhas sem descompactar
+_BITS_POR_BYTE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+class IndiceFiltros:
+    """Bitmaps compactados por (dimensão, valor) sobre as linhas de `df`."""
+
+    def __init__(self, df, dimensoes=DIMENSOES_FILTRO):
+        self.n_linhas = len(df)
+        self.bitmaps = {}
+        for dim in dimensoes:
+            if dim not in df.columns:
+                continue
+            codigos = df[dim].cat.codes.to_numpy()
+            self.bitmaps[dim] = {
+                valor: np.packbits(codigos == i)
+                for i, valor in enumerate(df[dim].cat.categories)
+            }
+
+    @property
+    def dimensoes(self):
+        return list(self.bitmaps)
+
+    def bitmap(self, dim, valor):
+        """Bitmap das linhas com `dim == valor` (vazio se o valor não existe)."""
+        try:
+            return self.bitmaps[dim][valor]
+        except KeyError:
+            if dim not in self.bitmaps:
+                raise KeyError(f'dimensão sem índice: {dim}') from None
+            return np.zeros((self.n_linhas + 7) // 8, dtype=np.uint8)
+
+    def resolver(self, filtros):
+        """Interseção dos bitmaps de `filtros` ({dimensão: valor}).
+
+        Filtros com valor `None` ou 'Todos' são ignorados; sem nenhum filtro
+        efetivo retorna `None`, que significa "todas as linhas".
+        """
+        resultado = None
+        for dim, valor in filtros.items():
+            if valor is None or valor == 'Todos':
+                continue
+            bitmap = self.bitmap(dim, valor)
+            resultado = bitmap.copy() if resultado is None else np.bitwise_and(resultado, bitmap, out=resultado)
+        return resultado
+
+    def contar(self, filtros):
+        """Número de linhas que atendem aos filtros."""
+        bitmap = self.resolver(filtros)
+        if bitmap is None:
+            return self.n_linhas
+        return int(_BITS_POR_BYTE[bitmap].sum(dtype=np.int64))
+
+    def mascara(self, filtros):
+        """Máscara booleana das linhas (None quando não há filtro efetivo)."""
+        bitmap = self.resolver(filtros)
+        if bitmap is None:
+            return None
+        return np.unpackbits(bitmap, count=self.n_linhas).astype(bool)
+
+    def linhas(self, filtros):
+        """Posições (iloc) das linhas que atendem aos filtros."""
+        mascara = self.mascara(filtros)
+        if mascara is None:
+            return np.arange(self.n_linhas)
+        return np.flatnonzero(mascara)
+
+    def selecionar(self, df, filtros):
+        """Recorte de `df` segundo os filtros; sem filtro devolve o próprio `df`."""
+        mascara = self.mascara(filtros)
+        if mascara is None:
+            return df
+        return df[mascara]
@@ -0,0 +1,473 @@
+"""Ingestão dos microdados do ENEM para um armazenamento colunar (Arrow IPC).
+
+O CSV bruto do INEP é convertido uma única vez, lendo apenas as colunas usadas
+pelo dashboard e materializando as colunas derivadas (`NOTA_MEDIA`, `SEXO`,
+`RENDA`, ...) no formato Feather, que preserva as categorias do esquema. As
+execuções seguintes carregam o arquivo convertido por meio de um cache
+do processo indexado pelo hash e pela data de modificação do CSV de origem,
+de modo que os reruns do Streamlit nunca voltam a ler o CSV. O cubo agregado
+do explorador (`enem.cubo`) e os acumuladores de estatísticas das notas
+(`enem.estatisticas`) são construídos na mesma conversão e gravados ao lado,
+junto com o relatório de qualidade do CSV (`enem.qualidade`) e, para dados
+grandes, uma amostra estratificada (`enem.amostra`) que responde às seções
+de forma aproximada enquanto os resultados exatos são calculados.
+
+As linhas são gravadas ordenadas por `SG_UF_PROVA`, e o manifesto registra o
+intervalo contíguo de cada UF: selecionar um estado é uma fatia (`iloc`) dos
+dados carregados, sem cópia. O manifesto guarda também a impressão digital
+(hash das colunas convertidas) de cada partição, da qual sai a versão dos
+dados; quando o CSV muda, só as partições com impressão diferente são
+reprocessadas (`enem.versionamento`) e os resultados das demais UFs no cache
+de resultados continuam valendo.
+
+O DataFrame só é aberto quando alguém o pede (`carregar_dados`), sobre as
+colunas gravadas como arrays NumPy mapeados em memória (`enem.compartilhado`):
+somente leitura, sem cópia no heap e compartilhado por todas as sessões e
+processos do servidor (`ENEM_COMPARTILHADO=0` lê uma cópia). As seções do
+dashboard consultam os dados por `carregar_consultas`, que com o backend
+'arrow' (`ENEM_BACKEND=arrow`) responde lendo o arquivo convertido fora da
+memória (`enem.consultas`).
+
+Uso pela linha de comando (pré-conversão antes do deploy):
+
+    python -m enem.ingestao dados.csv
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+from .amostra import ConsultasAmostra, gravar_amostra
+from .compartilhado import abrir_colunas, gravar_colunas
+from .consultas import BACKENDS, ConsultasArrow, ConsultasPandas
+from .cubo import Cubo
+from .esquema import (
+    COLUNAS_DE_INTERESSE,
+    NOTAS,
+    aplicar_esquema,
+    decodificar,
+    dtypes_leitura,
+)
+from .estatisticas import Estatisticas
+from .indice import IndiceFiltros
+from .mapas import ANO_PADRAO
+from .qualidade import PerfilQualidade
+from .qualidade import carregar as carregar_relatorio
+from .resultados import cache_resultados
+
+# Versão do formato gravado; mudar invalida os arquivos já convertidos
+VERSAO_FORMATO = 12
+
+ARQUIVO_DADOS = 'dados.feather'
+ARQUIVO_MANIFESTO = 'manifesto.json'
+
+# Chave da partição das linhas sem UF nas impressões digitais
+SEM_UF = '(sem UF)'
+
+# Backend das consultas do dashboard: 'pandas' (em memória) ou 'arrow' (fora da memória)
+BACKEND = os.environ.get('ENEM_BACKEND', 'pandas')
+
+# Dados abertos por memory map (padrão) ou lidos para o heap do processo
+COMPARTILHADO = os.environ.get('ENEM_COMPARTILHADO', '1') != '0'
+
+# Cache do processo: (caminho, mtime, tamanho) -> {'dados': df, 'cubo': Cubo, ...}
+_cache = {}
+# Reentrante: estruturas derivadas podem depender de outras (índice -> dados)
+_trava = threading.RLock()
+
+
+def hash_arquivo(caminho, tamanho_bloco=1 << 20):
+    """Calcula o SHA-256 do arquivo lendo-o em blocos."""
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def diretorio_padrao(caminho_csv):
+    """Diretório onde o arquivo convertido de `caminho_csv` é guardado."""
+    base = os.path.splitext(os.path.basename(caminho_csv))[0]
+    return os.path.join(os.path.dirname(os.path.abspath(caminho_csv)), '.enem_cache', base)
+
+
+def ler_csv(caminho_csv, **kwargs):
+    """Lê o CSV do INEP trazendo somente as colunas do esquema, já tipadas."""
+    return pd.read_csv(
+        caminho_csv,
+        sep=';',
+        encoding='ISO-8859-1',
+        usecols=lambda c: c in COLUNAS_DE_INTERESSE,
+        dtype=dtypes_leitura(),
+        **kwargs,
+    )
+
+
+def detectar_ano(caminho_csv):
+    """Edição (NU_ANO) da primeira linha do CSV; `ANO_PADRAO` se a coluna não existe."""
+    amostra = pd.read_csv(
+        caminho_csv, sep=';', encoding='ISO-8859-1', usecols=lambda c: c == 'NU_ANO', nrows=1
+    )
+    if 'NU_ANO' in amostra.columns and len(amostra) and pd.notna(amostra['NU_ANO'].iloc[0]):
+        return int(amostra['NU_ANO'].iloc[0])
+    return ANO_PADRAO
+
+
+def derivar_colunas(df, ano=ANO_PADRAO):
+    """Aplica o esquema compacto e materializa as colunas derivadas (rótulos da edição `ano`)."""
+    df = aplicar_esquema(df)
+    existing_scores = [col for col in NOTAS if col in df.columns]
+    if existing_scores:
+        # Média acumulada em float64 e guardada em float32, como as notas
+        media = df[existing_scores].astype('float64').mean(axis=1, skipna=True)
+        df['NOTA_MEDIA'] = media.astype('float32')
+    return decodificar(df, ano)
+
+
+def _ler_manifesto(destino):
+    try:
+        with open(os.path.join(destino, ARQUIVO_MANIFESTO), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _gravar_manifesto(destino, manifesto):
+    caminho = os.path.join(destino, ARQUIVO_MANIFESTO)
+    temporario = caminho + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=2)
+    os.replace(temporario, caminho)
+
+
+def _origem(caminho_csv, sha256=None):
+    st = os.stat(caminho_csv)
+    return {
+        'arquivo': os.path.abspath(caminho_csv),
+        'tamanho': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+        'sha256': sha256 or hash_arquivo(caminho_csv),
+    }
+
+
+def ordenar_por_uf(df):
+    """Ordena as linhas por UF (ausentes ao final) e devolve o DataFrame
+    ordenado com os intervalos {uf: [início, fim)} de cada partição."""
+    df = df.sort_values('SG_UF_PROVA', kind='stable', na_position='last', ignore_index=True)
+    contagens = df['SG_UF_PROVA'].value_counts(sort=False)
+    particoes = {}
+    inicio = 0
+    for uf, n in contagens.items():
+        if n:
+            particoes[uf] = [inicio, inicio + int(n)]
+            inicio += int(n)
+    return df, particoes
+
+
+def impressoes_particoes(df, particoes):
+    """Impressão digital (BLAKE2b) das linhas de cada partição de `df` ({uf: hex}).
+
+    Cobre os nomes, as categorias e os valores convertidos de todas as
+    colunas, na ordem das linhas; as linhas sem UF (ao final) formam a
+    partição `SEM_UF`.
+    """
+    intervalos = dict(particoes)
+    fim = max((f for _, f in intervalos.values()), default=0)
+    if fim < len(df):
+        intervalos[SEM_UF] = [fim, len(df)]
+    colunas = []
+    for nome, serie in df.items():
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            colunas.append((nome, serie.array.codes, repr(serie.cat.categories.tolist())))
+        else:
+            colunas.append((nome, serie.to_numpy(), str(serie.dtype)))
+    impressoes = {}
+    for uf, (inicio, fim) in intervalos.items():
+        h = hashlib.blake2b(digest_size=16)
+        for nome, valores, tipo in colunas:
+            h.update(f'{nome}:{tipo}'.encode())
+            h.update(valores[inicio:fim])
+        impressoes[uf] = h.hexdigest()
+    return impressoes
+
+
+def versao_manifesto(manifesto):
+    """Versão dos dados: formato + hash das impressões de todas as partições."""
+    texto = json.dumps(sorted(manifesto['impressoes'].items()))
+    return f"{VERSAO_FORMATO}-{hashlib.sha256(texto.encode()).hexdigest()[:16]}"
+
+
+def converter_csv(caminho_csv, destino=None):
+    """Converte o CSV bruto em Feather com as colunas derivadas já calculadas
+    e grava as colunas mapeáveis, a amostra, o cubo do explorador e as estatísticas das notas no
+    mesmo diretório.
+
+    Retorna o DataFrame convertido e o manifesto gravado.
+    """
+    destino = destino or diretorio_padrao(caminho_csv)
+    os.makedirs(destino, exist_ok=True)
+    origem = _origem(caminho_csv)
+    ano = detectar_ano(caminho_csv)
+
+    inicio = time.perf_counter()
+    bruto = ler_csv(caminho_csv)
+    # Perfilado antes do esquema, que transforma códigos desconhecidos em ausentes
+    qualidade = PerfilQualidade.construir(bruto, ano)
+    df, particoes = ordenar_por_uf(derivar_colunas(bruto, ano))
+    df.to_feather(os.path.join(destino, ARQUIVO_DADOS))
+    gravar_colunas(os.path.join(destino, ARQUIVO_DADOS), destino)
+    gravar_amostra(os.path.join(destino, ARQUIVO_DADOS), destino)
+    Cubo.construir(df).salvar(destino)
+    Estatisticas.construir(df).salvar(destino)
+    qualidade.salvar(destino, ano)
+    manifesto = {
+        'versao_formato': VERSAO_FORMATO,
+        'origem': origem,
+        'ano': ano,
+        'linhas': len(df),
+        'colunas': df.columns.tolist(),
+        'particoes': particoes,
+        'impressoes': impressoes_particoes(df, particoes),
+        'segundos_conversao': round(time.perf_counter() - inicio, 3),
+    }
+    _gravar_manifesto(destino, manifesto)
+    return df, manifesto
+
+
+def _manifesto_valido(manifesto, destino):
+    return (
+        manifesto is not None
+        and manifesto.get('versao_formato') == VERSAO_FORMATO
+        and os.path.exists(os.path.join(destino, ARQUIVO_DADOS))
+    )
+
+
+def _mtime_manifesto(destino):
+    try:
+        return os.stat(os.path.join(destino, ARQUIVO_MANIFESTO)).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _artefatos(caminho_csv, destino=None):
+    """Entrada do cache do processo para o CSV, convertendo-o se necessário.
+
+    A chave do cache é o caminho com mtime e tamanho do CSV e o mtime do
+    manifesto (que muda quando uma correção é incorporada aos dados já
+    convertidos). Se o mtime do CSV mudou mas o hash continua igual ao do
+    manifesto, a conversão existente é reaproveitada; se o conteúdo mudou, só
+    as partições alteradas são reprocessadas (`enem.versionamento`). Sem o
+    CSV, usa o que já foi convertido (deploy só com os dados convertidos).
+    """
+    destino = destino or diretorio_padrao(caminho_csv)
+    caminho = os.path.abspath(caminho_csv)
+    try:
+        st = os.stat(caminho_csv)
+        chave = (caminho, st.st_mtime_ns, st.st_size, _mtime_manifesto(destino))
+    except FileNotFoundError:
+        st = None
+        chave = (caminho, None, None, _mtime_manifesto(destino))
+
+    artefatos = _cache.get(chave)
+    if artefatos is not None:
+        return artefatos
+
+    with _trava:
+        artefatos = _cache.get(chave)
+        if artefatos is not None:
+            return artefatos
+
+        valido = False
+        manifesto = _ler_manifesto(destino)
+        if st is None:
+            if not _manifesto_valido(manifesto, destino):
+                raise FileNotFoundError(caminho_csv)
+            valido = True
+        elif _manifesto_valido(manifesto, destino):
+            origem = manifesto['origem']
+            if origem['mtime_ns'] == st.st_mtime_ns and origem['tamanho'] == st.st_size:
+                valido = True
+            else:
+                sha256 = hash_arquivo(caminho_csv)
+                if sha256 == origem['sha256']:
+                    # Arquivo apenas "tocado": atualiza o mtime e reaproveita a conversão
+                    manifesto['origem'] = _origem(caminho_csv, sha256)
+                    _gravar_manifesto(destino, manifesto)
+                    valido = True
+        artefatos = {}
+        if not valido:
+            df = None
+            if _manifesto_valido(manifesto, destino):
+                from .versionamento import AtualizacaoImpossivel, atualizar
+
+                try:
+                    atualizar(caminho_csv, destino=destino, log=lambda *_: None)
+                    manifesto = _ler_manifesto(destino)
+                except AtualizacaoImpossivel:
+                    df, manifesto = converter_csv(caminho_csv, destino)
+            else:
+                df, manifesto = converter_csv(caminho_csv, destino)
+            if df is not None and not COMPARTILHADO:
+                # A conversão já deixa o DataFrame em memória
+                artefatos['dados'] = df
+            # Com o memory map, a cópia da conversão é descartada e os dados são reabertos
+            del df
+        # O manifesto pode ter sido regravado acima
+        chave = chave[:3] + (_mtime_manifesto(destino),)
+
+        versao = versao_manifesto(manifesto)
+        atualizacao = manifesto.get('atualizacao')
+        artefatos['atualizacao'] = atualizacao
+        # Mantém apenas a versão mais recente de cada arquivo no cache
+        for antiga in [k for k in _cache if k[0] == caminho]:
+            anteriores = _cache.pop(antiga)
+            if (atualizacao and anteriores['versao'] != versao
+                    and (anteriores['versao'], versao) == (atualizacao['versao_anterior'], atualizacao['versao'])):
+                # Resultados das UFs que não mudaram continuam valendo na nova versão
+                mantidos, descartados = cache_resultados.migrar(anteriores['versao'], versao, atualizacao['ufs'])
+                artefatos['atualizacao'] = {
+                    **atualizacao, 'resultados_mantidos': mantidos, 'resultados_descartados': descartados,
+                }
+        artefatos.update({
+            'destino': destino,
+            'particoes': manifesto['particoes'],
+            'linhas': manifesto['linhas'],
+            'ano': manifesto['ano'],
+            'versao': versao,
+        })
+        _cache[chave] = artefatos
+        return artefatos
+
+
+def carregar_dados(caminho_csv, destino=None):
+    """Carrega o dataset do dashboard, convertendo o CSV só quando ele muda.
+
+    Com `COMPARTILHADO`, as colunas são arrays somente leitura mapeados dos
+    arquivos da conversão; senão, uma cópia lida do Feather.
+    """
+    if COMPARTILHADO:
+        return _derivado(caminho_csv, destino, 'dados', lambda a: abrir_colunas(a['destino']))
+    return _derivado(
+        caminho_csv, destino, 'dados', lambda a: pd.read_feather(os.path.join(a['destino'], ARQUIVO_DADOS))
+    )
+
+
+def carregar_particao(caminho_csv, uf, destino=None):
+    """Linhas de uma UF como fatia contígua dos dados carregados (sem cópia).
+
+    `None` ou 'Todos' devolvem o dataset inteiro. A fatia compartilha memória
+    com o dataset do processo e não deve ser modificada.
+    """
+    df = carregar_dados(caminho_csv, destino)
+    if uf is None or uf == 'Todos':
+        return df
+    inicio, fim = _artefatos(caminho_csv, destino)['particoes'].get(uf, (0, 0))
+    return df.iloc[inicio:fim]
+
+
+def ufs_disponiveis(caminho_csv, destino=None):
+    """UFs com ao menos uma linha, em ordem alfabética."""
+    return list(_artefatos(caminho_csv, destino)['particoes'])
+
+
+def linhas_dados(caminho_csv, destino=None):
+    """Número de candidatos nos dados convertidos (do manifesto, sem carregá-los)."""
+    return _artefatos(caminho_csv, destino)['linhas']
+
+
+def linhas_por_uf(caminho_csv, destino=None):
+    """{uf: número de linhas} das partições dos dados convertidos."""
+    return {uf: fim - inicio for uf, (inicio, fim) in _artefatos(caminho_csv, destino)['particoes'].items()}
+
+
+def ano_dados(caminho_csv, destino=None):
+    """Edição (ano) dos dados convertidos."""
+    return _artefatos(caminho_csv, destino)['ano']
+
+
+def ultima_atualizacao(caminho_csv, destino=None):
+    """Última atualização incremental dos dados convertidos (`None` se não houve).
+
+    Inclui quantos resultados do cache este processo manteve e descartou.
+    """
+    return _artefatos(caminho_csv, destino)['atualizacao']
+
+
+def versao_dados(caminho_csv, destino=None):
+    """Identificador do conteúdo carregado (formato + impressões das partições).
+
+    Muda sempre que os dados mudam; serve de prefixo para chaves de cache.
+    """
+    return _artefatos(caminho_csv, destino)['versao']
+
+
+def _derivado(caminho_csv, destino, nome, construir):
+    """Estrutura derivada guardada junto aos dados no cache do processo."""
+    artefatos = _artefatos(caminho_csv, destino)
+    if nome not in artefatos:
+        with _trava:
+            if nome not in artefatos:
+                artefatos[nome] = construir(artefatos)
+    return artefatos[nome]
+
+
+def carregar_cubo(caminho_csv, destino=None):
+    """Carrega o cubo do explorador correspondente à conversão atual do CSV."""
+    return _derivado(caminho_csv, destino, 'cubo', lambda a: Cubo.carregar(a['destino']))
+
+
+def carregar_estatisticas(caminho_csv, destino=None):
+    """Acumuladores das notas por UF e categoria (`enem.estatisticas`) da conversão atual."""
+    return _derivado(caminho_csv, destino, 'estatisticas', lambda a: Estatisticas.carregar(a['destino']))
+
+
+def carregar_qualidade(caminho_csv, destino=None):
+    """Relatório de qualidade (`enem.qualidade`) gravado na conversão atual."""
+    return _derivado(caminho_csv, destino, 'qualidade', lambda a: carregar_relatorio(a['destino']))
+
+
+def carregar_amostra(caminho_csv, destino=None):
+    """Consultas aproximadas pela amostra estratificada (`None` para dados pequenos)."""
+    return _derivado(caminho_csv, destino, 'amostra', lambda a: ConsultasAmostra.carregar(a['destino']))
+
+
+def carregar_indice(caminho_csv, destino=None):
+    """Índice de bitmaps dos filtros, montado uma vez por versão dos dados."""
+    return _derivado(caminho_csv, destino, 'indice', lambda a: IndiceFiltros(carregar_dados(caminho_csv, destino)))
+
+
+def carregar_consultas(caminho_csv, destino=None, backend=None):
+    """Consultas das seções do dashboard no `backend` escolhido (padrão: `BACKEND`).
+
+    'pandas' responde sobre o DataFrame em memória; 'arrow' lê o arquivo
+    convertido por memory map, sem carregá-lo.
+    """
+    backend = backend or BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f'backend desconhecido: {backend} (opções: {", ".join(BACKENDS)})')
+    if backend == 'arrow':
+        construir = lambda a: ConsultasArrow(os.path.join(a['destino'], ARQUIVO_DADOS), a['particoes'])
+    else:
+        construir = lambda a: ConsultasPandas(
+            carregar_dados(caminho_csv, destino), a['particoes'], carregar_indice(caminho_csv, destino)
+        )
+    return _derivado(caminho_csv, destino, f'consultas_{backend}', construir)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Converte o CSV do INEP para o formato colunar do dashboard.')
+    parser.add_argument('csv', help='arquivo CSV dos microdados (separador ";", ISO-8859-1)')
+    parser.add_argument('--destino', help='diretório de saída (padrão: .enem_cache/<nome> ao lado do CSV)')
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    df, _ = converter_csv(args.csv, args.destino)
+    print(f"{len(df):,} linhas convertidas em {time.perf_counter() - inicio:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,261 @@
+"""Medição de tempo e memória das seções do dashboard a cada execução.
+
+Uma `Execucao` acompanha um rerun do script: `secao(nome)` marca o início de
+cada seção numerada (fechando a anterior), `medir(funcao, ...)` cronometra a
+montagem de tabelas e figuras e `plotly_chart(...)` cronometra o envio da
+figura ao navegador (que inclui a serialização para JSON). Cada registro
+guarda o tempo de parede e a variação de RSS do processo. A execução também
+anota os resultados exibidos como estimativa da amostra (`aproximados`),
+cujo valor exato ainda está sendo calculado.
+
+Os registros podem ser exibidos no painel de diagnóstico da barra lateral
+(`painel`) e acrescentados como uma linha JSON por execução (`gravar_jsonl`).
+`Perfilador` captura o perfil completo de uma execução com o pyinstrument,
+quando instalado, ou com o cProfile da biblioteca padrão.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+_TAMANHO_PAGINA = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+# -------------------- Memória do processo --------------------
+
+def rss_mb():
+    """RSS atual do processo em MB (no Linux); nos demais sistemas, o pico."""
+    try:
+        with open('/proc/self/statm') as f:
+            return round(int(f.read().split()[1]) * _TAMANHO_PAGINA / (1024 * 1024), 1)
+    except OSError:
+        return pico_rss_mb()
+
+
+def memoria_anonima_mb():
+    """Parte do RSS que não vem de arquivos mapeados (heap e pilhas), em MB; só no Linux.
+
+    Páginas de arquivos mapeados (os dados em `enem.compartilhado`) entram no
+    RSS de cada processo que as lê, mas existem uma única vez no sistema.
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for linha in f:
+                if linha.startswith('RssAnon:'):
+                    return round(int(linha.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def reiniciar_pico_rss():
+    """Zera o pico de RSS do processo (Linux); nos demais sistemas o pico é acumulado."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def pico_rss_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for linha in f:
+                if linha.startswith('VmHWM:'):
+                    return round(int(linha.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss vem em KB no Linux e em bytes no macOS
+    return round(pico / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _diferenca(depois, antes):
+    if depois is None or antes is None:
+        return None
+    return round(depois - antes, 1)
+
+
+# -------------------- Execução --------------------
+
+class Execucao:
+    """Registros de tempo e memória das seções e etapas de um rerun.
+
+    `escopo` identifica o que foi executado: a página inteira ou apenas um
+    fragmento dela.
+    """
+
+    def __init__(self, escopo='página'):
+        self.escopo = escopo
+        self.id = uuid.uuid4().hex[:12]
+        self.data = datetime.now(timezone.utc).isoformat(timespec='milliseconds')
+        self.secoes = []
+        self.etapas = []
+        self.total = None
+        # Chaves dos resultados mostrados como estimativa nesta execução
+        self.aproximados = []
+        self._inicio = time.perf_counter()
+        self._rss_inicio = rss_mb()
+        self._aberta = None
+
+    def secao(self, nome):
+        """Fecha a seção em andamento e inicia `nome`."""
+        self._fechar_secao()
+        self._aberta = (nome, time.perf_counter(), rss_mb())
+
+    def _fechar_secao(self):
+        if self._aberta is None:
+            return
+        nome, inicio, rss_inicio = self._aberta
+        rss = rss_mb()
+        self.secoes.append({
+            'secao': nome,
+            'segundos': round(time.perf_counter() - inicio, 6),
+            'rss_mb': rss,
+            'delta_rss_mb': _diferenca(rss, rss_inicio),
+        })
+        self._aberta = None
+
+    @property
+    def secao_atual(self):
+        return self._aberta[0] if self._aberta else None
+
+    @contextmanager
+    def etapa(self, nome):
+        """Cronometra um trecho dentro da seção em andamento."""
+        inicio, rss_inicio = time.perf_counter(), rss_mb()
+        try:
+            yield
+        finally:
+            rss = rss_mb()
+            self.etapas.append({
+                'secao': self.secao_atual,
+                'etapa': nome,
+                'segundos': round(time.perf_counter() - inicio, 6),
+                'delta_rss_mb': _diferenca(rss, rss_inicio),
+            })
+
+    def medir(self, funcao, *args, **kwargs):
+        """Chama `funcao(*args, **kwargs)` registrando-a como etapa com o nome da função."""
+        with self.etapa(getattr(funcao, '__name__', repr(funcao))):
+            return funcao(*args, **kwargs)
+
+    def plotly_chart(self, container, fig, **kwargs):
+        """`container.plotly_chart(fig, ...)` cronometrado (inclui a serialização da figura)."""
+        titulo = fig.layout.title.text or 'figura'
+        with self.etapa(f'plotly_chart: {titulo}'):
+            return container.plotly_chart(fig, **kwargs)
+
+    def encerrar(self):
+        """Fecha a última seção e registra o tempo total da execução."""
+        self._fechar_secao()
+        self.total = round(time.perf_counter() - self._inicio, 6)
+        return self
+
+    def documento(self, **extras):
+        """Dicionário serializável com todos os registros da execução."""
+        return {
+            'execucao': self.id,
+            'escopo': self.escopo,
+            'data': self.data,
+            'segundos': self.total,
+            'rss_mb': rss_mb(),
+            'delta_rss_mb': _diferenca(rss_mb(), self._rss_inicio),
+            **extras,
+            'aproximados': len(self.aproximados),
+            'secoes': self.secoes,
+            'etapas': self.etapas,
+        }
+
+
+def execucao_do_fragmento(execucao, nome):
+    """Medição a usar no corpo de um fragmento e se ela pertence só a ele.
+
+    Quando o fragmento roda junto com a página, `execucao` ainda está aberta e
+    é reaproveitada; quando só o fragmento é reexecutado, a da página já foi
+    encerrada e uma nova é criada (e deve ser encerrada pelo fragmento).
+    """
+    if execucao.total is None:
+        return execucao, False
+    return Execucao(f'fragmento: {nome}'), True
+
+
+def gravar_jsonl(caminho, documento):
+    """Acrescenta `documento` como uma linha JSON em `caminho`."""
+    pasta = os.path.dirname(caminho)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+    with open(caminho, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(documento, ensure_ascii=False) + '\n')
+
+
+def painel(execucao, container):
+    """Tabelas de seções e etapas da execução em um container do Streamlit."""
+    import pandas as pd
+
+    container.metric('Tempo da execução', f'{execucao.total:.3f}s', help=f'execução {execucao.id}')
+    anonima = memoria_anonima_mb()
+    container.metric(
+        'RSS do processo', f'{rss_mb() or 0:,.0f} MB',
+        help=f'{anonima:,.0f} MB anônimos (heap); o resto são arquivos mapeados' if anonima is not None else None,
+    )
+    if execucao.secoes:
+        container.dataframe(pd.DataFrame(execucao.secoes).set_index('secao'), use_container_width=True)
+    if execucao.etapas:
+        etapas = pd.DataFrame(execucao.etapas).sort_values('segundos', ascending=False)
+        container.markdown('**Etapas mais lentas**')
+        container.dataframe(etapas.set_index('etapa'), use_container_width=True)
+
+
+# -------------------- Perfil de uma execução --------------------
+
+class Perfilador:
+    """Perfil de uma execução inteira com pyinstrument (se instalado) ou cProfile."""
+
+    def __init__(self, destino):
+        self.destino = destino
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            self.ferramenta = 'cProfile'
+            self._perfil = cProfile.Profile()
+        else:
+            self.ferramenta = 'pyinstrument'
+            self._perfil = Profiler()
+
+    def iniciar(self):
+        if self.ferramenta == 'pyinstrument':
+            self._perfil.start()
+        else:
+            self._perfil.enable()
+
+    def parar(self, linhas=30):
+        """Encerra a captura e grava o perfil em `destino`.
+
+        Retorna o caminho do arquivo e um resumo em texto.
+        """
+        os.makedirs(self.destino, exist_ok=True)
+        nome = datetime.now().strftime('perfil-%Y%m%d-%H%M%S')
+        if self.ferramenta == 'pyinstrument':
+            self._perfil.stop()
+            caminho = os.path.join(self.destino, nome + '.html')
+            with open(caminho, 'w', encoding='utf-8') as f:
+                f.write(self._perfil.output_html())
+            return caminho, self._perfil.output_text(unicode=True, color=False)
+        self._perfil.disable()
+        # Abre com `python -m pstats` ou snakeviz
+        caminho = os.path.join(self.destino, nome + '.prof')
+        self._perfil.dump_stats(caminho)
+        saida = io.StringIO()
+        pstats.Stats(self._perfil, stream=saida).sort_stats('cumulative').print_stats(linhas)
+        return caminho, saida.getvalue()
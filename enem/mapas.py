@@ -0,0 +1,132 @@
+"""Mapeamentos dos códigos dos microdados do ENEM para rótulos legíveis."""
+
+# Mapear sexo para rótulos legíveis
+mapa_sexo = {'M': 'Masculino', 'F': 'Feminino'}
+
+# Mapeamento dos códigos de cor/raça para nomes legíveis
+mapa_cor_raca = {
+    0: 'Não declarado',
+    1: 'Branca',
+    2: 'Preta',
+    3: 'Parda',
+    4: 'Amarela',
+    5: 'Indígena',
+    6: 'Não dispõe'
+}
+
+# -------------------- Renda familiar (Q006) por edição --------------------
+# As faixas do questionário são múltiplos do salário mínimo do ano da prova, e o
+# conjunto de faixas também muda entre edições (2021 tem a faixa de 3 a 3,5
+# salários). Edição -> (salário mínimo, limites superiores das faixas em salários);
+# uma edição nova entra acrescentando uma linha conforme o dicionário do INEP.
+_LIMITES_17 = [1, 1.5, 2, 2.5, 3, 4, 5, 6, 7, 8, 9, 10, 12, 15, 20]
+_LIMITES_18 = [1, 1.5, 2, 2.5, 3, 3.5, 4, 5, 6, 7, 8, 9, 10, 12, 15, 20]
+FAIXAS_RENDA = {
+    2019: (998, _LIMITES_17),
+    2020: (1045, _LIMITES_17),
+    2021: (1100, _LIMITES_18),
+    2022: (1212, _LIMITES_17),
+    2023: (1320, _LIMITES_17),
+}
+
+# Edição considerada quando o CSV não informa NU_ANO
+ANO_PADRAO = 2021
+
+
+def _reais(valor):
+    return 'R$ ' + f'{valor:,.2f}'.replace(',', '_').replace('.', ',').replace('_', '.')
+
+
+def _salarios(valor):
+    return f'{valor:g}'.replace('.', ',')
+
+
+def _faixas(ano):
+    try:
+        return FAIXAS_RENDA[ano]
+    except KeyError:
+        raise KeyError(f'sem faixas de renda para a edição {ano}; acrescente-a em FAIXAS_RENDA') from None
+
+
+def mapa_renda(ano=ANO_PADRAO):
+    """Código Q006 ('A' = nenhuma renda, 'B', ...) -> faixa em reais da edição."""
+    salario, limites = _faixas(ano)
+    rotulos = ['Nenhuma Renda', f'Até {_reais(salario)}']
+    for inferior, superior in zip(limites, limites[1:]):
+        rotulos.append(f'De {_reais(inferior * salario + 0.01)} até {_reais(superior * salario)}')
+    rotulos.append(f'Acima de {_reais(limites[-1] * salario)}')
+    return {chr(ord('A') + i): rotulo for i, rotulo in enumerate(rotulos)}
+
+
+def _faixas_salarios(ano):
+    # (limites inferior e superior em salários, rótulo) de cada faixa da edição, na ordem de Q006
+    _, limites = _faixas(ano)
+    faixas = [(0, 0, 'Nenhuma renda'), (0, 1, 'Até 1 salário mínimo')]
+    for inferior, superior in zip(limites, limites[1:]):
+        faixas.append((inferior, superior, f'De {_salarios(inferior)} a {_salarios(superior)} salários mínimos'))
+    faixas.append((limites[-1], float('inf'), f'Acima de {_salarios(limites[-1])} salários mínimos'))
+    return faixas
+
+
+def mapa_renda_salarios(ano=ANO_PADRAO):
+    """Faixa em reais da edição -> mesma faixa em salários mínimos, comparável entre edições."""
+    return dict(zip(mapa_renda(ano).values(), [rotulo for _, _, rotulo in _faixas_salarios(ano)]))
+
+
+def ordem_renda_salarios(anos):
+    """Faixas em salários mínimos das edições `anos`, em ordem crescente."""
+    faixas = {rotulo: (inferior, superior) for ano in anos for inferior, superior, rotulo in _faixas_salarios(ano)}
+    return sorted(faixas, key=lambda rotulo: faixas[rotulo][::-1])
+
+
+# Faixas de renda familiar (Q006) da edição padrão, na ordem do questionário
+map_renda = mapa_renda(ANO_PADRAO)
+ordem_renda = list(map_renda.values())
+
+# Mapeamento das respostas para Q024 (computador) e Q025 (internet)
+mapa_computador = {
+    'A': 'Não',
+    'B': 'Sim, um',
+    'C': 'Sim, dois',
+    'D': 'Sim, três',
+    'E': 'Sim, quatro ou mais'
+}
+ordem_computador = ['Não', 'Sim, um', 'Sim, dois', 'Sim, três', 'Sim, quatro ou mais']
+
+mapa_internet = {
+    'A': 'Não',
+    'B': 'Sim'
+}
+
+# Colunas de presença do ENEM e nomes legíveis das áreas
+presence_cols = {
+    'TP_PRESENCA_CN': 'Ciências da Natureza',
+    'TP_PRESENCA_CH': 'Ciências Humanas',
+    'TP_PRESENCA_LC': 'Linguagens e Códigos',
+    'TP_PRESENCA_MT': 'Matemática',
+}
+mapa_presenca = {0: 'Faltou', 1: 'Presente', 2: 'Eliminado', 3: 'Anulado'}
+
+# Escolaridade do pai (Q001) e da mãe (Q002)
+mapa_escolaridade = {
+    'A': 'Nunca estudou',
+    'B': 'Fundamental I incompleto',
+    'C': 'Fundamental I completo',
+    'D': 'Fundamental II completo',
+    'E': 'Ensino médio completo',
+    'F': 'Superior completo',
+    'G': 'Pós-graduação',
+    'H': 'Não sabe',
+}
+
+# Telefones celulares na residência (Q022)
+mapa_celular = {
+    'A': 'Não',
+    'B': 'Sim, um',
+    'C': 'Sim, dois',
+    'D': 'Sim, três',
+    'E': 'Sim, quatro ou mais'
+}
+
+# Tipo de escola do ensino médio (TP_ESCOLA)
+mapa_escola = {1: 'Não respondeu', 2: 'Pública', 3: 'Privada', 4: 'Exterior'}
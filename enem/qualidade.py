@@ -0,0 +1,201 @@
+"""Perfil de qualidade dos microdados, calculado durante a ingestão.
+
+Cada bloco lido do CSV (o arquivo inteiro em `enem.ingestao`, as faixas de
+bytes em `enem.etl`) é perfilado em uma passada vetorizada, antes do
+esquema transformar códigos desconhecidos em ausentes:
+
+- ausentes por coluna e notas fora da escala de 0 a 1000;
+- frequências de cada código, validadas contra o domínio conhecido
+  (`mapa_cor_raca`, faixas de renda da edição, `mapa_computador`,
+  `mapa_internet`, `mapa_presenca`, ...): blocos com códigos fora do
+  domínio são sinalizados com a sua faixa de bytes;
+- um hash de 64 bits por linha (`pd.util.hash_pandas_object`), guardado
+  como vetor ordenado de hashes distintos, para contar linhas duplicadas
+  dentro de cada bloco e entre blocos sem manter as linhas.
+
+Os perfis dos blocos se combinam e o relatório é gravado em
+`qualidade.json`, ao lado dos dados convertidos, para o dashboard exibir
+sem recalcular (`python -m enem.qualidade dados.csv` o mostra no terminal).
+Colisões de hash de 64 bits são desprezíveis nesta escala
+(cerca de 1 em 10^6 para 5 milhões de linhas).
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from .esquema import CATEGORIAS, NOTAS, PRESENCAS, ROTULOS, _chave
+from .mapas import ANO_PADRAO, mapa_presenca, mapa_renda
+from .quantis import NOTA_MAXIMA
+
+ARQUIVO_QUALIDADE = 'qualidade.json'
+
+
+def dominios(ano=ANO_PADRAO):
+    """Códigos válidos de cada coluna na edição `ano` (como texto, ver `esquema._chave`)."""
+    validos = {col: list(categorias) for col, categorias in CATEGORIAS.items()}
+    for col, mapa, _ in ROTULOS.values():
+        validos[col] = list(mapa)
+    # As faixas de renda mudam entre edições
+    validos['Q006'] = list(mapa_renda(ano))
+    for col in PRESENCAS:
+        validos[col] = list(mapa_presenca)
+    return {col: {_chave(c) for c in codigos} for col, codigos in validos.items()}
+
+
+class PerfilQualidade:
+    """Contagens de qualidade de um ou mais blocos e os hashes distintos das linhas."""
+
+    def __init__(self, linhas, ausentes, frequencias, fora_da_escala, hashes, duplicadas, blocos):
+        self.linhas = linhas
+        self.ausentes = ausentes
+        self.frequencias = frequencias
+        self.fora_da_escala = fora_da_escala
+        self.hashes = hashes
+        self.duplicadas = duplicadas
+        self.blocos = blocos
+
+    @classmethod
+    def construir(cls, df, ano=ANO_PADRAO, bloco=0, faixa=None):
+        """Perfil de `df` como lido do CSV (antes de `esquema.aplicar_esquema`).
+
+        `faixa` é o intervalo de bytes do bloco no CSV, registrado quando o
+        bloco tem códigos fora do domínio.
+        """
+        ausentes = {col: int(n) for col, n in df.isna().sum().items()}
+        frequencias = {}
+        for col in df.columns:
+            if col not in CATEGORIAS:
+                continue
+            serie = df[col] if isinstance(df[col].dtype, pd.CategoricalDtype) else df[col].astype('category')
+            contagens = np.bincount(serie.cat.codes.to_numpy()[serie.notna().to_numpy()],
+                                    minlength=len(serie.cat.categories))
+            frequencias[col] = {
+                _chave(c): int(n) for c, n in zip(serie.cat.categories, contagens) if n
+            }
+        fora_da_escala = {}
+        for col in NOTAS:
+            if col in df.columns:
+                nota = pd.to_numeric(df[col], errors='coerce')
+                fora_da_escala[col] = int(((nota < 0) | (nota > NOTA_MAXIMA)).sum())
+
+        hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        distintos = _distintos(hashes)
+        fora = _fora_do_dominio(frequencias, dominios(ano))
+        blocos = []
+        if fora:
+            blocos.append({'bloco': bloco, 'faixa_bytes': list(faixa) if faixa else None, 'fora_do_dominio': fora})
+        return cls(len(df), ausentes, frequencias, fora_da_escala, distintos, len(df) - len(distintos), blocos)
+
+    @classmethod
+    def combinar(cls, perfis):
+        """Soma os perfis de blocos; duplicatas entre blocos saem da união dos hashes."""
+        if len(perfis) == 1:
+            return perfis[0]
+        frequencias = {}
+        for col in dict.fromkeys(col for p in perfis for col in p.frequencias):
+            frequencias[col] = _somar([p.frequencias.get(col, {}) for p in perfis])
+        hashes = np.concatenate([p.hashes for p in perfis])
+        distintos = _distintos(hashes)
+        return cls(
+            sum(p.linhas for p in perfis),
+            _somar([p.ausentes for p in perfis]),
+            frequencias,
+            _somar([p.fora_da_escala for p in perfis]),
+            distintos,
+            sum(p.duplicadas for p in perfis) + len(hashes) - len(distintos),
+            [b for p in perfis for b in p.blocos],
+        )
+
+    def relatorio(self, ano=ANO_PADRAO):
+        """Relatório serializável em JSON."""
+        return {
+            'ano': ano,
+            'linhas': self.linhas,
+            'duplicadas': self.duplicadas,
+            'ausentes': self.ausentes,
+            'percentual_ausentes': {
+                col: round(n / self.linhas * 100, 2) if self.linhas else 0.0 for col, n in self.ausentes.items()
+            },
+            'notas_fora_da_escala': self.fora_da_escala,
+            'frequencias': self.frequencias,
+            'fora_do_dominio': _fora_do_dominio(self.frequencias, dominios(ano)),
+            'blocos_sinalizados': self.blocos,
+        }
+
+    def salvar(self, destino, ano=ANO_PADRAO):
+        caminho = os.path.join(destino, ARQUIVO_QUALIDADE)
+        temporario = caminho + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(self.relatorio(ano), f, ensure_ascii=False, indent=2)
+        os.replace(temporario, caminho)
+
+
+def _distintos(hashes):
+    # Ordena e descarta repetidos (mais rápido que np.unique para uint64)
+    hashes = np.sort(hashes)
+    return hashes[np.concatenate(([True], hashes[1:] != hashes[:-1]))]
+
+
+def _somar(dicionarios):
+    total = {}
+    for d in dicionarios:
+        for chave, n in d.items():
+            total[chave] = total.get(chave, 0) + n
+    return total
+
+
+def _fora_do_dominio(frequencias, validos):
+    # {coluna: {código: linhas}} dos códigos observados que o domínio não prevê
+    fora = {}
+    for col, contagens in frequencias.items():
+        invalidos = {codigo: n for codigo, n in contagens.items() if col in validos and codigo not in validos[col]}
+        if invalidos:
+            fora[col] = invalidos
+    return fora
+
+
+def carregar(destino):
+    """Relatório gravado na conversão (`None` se não existe)."""
+    try:
+        with open(os.path.join(destino, ARQUIVO_QUALIDADE), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def resumo(relatorio):
+    """Tabela por coluna: ausentes, percentual, códigos distintos e códigos fora do domínio."""
+    tabela = pd.DataFrame({
+        'ausentes': pd.Series(relatorio['ausentes'], dtype='int64'),
+        'pct_ausentes': pd.Series(relatorio['percentual_ausentes'], dtype='float64'),
+    })
+    # Códigos distintos só para as colunas de código (NaN nas notas)
+    tabela['distintos'] = pd.Series({col: len(f) for col, f in relatorio['frequencias'].items()}, dtype='Int64')
+    fora = {col: sum(relatorio['fora_do_dominio'].get(col, {}).values()) for col in relatorio['frequencias']}
+    tabela['fora_do_dominio'] = pd.Series(fora, dtype='Int64')
+    return tabela.sort_values('ausentes', ascending=False)
+
+
+def main(argv=None):
+    # Import tardio: enem.ingestao usa este módulo na conversão
+    from .ingestao import carregar_qualidade
+
+    parser = argparse.ArgumentParser(description='Mostra o relatório de qualidade gravado na conversão do CSV.')
+    parser.add_argument('csv', help='arquivo CSV dos microdados (convertido se ainda não foi)')
+    parser.add_argument('--destino', help='diretório da conversão (padrão: .enem_cache/<nome> ao lado do CSV)')
+    args = parser.parse_args(argv)
+
+    relatorio = carregar_qualidade(args.csv, args.destino)
+    print(f"{relatorio['linhas']:,} linhas, {relatorio['duplicadas']:,} duplicadas")
+    print(resumo(relatorio).to_string())
+    for bloco in relatorio['blocos_sinalizados']:
+        print(f"bloco {bloco['bloco'] + 1} (bytes {bloco['faixa_bytes']}): fora do domínio {bloco['fora_do_dominio']}")
+    return 1 if relatorio['fora_do_dominio'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,379 @@
+"""Quantis exatos a partir de histogramas de grade fixa.
+
+As notas do ENEM vão de 0 a 1000 com uma casa decimal, então um vetor de
+contagens por bin de 0,1 ponto representa a distribuição sem perda. Mediana,
+quartis, limites de IQR e percentual de outliers saem das contagens
+acumuladas, sem ordenar as notas, e os histogramas de grupos ou partições
+diferentes se combinam por soma.
+
+A `NOTA_MEDIA` é a média de 1 a 5 notas presentes: com soma s de décimos e
+k notas, vale s / (10k), e como 10k divide 600 para todo k de 1 a 5, cai
+sempre na grade de 1/600 de ponto (bin s · 60/k). `bins_media` calcula esse
+bin pela soma inteira dos décimos e pelo número de notas, sem depender do
+arredondamento da média; arredondar a média gravada (float32) para a mesma
+grade dá o mesmo bin.
+
+A interpolação segue a do `pd.Series.quantile` (linear), de modo que os
+resultados coincidem com os do pandas quando os valores caem na grade.
+
+Os histogramas guardam só os bins ocupados. Quando a distribuição fica em
+duas escalas (contagens por faixa larga e os bins finos de cada faixa, como
+no cubo do explorador), `ResumoQuantis` obtém os mesmos quartis, bigodes e
+outliers lendo apenas as faixas que os contêm.
+"""
+import numpy as np
+import pandas as pd
+
+NOTA_MAXIMA = 1000.0
+
+# Notas individuais têm uma casa decimal
+PASSO_NOTA = 0.1
+# Médias de 1 a 5 notas com uma casa decimal caem na grade de 1/600
+PASSO_MEDIA = 1 / 600
+MAXIMO_NOTAS_MEDIA = 5
+
+# Acima deste número de posições, as contagens saem de np.unique em vez de
+# um np.bincount denso (grupos × 600.001 bins na grade da média)
+LIMITE_DENSO = 1 << 22
+
+
+def n_bins(passo):
+    return int(round(NOTA_MAXIMA / passo)) + 1
+
+
+def _por_ponto(passo):
+    return int(round(1 / passo))
+
+
+def _valores_dos_bins(indices, passo):
+    """Valores dos bins `indices` na grade de `passo`.
+
+    Divide pelo número inteiro de bins por ponto: os bins de valores inteiros
+    (início das faixas de 1 ponto) dão exatamente o inteiro, o que o produto
+    por 1/600 não garante.
+    """
+    return np.asarray(indices) / _por_ponto(passo)
+
+
+def bins(valores, passo):
+    """Índice do bin de cada valor não nulo de `valores` na grade de `passo`."""
+    valores = np.asarray(valores, dtype=np.float64)
+    valores = valores[~np.isnan(valores)]
+    return np.clip(np.rint(valores * _por_ponto(passo)), 0, n_bins(passo) - 1).astype(np.int64)
+
+
+def passo_de(coluna):
+    """Grade em que os valores de `coluna` são exatos."""
+    return PASSO_MEDIA if coluna == 'NOTA_MEDIA' else PASSO_NOTA
+
+
+def bins_media(notas):
+    """Bin de `PASSO_MEDIA` da média de cada linha de `notas` com ao menos uma nota.
+
+    `notas` é uma matriz linhas × notas (NaN nas ausentes), como a das
+    colunas usadas para calcular a `NOTA_MEDIA`.
+    """
+    notas = np.asarray(notas, dtype=np.float64)
+    if notas.shape[1] > MAXIMO_NOTAS_MEDIA:
+        raise ValueError(f'a grade da média é exata para até {MAXIMO_NOTAS_MEDIA} notas')
+    presentes = ~np.isnan(notas)
+    k = presentes.sum(axis=1)
+    decimos = np.rint(np.where(presentes, notas, 0) * 10).astype(np.int64).sum(axis=1)
+    com_nota = k > 0
+    return decimos[com_nota] * (60 // k[com_nota])
+
+
+def contar_bins(chaves, tamanho, pesos=None):
+    """Chaves ocupadas (crescentes) e suas contagens, para `chaves` em [0, `tamanho`)."""
+    if tamanho <= LIMITE_DENSO:
+        contagens = np.bincount(chaves, weights=pesos, minlength=tamanho)
+        indices = np.flatnonzero(contagens)
+        return indices, contagens[indices]
+    if pesos is None:
+        return np.unique(chaves, return_counts=True)
+    indices, posicao = np.unique(chaves, return_inverse=True)
+    return indices, np.bincount(posicao, weights=pesos)
+
+
+def separar(chaves, contagens, k, passo):
+    """Histogramas dos `k` grupos a partir de `contar_bins` sobre grupo · n_bins + bin."""
+    nb = n_bins(passo)
+    contagens = np.rint(contagens).astype(np.int64)
+    ocupadas = contagens > 0
+    chaves, contagens = chaves[ocupadas], contagens[ocupadas]
+    limites = np.searchsorted(chaves, np.arange(k + 1) * nb)
+    return [
+        Histograma.esparso(chaves[a:b] - i * nb, contagens[a:b], passo)
+        for i, (a, b) in enumerate(zip(limites[:-1], limites[1:]))
+    ]
+
+
+def _interpolar(n, valores_nas_posicoes, q):
+    """Quantis com interpolação linear a partir dos valores nas posições da amostra ordenada."""
+    qs = np.atleast_1d(np.asarray(q, dtype=np.float64))
+    if n == 0:
+        resultado = np.full(len(qs), np.nan)
+    else:
+        h = (n - 1) * qs
+        baixo = np.floor(h).astype(np.int64)
+        alto = np.minimum(baixo + 1, n - 1)
+        valores = valores_nas_posicoes(np.concatenate([baixo, alto]))
+        v_baixo, v_alto = valores[:len(qs)], valores[len(qs):]
+        resultado = v_baixo + (h - baixo) * (v_alto - v_baixo)
+    return resultado if np.ndim(q) else float(resultado[0])
+
+
+class Histograma:
+    """Contagens por bin de largura `passo` entre 0 e `NOTA_MAXIMA`.
+
+    Só os bins ocupados são guardados (`indices`, em ordem crescente, e
+    `quantidades`): o tamanho acompanha o número de valores distintos, não o
+    da grade.
+    """
+
+    def __init__(self, contagens, passo=PASSO_NOTA):
+        contagens = np.asarray(contagens)
+        if len(contagens) != n_bins(passo):
+            raise ValueError(f'histograma com {len(contagens)} bins; esperado {n_bins(passo)}')
+        self.indices = np.flatnonzero(contagens)
+        self.quantidades = contagens[self.indices].astype(np.int64)
+        self.passo = passo
+
+    @classmethod
+    def esparso(cls, indices, quantidades, passo=PASSO_NOTA):
+        """Histograma dos bins ocupados `indices` (crescentes, sem repetição)."""
+        histograma = cls.__new__(cls)
+        histograma.indices = np.asarray(indices, dtype=np.int64)
+        histograma.quantidades = np.asarray(quantidades, dtype=np.int64)
+        histograma.passo = passo
+        return histograma
+
+    @classmethod
+    def vazio(cls, passo=PASSO_NOTA):
+        return cls.esparso([], [], passo)
+
+    @classmethod
+    def de_valores(cls, valores, passo=PASSO_NOTA):
+        """Histograma dos valores não nulos (NaN são ignorados, como no pandas)."""
+        return cls.esparso(*contar_bins(bins(valores, passo), n_bins(passo)), passo)
+
+    @property
+    def contagens(self):
+        """Vetor denso de contagens, uma posição por bin da grade."""
+        contagens = np.zeros(n_bins(self.passo), dtype=np.int64)
+        contagens[self.indices] = self.quantidades
+        return contagens
+
+    @property
+    def nbytes(self):
+        return self.indices.nbytes + self.quantidades.nbytes
+
+    def __add__(self, outro):
+        if self.passo != outro.passo:
+            raise ValueError('histogramas com grades diferentes não podem ser somados')
+        indices, posicao = np.unique(np.concatenate([self.indices, outro.indices]), return_inverse=True)
+        quantidades = np.bincount(posicao, weights=np.concatenate([self.quantidades, outro.quantidades]))
+        return Histograma.esparso(indices, quantidades, self.passo)
+
+    def __radd__(self, outro):
+        # Permite sum(histogramas)
+        if outro == 0:
+            return self
+        return self.__add__(outro)
+
+    @property
+    def n(self):
+        return int(self.quantidades.sum())
+
+    def _acumulado(self):
+        if not hasattr(self, '_cache_acumulado'):
+            self._cache_acumulado = np.cumsum(self.quantidades)
+        return self._cache_acumulado
+
+    def valores_nas_posicoes(self, posicoes):
+        """Valores nas posições (base 0) da amostra ordenada."""
+        posicoes = np.searchsorted(self._acumulado(), np.asarray(posicoes), side='right')
+        return _valores_dos_bins(self.indices[posicoes], self.passo)
+
+    def quantil(self, q):
+        """Quantil (ou lista de quantis) com interpolação linear."""
+        return _interpolar(self.n, self.valores_nas_posicoes, q)
+
+    def mediana(self):
+        return self.quantil(0.5)
+
+    def quartis(self):
+        """(Q1, mediana, Q3)."""
+        return tuple(self.quantil([0.25, 0.5, 0.75]))
+
+    def limites_iqr(self, fator=1.5):
+        """Limites inferior e superior para outliers pelo critério do IQR."""
+        q1, _, q3 = self.quartis()
+        iqr = q3 - q1
+        return q1 - fator * iqr, q3 + fator * iqr
+
+    def _valores(self):
+        return _valores_dos_bins(self.indices, self.passo)
+
+    def _dentro(self, lim_inf, lim_sup):
+        valores = self._valores()
+        return (valores >= lim_inf) & (valores <= lim_sup)
+
+    def bigodes(self, fator=1.5):
+        """Extremos dos bigodes do box plot: o menor e o maior valor observados
+        dentro dos limites do IQR (mesmo critério do Plotly)."""
+        if self.n == 0:
+            return float('nan'), float('nan')
+        return self._extremos_entre(*self.limites_iqr(fator))
+
+    def _extremos_entre(self, lim_inf, lim_sup):
+        valores = self._valores()[self._dentro(lim_inf, lim_sup)]
+        return valores[0], valores[-1]
+
+    def fora(self, lim_inf, lim_sup):
+        """Histograma só dos valores abaixo de `lim_inf` ou acima de `lim_sup`."""
+        fora = ~self._dentro(lim_inf, lim_sup)
+        return Histograma.esparso(self.indices[fora], self.quantidades[fora], self.passo)
+
+    def amostra(self, limite=200, semente=0):
+        """Até `limite` valores sorteados proporcionalmente às contagens dos
+        bins (os valores da grade são exatos)."""
+        total = self.n
+        if total <= limite:
+            return np.repeat(self._valores(), self.quantidades)
+        rng = np.random.default_rng(semente)
+        posicoes = np.sort(rng.choice(total, size=limite, replace=False))
+        return self.valores_nas_posicoes(posicoes)
+
+    def amostra_outliers(self, limite=200, fator=1.5, semente=0):
+        """Até `limite` valores fora dos bigodes (ver `amostra`)."""
+        if self.n == 0:
+            return np.array([])
+        return self.fora(*self.limites_iqr(fator)).amostra(limite, semente)
+
+    def percentual_outliers(self, fator=1.5):
+        n = self.n
+        if n == 0:
+            return float('nan')
+        return self.fora(*self.limites_iqr(fator)).n / n * 100
+
+    def media(self):
+        n = self.n
+        if n == 0:
+            return float('nan')
+        return float(np.dot(self.quantidades, self.indices) / _por_ponto(self.passo) / n)
+
+    def minimo(self):
+        return _valores_dos_bins(self.indices[0], self.passo) if len(self.indices) else float('nan')
+
+    def maximo(self):
+        return _valores_dos_bins(self.indices[-1], self.passo) if len(self.indices) else float('nan')
+
+    def em_faixas(self, n_faixas=20):
+        """Reagrupa o histograma em `n_faixas` de mesma largura entre o mínimo
+        e o máximo observados. Retorna um DataFrame com início, fim e contagem."""
+        if len(self.indices) == 0:
+            return pd.DataFrame({'inicio': [], 'fim': [], 'count': []})
+        valores = self._valores()
+        minimo, maximo = valores[0], valores[-1]
+        bordas = np.linspace(minimo, maximo if maximo > minimo else minimo + 1, n_faixas + 1)
+        faixa = np.clip(np.searchsorted(bordas, valores, side='right') - 1, 0, n_faixas - 1)
+        soma = np.bincount(faixa, weights=self.quantidades, minlength=n_faixas)
+        return pd.DataFrame({'inicio': bordas[:-1], 'fim': bordas[1:], 'count': soma.astype(np.int64)})
+
+
+class ResumoQuantis:
+    """Quartis, bigodes e outliers exatos de uma distribuição guardada em duas escalas.
+
+    `grosso` é o histograma em faixas largas (na grade do seu `passo`) e
+    `fino(faixas)` devolve o histograma exato só dos valores dessas faixas; a
+    faixa f reúne os valores v com floor(v / grosso.passo) == f. Apenas as
+    faixas com os quartis, as caudas além dos limites do IQR e as vizinhas
+    dos limites são refinadas. O resumo guarda só o histograma grosso (para
+    as faixas do gráfico) e até `limite_outliers` outliers sorteados, e
+    responde como um `Histograma` às figuras (`enem.graficos`).
+    """
+
+    def __init__(self, grosso, fino, fator=1.5, limite_outliers=200):
+        self.grosso = grosso
+        self.n = grosso.n
+        if self.n == 0:
+            self._quartis = (float('nan'),) * 3
+            self._bigodes = (float('nan'), float('nan'))
+            self._n_fora = 0
+            self._outliers = np.array([])
+            return
+
+        def valores_nas_posicoes(posicoes):
+            acumulado = grosso._acumulado()
+            faixa = np.searchsorted(acumulado, posicoes, side='right')
+            antes = acumulado - grosso.quantidades
+            valores = np.empty(len(posicoes))
+            for i in np.unique(faixa):
+                mesma = faixa == i
+                valores[mesma] = fino(grosso.indices[i:i + 1]).valores_nas_posicoes(posicoes[mesma] - antes[i])
+            return valores
+
+        self._quartis = tuple(_interpolar(self.n, valores_nas_posicoes, [0.25, 0.5, 0.75]))
+        q1, _, q3 = self._quartis
+        lim_inf, lim_sup = q1 - fator * (q3 - q1), q3 + fator * (q3 - q1)
+        faixas = grosso.indices
+        faixa_inf, faixa_sup = np.floor(lim_inf / grosso.passo), np.floor(lim_sup / grosso.passo)
+        caudas = (faixas <= faixa_inf) | (faixas >= faixa_sup)
+        # A primeira e a última faixa entre as dos limites têm os bigodes quando
+        # as faixas dos limites não têm valores dentro deles
+        meio = np.flatnonzero(~caudas)
+        caudas[meio[[0, -1]] if len(meio) else []] = True
+        refinado = fino(faixas[caudas])
+        self._bigodes = refinado._extremos_entre(lim_inf, lim_sup)
+        fora = refinado.fora(lim_inf, lim_sup)
+        self._n_fora = fora.n
+        self._outliers = fora.amostra(limite_outliers)
+
+    @property
+    def nbytes(self):
+        return self.grosso.nbytes + self._outliers.nbytes
+
+    def mediana(self):
+        return self._quartis[1]
+
+    def quartis(self):
+        """(Q1, mediana, Q3)."""
+        return self._quartis
+
+    def bigodes(self):
+        return self._bigodes
+
+    def amostra_outliers(self, limite=200):
+        """Até `limite` dos outliers sorteados na construção do resumo."""
+        if limite >= len(self._outliers):
+            return self._outliers
+        return np.sort(np.random.default_rng(0).choice(self._outliers, size=limite, replace=False))
+
+    def percentual_outliers(self):
+        return self._n_fora / self.n * 100 if self.n else float('nan')
+
+    def em_faixas(self, n_faixas=20):
+        """Faixas do gráfico, reagrupadas do histograma grosso."""
+        return self.grosso.em_faixas(n_faixas)
+
+
+def por_grupo(grupos, valores, passo=PASSO_NOTA):
+    """Histogramas de `valores` para cada categoria observada de `grupos`.
+
+    `grupos` é uma série categórica; uma única contagem sobre o código
+    combinado (grupo, bin) constrói todos os histogramas de uma vez.
+    """
+    codigos = grupos.cat.codes.to_numpy().astype(np.int64)
+    valores = np.asarray(valores, dtype=np.float64)
+    validos = (codigos >= 0) & ~np.isnan(valores)
+    nb = n_bins(passo)
+    n_grupos = len(grupos.cat.categories)
+    chave = codigos[validos] * nb + bins(valores[validos], passo)
+    histogramas = separar(*contar_bins(chave, n_grupos * nb), n_grupos, passo)
+    observados = np.bincount(codigos[codigos >= 0], minlength=n_grupos) > 0
+    return {
+        categoria: histogramas[i]
+        for i, categoria in enumerate(grupos.cat.categories)
+        if observados[i]
+    }
@@ -0,0 +1,251 @@
+"""Relatórios estáticos por UF, gerados sem o Streamlit.
+
+Para cada UF e para o Brasil inteiro ('Todos'), monta as figuras e métricas
+das seções do dashboard pelas mesmas funções de `enem.secoes` (gênero,
+cor/raça, mediana por renda, divisão digital, matemática por gênero e
+faltantes) e grava em `<saida>/<ano>/<UF>/`:
+
+- `index.html`: página com as figuras interativas e a tabela de métricas
+  (o plotly.js é gravado uma vez em `<saida>/<ano>/` e funciona sem rede);
+- `<figura>.json`: cada figura no formato do Plotly;
+- `<figura>.png`: cada figura como imagem, se o kaleido estiver instalado;
+- `metricas.json`: métricas e tabelas da UF.
+
+`<saida>/<ano>/` recebe ainda `metricas.csv` (uma linha por UF; gerar só
+algumas UFs atualiza as linhas delas) e um `index.html` com links para as
+páginas. As UFs são distribuídas em um pool de processos; cada processo
+abre os dados convertidos uma vez (mapeados em memória,
+`enem.compartilhado`, sem cópia entre processos) e gera as UFs que lhe
+couberem.
+
+    python -m enem.relatorio dados.csv --saida relatorios --processos 8
+    python -m enem.relatorio dados.csv --ufs Todos SP RJ --formatos html json png
+"""
+import argparse
+import html
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from .consultas import BACKENDS
+
+FORMATOS = ['html', 'json', 'png']
+
+ARQUIVO_PLOTLYJS = 'plotly.min.js'
+
+# Contexto de cada processo do pool (dados abertos por `_inicializar`)
+_contexto = {}
+
+
+def png_disponivel():
+    """Se a exportação de imagens do Plotly (kaleido) está instalada."""
+    try:
+        import kaleido  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+# -------------------- Seções --------------------
+
+def _inicializar(csv, destino, backend):
+    from .ingestao import ano_dados, carregar_consultas, carregar_cubo, carregar_estatisticas
+
+    _contexto.update({
+        'consultas': carregar_consultas(csv, destino, backend),
+        'cubo': carregar_cubo(csv, destino),
+        'estatisticas': carregar_estatisticas(csv, destino),
+        'ano': ano_dados(csv, destino),
+    })
+
+
+def montar(consultas, cubo, estatisticas, uf):
+    """Figuras ({nome: figura}), métricas e tabelas das seções do dashboard para `uf`."""
+    from . import secoes
+
+    filtro = {} if uf == 'Todos' else {'SG_UF_PROVA': uf}
+    resumo = cubo.agregar(filtro)
+    digitais = secoes.metricas_digitais(estatisticas, filtro)
+    renda = secoes.mediana_por_renda(cubo, filtro)
+    faltas = secoes.faltantes_por_area(consultas, filtro)
+    computador_renda = secoes.tabela_computador_renda(consultas, filtro)
+
+    figuras = {
+        'genero': secoes.figura_genero(consultas, filtro, uf),
+        'cor_raca': secoes.figura_cor_raca(consultas, filtro, uf),
+        'renda': secoes.figura_renda(renda),
+        'computador': secoes.figura_computador(consultas, filtro, uf),
+        'internet': secoes.figura_internet(consultas, filtro, uf),
+        'desempenho_internet': secoes.figura_desempenho_internet(cubo, filtro),
+        'matematica_genero': secoes.figura_matematica_genero(consultas, filtro),
+    }
+    if computador_renda is not None:
+        figuras['computador_renda'] = secoes.figura_computador_renda(computador_renda)
+    if faltas is not None:
+        figuras['faltantes'] = secoes.figura_faltantes(faltas, uf)
+
+    metricas = {
+        'uf': uf,
+        'candidatos': resumo['n'],
+        'nota_media': resumo['media'],
+        'nota_mediana': resumo['mediana'],
+        **digitais,
+    }
+    if faltas is not None:
+        for linha in faltas.itertuples(index=False):
+            metricas[f'perc_faltantes_{linha.Área}'] = linha.Percentual
+    tabelas = {
+        'mediana_por_renda': renda.assign(RENDA=renda['RENDA'].astype(str)),
+        'faltantes_por_area': faltas,
+        'computador_por_renda': computador_renda,
+    }
+    return figuras, metricas, {nome: t for nome, t in tabelas.items() if t is not None}
+
+
+# -------------------- Gravação --------------------
+
+def _valor(v):
+    # NaN e tipos do NumPy não são JSON
+    if v is None or pd.isna(v):
+        return None
+    return v.item() if hasattr(v, 'item') else v
+
+
+def _pagina(uf, ano, figuras, metricas, tabelas):
+    nome = 'Brasil' if uf == 'Todos' else uf
+    partes = [
+        '<!DOCTYPE html>',
+        '<html lang="pt-BR"><head><meta charset="utf-8">',
+        f'<title>ENEM {ano} - {html.escape(nome)}</title>',
+        f'<script src="../{ARQUIVO_PLOTLYJS}"></script>',
+        '<style>body{font-family:sans-serif;max-width:1100px;margin:auto}'
+        'table{border-collapse:collapse}td,th{border:1px solid #ccc;padding:4px 8px;text-align:right}</style>',
+        '</head><body>',
+        f'<p><a href="../index.html">Todas as UFs</a></p><h1>ENEM {ano}: {html.escape(nome)}</h1>',
+        '<h2>Métricas</h2>',
+        pd.Series(metricas).drop('uf').to_frame('valor').to_html(float_format=lambda v: f'{v:,.2f}', na_rep='-'),
+    ]
+    for fig in figuras.values():
+        partes.append(fig.to_html(full_html=False, include_plotlyjs=False))
+    for nome_tabela, tabela in tabelas.items():
+        partes.append(f'<h2>{html.escape(nome_tabela.replace("_", " ").capitalize())}</h2>')
+        partes.append(tabela.to_html(float_format=lambda v: f'{v:,.2f}', na_rep='-'))
+    partes.append('</body></html>')
+    return '\n'.join(partes)
+
+
+def _gravar_uf(uf, saida, formatos):
+    """Monta e grava o relatório de `uf`. Roda nos processos do pool."""
+    inicio = time.perf_counter()
+    c = _contexto
+    figuras, metricas, tabelas = montar(c['consultas'], c['cubo'], c['estatisticas'], uf)
+    pasta = os.path.join(saida, str(c['ano']), uf)
+    os.makedirs(pasta, exist_ok=True)
+    for nome, fig in figuras.items():
+        if 'json' in formatos:
+            with open(os.path.join(pasta, f'{nome}.json'), 'w', encoding='utf-8') as f:
+                f.write(fig.to_json())
+        if 'png' in formatos:
+            fig.write_image(os.path.join(pasta, f'{nome}.png'))
+    metricas = {chave: _valor(v) for chave, v in metricas.items()}
+    with open(os.path.join(pasta, 'metricas.json'), 'w', encoding='utf-8') as f:
+        json.dump({
+            'metricas': metricas,
+            'tabelas': {nome: json.loads(t.to_json(orient='records')) for nome, t in tabelas.items()},
+        }, f, ensure_ascii=False, indent=2)
+    if 'html' in formatos:
+        with open(os.path.join(pasta, 'index.html'), 'w', encoding='utf-8') as f:
+            f.write(_pagina(uf, c['ano'], figuras, metricas, tabelas))
+    return {'metricas': metricas, 'figuras': len(figuras), 'segundos': round(time.perf_counter() - inicio, 3)}
+
+
+def _indice(ano, tabela):
+    linhas = ''.join(
+        f'<tr><td style="text-align:left"><a href="{uf}/index.html">{"Brasil" if uf == "Todos" else uf}</a></td>'
+        f'<td>{m["candidatos"]:,}</td><td>{m["nota_media"] or 0:.2f}</td>'
+        f'<td>{m["perc_sem_internet"]:.1f}%</td><td>{m["perc_sem_computador"]:.1f}%</td></tr>'
+        for uf, m in tabela.iterrows()
+    )
+    return (
+        '<!DOCTYPE html><html lang="pt-BR"><head><meta charset="utf-8">'
+        f'<title>ENEM {ano}: relatórios por UF</title>'
+        '<style>body{font-family:sans-serif;max-width:900px;margin:auto}'
+        'table{border-collapse:collapse}td,th{border:1px solid #ccc;padding:4px 8px;text-align:right}</style>'
+        f'</head><body><h1>ENEM {ano}: relatórios por UF</h1><table>'
+        '<tr><th>UF</th><th>Candidatos</th><th>Nota média</th><th>Sem internet</th><th>Sem computador</th></tr>'
+        f'{linhas}</table></body></html>'
+    )
+
+
+# -------------------- Execução --------------------
+
+def executar(csv, saida='relatorios', destino=None, ufs=None, processos=None, formatos=('html', 'json'),
+             backend='pandas', log=print):
+    """Gera os relatórios de `ufs` (padrão: 'Todos' e todas as UFs dos dados).
+
+    Retorna a tabela de métricas, uma linha por UF.
+    """
+    import plotly.offline
+
+    from .ingestao import ano_dados, ufs_disponiveis
+
+    if 'png' in formatos and not png_disponivel():
+        raise RuntimeError('a exportação em PNG precisa do kaleido (pip install kaleido)')
+    inicio = time.perf_counter()
+    # Converte o CSV (se preciso) antes de abrir o pool, para os processos só lerem
+    ufs = ufs or ['Todos'] + ufs_disponiveis(csv, destino)
+    ano = ano_dados(csv, destino)
+    pasta = os.path.join(saida, str(ano))
+    os.makedirs(pasta, exist_ok=True)
+    if 'html' in formatos:
+        with open(os.path.join(pasta, ARQUIVO_PLOTLYJS), 'w', encoding='utf-8') as f:
+            f.write(plotly.offline.get_plotlyjs())
+
+    processos = min(processos or os.cpu_count() or 1, len(ufs))
+    log(f"{len(ufs)} relatório(s) em {processos} processo(s) -> {pasta}")
+    metricas = []
+    with ProcessPoolExecutor(processos, initializer=_inicializar, initargs=(csv, destino, backend)) as pool:
+        for uf, resultado in zip(ufs, pool.map(_gravar_uf, ufs, [saida] * len(ufs), [formatos] * len(ufs))):
+            metricas.append(resultado['metricas'])
+            log(f"  {uf:<5} {resultado['figuras']} figuras em {resultado['segundos']:.2f}s")
+
+    tabela = pd.DataFrame(metricas).set_index('uf')
+    caminho_metricas = os.path.join(pasta, 'metricas.csv')
+    if os.path.exists(caminho_metricas):
+        # Geração de parte das UFs: as demais continuam com as métricas já gravadas
+        anteriores = pd.read_csv(caminho_metricas, index_col='uf', keep_default_na=False, na_values=[''])
+        tabela = pd.concat([anteriores.drop(tabela.index, errors='ignore'), tabela])
+        tabela = tabela.loc[sorted(tabela.index, key=lambda uf: (uf != 'Todos', uf))]
+    tabela.to_csv(caminho_metricas)
+    if 'html' in formatos:
+        with open(os.path.join(pasta, 'index.html'), 'w', encoding='utf-8') as f:
+            f.write(_indice(ano, tabela))
+    log(f"{len(ufs)} relatório(s) em {time.perf_counter() - inicio:.1f}s")
+    return tabela
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Relatórios estáticos (HTML, JSON e PNG) por UF, sem o Streamlit.')
+    parser.add_argument('csv', help='CSV de origem (já convertido ou a converter)')
+    parser.add_argument('--saida', default='relatorios', help='diretório dos relatórios (um subdiretório por edição)')
+    parser.add_argument('--destino', help='diretório dos dados convertidos (padrão: .enem_cache/<nome>)')
+    parser.add_argument('--ufs', nargs='+', help="UFs a gerar ('Todos' é o Brasil; padrão: todas)")
+    parser.add_argument('--processos', type=int, help='processos do pool (padrão: número de CPUs)')
+    parser.add_argument('--formatos', nargs='+', choices=FORMATOS,
+                        help='formatos das figuras (padrão: html e json, e png se o kaleido estiver instalado)')
+    parser.add_argument('--backend', default='pandas', choices=BACKENDS, help='consultas em memória ou fora dela')
+    args = parser.parse_args(argv)
+
+    formatos = args.formatos or ['html', 'json'] + (['png'] if png_disponivel() else [])
+    if 'png' in formatos and not png_disponivel():
+        parser.error('a exportação em PNG precisa do kaleido (pip install kaleido)')
+    executar(args.csv, args.saida, args.destino, args.ufs, args.processos, formatos, args.backend)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,208 @@
+"""Cache LRU, limitado em memória, dos resultados exibidos pelo dashboard.
+
+As mesmas combinações de filtros (SP, RJ, MG com "Todos"...) são pedidas
+por muitos usuários. Métricas, tabelas de contagem, medianas, tabelas de
+contingência e figuras já montadas ficam guardadas sob a chave
+(versão dos dados, função, filtros normalizados), em um único cache por
+processo, compartilhado por todas as sessões do Streamlit.
+
+O tamanho de cada item é estimado ao guardá-lo (DataFrames pela memória das
+colunas, figuras pelo tamanho do JSON que vai ao navegador) e os menos
+usados recentemente são descartados quando o total passa do orçamento,
+configurável por `ENEM_CACHE_MB` (padrão 256 MB; 0 desliga o cache).
+
+Resultados também podem ser calculados em segundo plano
+(`em_segundo_plano`), em um pequeno pool de threads do processo: a página
+mostra uma estimativa enquanto o valor exato é calculado e guardado.
+
+Quando só algumas UFs mudam (`enem.versionamento`), `migrar` leva os
+resultados filtrados pelas demais UFs para a nova versão dos dados.
+"""
+import os
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+ORCAMENTO_MB = float(os.environ.get('ENEM_CACHE_MB', 256))
+# Threads que calculam resultados em segundo plano
+THREADS_SEGUNDO_PLANO = int(os.environ.get('ENEM_THREADS_SEGUNDO_PLANO', 2))
+
+
+def normalizar_filtros(filtros):
+    """Tupla ordenada dos filtros efetivos ('Todos' e `None` não restringem)."""
+    return tuple(sorted(
+        (dim, valor) for dim, valor in (filtros or {}).items()
+        if valor is not None and valor != 'Todos'
+    ))
+
+
+def chave_resultado(versao, funcao, filtros):
+    """Chave de um resultado no cache: versão dos dados, função e filtros normalizados.
+
+    A função entra pelo nome qualificado (módulo e `__qualname__`), para que
+    funções homônimas de módulos ou classes diferentes não dividam a chave.
+    Os argumentos da chamada não entram: todos precisam ser determinados por
+    `filtros` (mais a versão). Um argumento posicional que não esteja nos
+    filtros, como a UF do título ou a normalização de uma tabela, só é
+    seguro se quem chama incluí-lo nos filtros (como faz o dashboard com a UF
+    e a 'NORMALIZACAO').
+    """
+    return (versao, f'{funcao.__module__}.{funcao.__qualname__}', normalizar_filtros(filtros))
+
+
+def tamanho_em_bytes(valor):
+    """Estimativa da memória ocupada por um resultado."""
+    if valor is None:
+        return 0
+    if hasattr(valor, 'to_plotly_json'):
+        import plotly.io
+
+        # Figuras guardadas já montadas; o JSON é o que o navegador recebe
+        return len(plotly.io.to_json(valor, validate=False))
+    if hasattr(valor, 'memory_usage'):
+        uso = valor.memory_usage(deep=True)
+        return int(uso.sum()) if hasattr(uso, 'sum') else int(uso)
+    if hasattr(valor, 'nbytes'):
+        return int(valor.nbytes)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(tamanho_em_bytes(k) + tamanho_em_bytes(v) for k, v in valor.items())
+    if isinstance(valor, (list, tuple)):
+        return sys.getsizeof(valor) + sum(tamanho_em_bytes(v) for v in valor)
+    return sys.getsizeof(valor)
+
+
+class CacheResultados:
+    """Dicionário LRU seguro entre threads com orçamento de memória em bytes."""
+
+    def __init__(self, orcamento_mb=ORCAMENTO_MB):
+        self.orcamento = int(orcamento_mb * 1024 * 1024)
+        self._itens = OrderedDict()
+        self._trava = threading.Lock()
+        self.bytes = 0
+        self.acertos = 0
+        self.faltas = 0
+        self.despejos = 0
+        self._pendentes = {}
+        self._pool = None
+
+    def __len__(self):
+        return len(self._itens)
+
+    def __contains__(self, chave):
+        return chave in self._itens
+
+    def obter(self, chave, calcular):
+        """Valor guardado para `chave` ou, na falta dele, `calcular()` (que é guardado).
+
+        O cálculo roda fora da trava; se duas sessões pedirem a mesma chave
+        ao mesmo tempo, ambas calculam e a última a terminar prevalece.
+        """
+        with self._trava:
+            if chave in self._itens:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return self._itens[chave][0]
+            self.faltas += 1
+        valor = calcular()
+        self.guardar(chave, valor)
+        return valor
+
+    def guardar(self, chave, valor):
+        tamanho = tamanho_em_bytes(valor)
+        if tamanho > self.orcamento:
+            # Maior que o orçamento inteiro (ou cache desligado): não é guardado
+            return
+        with self._trava:
+            if chave in self._itens:
+                self.bytes -= self._itens.pop(chave)[1]
+            self._itens[chave] = (valor, tamanho)
+            self.bytes += tamanho
+            while self.bytes > self.orcamento:
+                _, (_, tamanho_antigo) = self._itens.popitem(last=False)
+                self.bytes -= tamanho_antigo
+                self.despejos += 1
+
+    def em_segundo_plano(self, chave, calcular):
+        """Agenda `obter(chave, calcular)` em uma thread (uma vez por chave); retorna o `Future`.
+
+        O futuro deixa de ser acompanhado quando termina, com ou sem erro e
+        mesmo que o valor não caiba no orçamento: um novo pedido da chave
+        calcula de novo.
+        """
+        with self._trava:
+            futuro = self._pendentes.get(chave)
+            # Um futuro já concluído pode não ter passado pelo `_concluido` ainda
+            if futuro is not None and not futuro.done():
+                return futuro
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(THREADS_SEGUNDO_PLANO, thread_name_prefix='enem-resultados')
+            futuro = self._pool.submit(self.obter, chave, calcular)
+            self._pendentes[chave] = futuro
+        # Fora da trava: se o cálculo já terminou, o callback roda nesta thread
+        futuro.add_done_callback(lambda f: self._concluido(chave, f))
+        return futuro
+
+    def _concluido(self, chave, futuro):
+        with self._trava:
+            if self._pendentes.get(chave) is futuro:
+                del self._pendentes[chave]
+
+    def pendente(self, chave):
+        """Se `chave` está sendo calculada em segundo plano agora."""
+        futuro = self._pendentes.get(chave)
+        return futuro is not None and not futuro.done()
+
+    def limpar(self):
+        with self._trava:
+            self._itens.clear()
+            self.bytes = 0
+
+    def migrar(self, versao_antiga, versao_nova, ufs_alteradas):
+        """Leva para `versao_nova` os resultados de `versao_antiga` que só dependem de UFs não alteradas.
+
+        Um resultado filtrado por uma UF fora de `ufs_alteradas` continua
+        válido; os das UFs alteradas e os sem filtro de UF (que dependem de
+        todas) são descartados. Também são descartados os calculados sobre a
+        amostra ('AMOSTRA'), que é sorteada de novo em toda atualização, e os
+        que comparam edições ('EDICOES'), cuja chave embute as versões
+        antigas. Retorna (mantidos, descartados).
+        """
+        mantidos = descartados = 0
+        with self._trava:
+            itens = OrderedDict()
+            for chave, (valor, tamanho) in self._itens.items():
+                if chave[0] != versao_antiga:
+                    itens[chave] = (valor, tamanho)
+                    continue
+                filtros = dict(chave[2])
+                uf = filtros.get('SG_UF_PROVA')
+                valido = (
+                    uf is not None and uf not in ufs_alteradas
+                    and not filtros.get('AMOSTRA') and 'EDICOES' not in filtros
+                )
+                if valido:
+                    itens[(versao_nova, *chave[1:])] = (valor, tamanho)
+                    mantidos += 1
+                else:
+                    self.bytes -= tamanho
+                    descartados += 1
+            self._itens = itens
+        return mantidos, descartados
+
+    def estatisticas(self):
+        consultas = self.acertos + self.faltas
+        return {
+            'acertos': self.acertos,
+            'faltas': self.faltas,
+            'taxa_acerto': self.acertos / consultas if consultas else None,
+            'despejos': self.despejos,
+            'itens': len(self._itens),
+            'mb': round(self.bytes / (1024 * 1024), 2),
+            'orcamento_mb': round(self.orcamento / (1024 * 1024), 2),
+            'em_segundo_plano': sum(not f.done() for f in list(self._pendentes.values())),
+        }
+
+
+# Único por processo: compartilhado por todas as sessões do dashboard
+cache_resultados = CacheResultados()
@@ -0,0 +1,395 @@
+"""Cálculos e figuras de cada seção do dashboard, sem dependência do Streamlit.
+
+Cada função recebe as consultas (`enem.consultas`, em memória ou fora dela)
+com os filtros do recorte, ou o cubo, e devolve a tabela ou a figura Plotly
+que o dashboard exibe; dos dados só chegam aqui contagens e histogramas.
+Com as consultas aproximadas da amostra (`enem.amostra`), as contagens
+trazem a margem do intervalo de 95%, desenhada como barra de erro. O
+`dashboard_enem.py` cuida apenas do layout e dos textos; assim as mesmas
+seções podem ser executadas e cronometradas fora do navegador
+(`enem.benchmark`).
+"""
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from .contingencia import DIMENSOES, NORMALIZACOES, rotular
+from .graficos import figura_caixas, figura_histograma, trava_plotly
+from .mapas import mapa_presenca, mapa_renda_salarios, ordem_computador, ordem_renda_salarios, presence_cols
+
+# Global Plotly style
+PLOTLY_TEMPLATE = "plotly_white"
+
+AREAS_NOTAS = {
+    'Ciências da Natureza': 'NU_NOTA_CN',
+    'Ciências Humanas': 'NU_NOTA_CH',
+    'Linguagens': 'NU_NOTA_LC',
+    'Matemática': 'NU_NOTA_MT',
+}
+
+
+def contagens(consultas, coluna, filtros):
+    """Quantidade de candidatos por categoria observada de `coluna`, da maior para a menor.
+
+    Com consultas aproximadas, a coluna 'Margem' traz a meia largura do
+    intervalo de 95% de cada quantidade.
+    """
+    contagem = consultas.contar(coluna, filtros)
+    tabela = pd.DataFrame({coluna: contagem.index, 'Quantidade': contagem.to_numpy()})
+    if consultas.aproximada:
+        tabela['Margem'] = consultas.margem(coluna, filtros).to_numpy()
+    tabela = tabela.sort_values('Quantidade', ascending=False, kind='stable', ignore_index=True)
+    # Colunas categóricas listam todas as categorias; mantém só as observadas
+    return tabela[tabela['Quantidade'] > 0]
+
+
+def _barras(tabela, x, titulo, cores, y='Quantidade'):
+    with trava_plotly:
+        fig = px.bar(
+            tabela,
+            x=x,
+            y=y,
+            text=y,
+            title=titulo,
+            color=x,
+            error_y='Margem' if 'Margem' in tabela.columns else None,
+            template=PLOTLY_TEMPLATE,
+            color_discrete_sequence=cores,
+        )
+        fig.update_traces(textposition='outside')
+        fig.update_layout(showlegend=False, xaxis_title='', yaxis_title='Quantidade')
+    return fig
+
+
+def figura_aproximada(fig):
+    """Cópia de `fig` com o título marcado como estimativa (a figura do cache não muda)."""
+    with trava_plotly:
+        copia = go.Figure(fig)
+        copia.update_layout(title_text=f'≈ {fig.layout.title.text} (estimativa)')
+    return copia
+
+
+# -------------------- Perfil dos candidatos --------------------
+
+def figura_genero(consultas, filtros, uf):
+    return _barras(contagens(consultas, 'SEXO', filtros), 'SEXO', f'Distribuição por Gênero em {uf}', px.colors.qualitative.Set2)
+
+
+def figura_cor_raca(consultas, filtros, uf):
+    return _barras(contagens(consultas, 'COR/RACA', filtros), 'COR/RACA', f'Distribuição por Cor/Raça em {uf}', px.colors.qualitative.Set3)
+
+
+# -------------------- Desigualdade por renda --------------------
+
+def mediana_por_renda(cubo, filtros):
+    """Mediana da nota média por faixa de renda, pelos histogramas do cubo."""
+    histogramas_renda = cubo.histogramas_por('RENDA', filtros)
+    # As faixas são as da edição dos dados (mudam com o salário mínimo)
+    ordem_renda = cubo.celulas['RENDA'].cat.categories
+    return pd.DataFrame({
+        'RENDA': pd.Categorical(list(histogramas_renda), categories=ordem_renda, ordered=True),
+        'MEDIANA_NOTA_MEDIA': [h.mediana() for h in histogramas_renda.values()],
+    })
+
+
+def figura_renda(df_line):
+    with trava_plotly:
+        fig = px.line(
+            df_line.sort_values('RENDA'),
+            x='RENDA',
+            y='MEDIANA_NOTA_MEDIA',
+            markers=True,
+            title='Mediana da Nota Média por Renda Familiar',
+            labels={'RENDA': 'Faixa de Renda Familiar', 'MEDIANA_NOTA_MEDIA': 'Mediana da Nota Média'},
+            category_orders={'RENDA': list(df_line['RENDA'].cat.categories)},
+            template=PLOTLY_TEMPLATE,
+            color_discrete_sequence=["#2563eb"],
+        )
+        fig.update_layout(xaxis_tickangle=-45)
+    return fig
+
+
+def mediana_por_renda_edicoes(cubos, filtros):
+    """Mediana por faixa de renda de cada edição ({ano: cubo}).
+
+    As faixas em reais de cada edição são convertidas nas mesmas faixas em
+    salários mínimos, que são comparáveis entre os anos.
+    """
+    linhas = []
+    for ano, cubo in cubos.items():
+        df_line = mediana_por_renda(cubo, filtros)
+        df_line['RENDA'] = df_line['RENDA'].astype(str).map(mapa_renda_salarios(ano))
+        df_line.insert(0, 'ANO', ano)
+        linhas.append(df_line)
+    return pd.concat(linhas, ignore_index=True)
+
+
+def figura_renda_edicoes(df_edicoes):
+    anos = sorted(df_edicoes['ANO'].unique())
+    with trava_plotly:
+        fig = px.line(
+            df_edicoes.assign(ANO=df_edicoes['ANO'].astype(str)),
+            x='RENDA',
+            y='MEDIANA_NOTA_MEDIA',
+            color='ANO',
+            markers=True,
+            title='Mediana da Nota Média por Renda Familiar, por Edição',
+            labels={'RENDA': 'Renda Familiar', 'MEDIANA_NOTA_MEDIA': 'Mediana da Nota Média', 'ANO': 'Edição'},
+            category_orders={'RENDA': ordem_renda_salarios(anos), 'ANO': [str(ano) for ano in anos]},
+            template=PLOTLY_TEMPLATE,
+        )
+        fig.update_layout(xaxis_tickangle=-45)
+    return fig
+
+
+# -------------------- Desigualdade digital --------------------
+
+def figura_computador(consultas, filtros, uf):
+    df_computador = contagens(consultas, 'ACESSO_COMPUTADOR', filtros)
+    # Ordenar por quantidade de computadores
+    df_computador['ACESSO_COMPUTADOR'] = pd.Categorical(
+        df_computador['ACESSO_COMPUTADOR'], categories=ordem_computador, ordered=True
+    )
+    df_computador = df_computador.sort_values('ACESSO_COMPUTADOR')
+    fig = _barras(df_computador, 'ACESSO_COMPUTADOR', f'Acesso a Computadores em {uf}', px.colors.qualitative.Set3)
+    fig.update_xaxes(tickangle=-45)
+    return fig
+
+
+def figura_internet(consultas, filtros, uf):
+    tabela = contagens(consultas, 'ACESSO_INTERNET', filtros)
+    with trava_plotly:
+        fig = px.pie(
+            tabela,
+            values='Quantidade',
+            names='ACESSO_INTERNET',
+            title=f'Acesso à Internet em {uf}',
+            color_discrete_sequence=px.colors.qualitative.Set2,
+            template=PLOTLY_TEMPLATE,
+        )
+        fig.update_traces(textposition='inside', textinfo='percent+label')
+    return fig
+
+
+def tabela_computador_renda(consultas, filtros):
+    """Percentual de "Não" e "Sim, um" (Q024) dentro de cada faixa de renda.
+
+    Retorna `None` quando nenhuma das duas respostas aparece no recorte.
+    """
+    # Como no pd.crosstab: só as faixas e respostas observadas no recorte
+    tabela = rotular(consultas.contingencia(['RENDA', 'ACESSO_COMPUTADOR'], filtros).tabela('linha'))
+    # Filtrar apenas "Não" e "Sim, um" para simplificar a visualização
+    colunas_disponiveis = [col for col in ['Não', 'Sim, um'] if col in tabela.columns]
+    if not colunas_disponiveis:
+        return None
+    return tabela[colunas_disponiveis]
+
+
+def figura_computador_renda(tabela):
+    with trava_plotly:
+        fig = px.imshow(
+            tabela.T,
+            title='Percentual de Acesso a Computadores por Faixa de Renda',
+            labels=dict(x="Faixa de Renda", y="Acesso a Computadores", color="Percentual (%)"),
+            color_continuous_scale='Blues',
+            template=PLOTLY_TEMPLATE,
+            aspect="auto"
+        )
+        fig.update_layout(xaxis_tickangle=-45)
+    return fig
+
+
+def tabela_contingencia(consultas, linhas, colunas, filtros):
+    """Contagens de `linhas` × `colunas` no recorte (`enem.contingencia`)."""
+    return consultas.contingencia([linhas, colunas], filtros)
+
+
+def figura_contingencia(contingencia, normalizacao):
+    """Mapa de calor do cruzamento em contagens ou percentuais ('linha', 'coluna', 'total').
+
+    Retorna `None` quando o recorte não tem candidatos com as duas respostas.
+    """
+    tabela = rotular(contingencia.tabela(normalizacao))
+    if tabela.empty:
+        return None
+    linhas, colunas = contingencia.dimensoes
+    with trava_plotly:
+        fig = px.imshow(
+            tabela,
+            title=f'{DIMENSOES.get(linhas, linhas)} × {DIMENSOES.get(colunas, colunas)}: {NORMALIZACOES[normalizacao]}',
+            labels=dict(
+                x=DIMENSOES.get(colunas, colunas),
+                y=DIMENSOES.get(linhas, linhas),
+                color='Candidatos' if normalizacao is None else 'Percentual (%)',
+            ),
+            text_auto=True if normalizacao is None else '.1f',
+            color_continuous_scale='Blues',
+            template=PLOTLY_TEMPLATE,
+            aspect="auto"
+        )
+        fig.update_layout(xaxis_tickangle=-45)
+    return fig
+
+
+def figura_desempenho_internet(cubo, filtros):
+    # Caixas montadas a partir dos histogramas do cubo (só o resumo vai ao navegador)
+    return figura_caixas(
+        cubo.histogramas_por('ACESSO_INTERNET', filtros),
+        titulo='Desempenho Acadêmico por Acesso à Internet',
+        rotulo_x='Acesso à Internet',
+        rotulo_y='Nota Média',
+        cores=px.colors.qualitative.Set2,
+        template=PLOTLY_TEMPLATE,
+    )
+
+
+def metricas_digitais(estatisticas, filtros):
+    """Percentual sem internet, sem computador e diferença de nota média.
+
+    Contagens e médias saem dos acumuladores gravados na conversão
+    (`enem.estatisticas`), sem consultar as linhas.
+    """
+    total = estatisticas.agregar(filtros).n
+    internet = estatisticas.por('ACESSO_INTERNET', filtros)
+    computador = estatisticas.por('ACESSO_COMPUTADOR', filtros)
+    sem_internet = internet['Não'].n if 'Não' in internet else 0
+    sem_computador = computador['Não'].n if 'Não' in computador else 0
+    metricas = {
+        'perc_sem_internet': (sem_internet / total * 100) if total > 0 else 0,
+        'perc_sem_computador': (sem_computador / total * 100) if total > 0 else 0,
+        'diferenca_internet': None,
+    }
+    if 'NOTA_MEDIA' in estatisticas.colunas:
+        media = lambda resposta: internet[resposta].media['NOTA_MEDIA'] if resposta in internet else float('nan')
+        metricas['diferenca_internet'] = media('Sim') - media('Não')
+    return metricas
+
+
+def metricas_digitais_edicoes(estatisticas_por_ano, filtros):
+    """`metricas_digitais` de cada edição ({ano: estatísticas}), uma linha por ano."""
+    return pd.DataFrame([
+        {'ANO': ano, **metricas_digitais(estatisticas, filtros)} for ano, estatisticas in estatisticas_por_ano.items()
+    ])
+
+
+def figura_digital_edicoes(df_edicoes):
+    tabela = df_edicoes.melt(
+        id_vars='ANO',
+        value_vars=['perc_sem_internet', 'perc_sem_computador'],
+        var_name='Indicador',
+        value_name='Percentual',
+    )
+    tabela['Indicador'] = tabela['Indicador'].map({
+        'perc_sem_internet': 'Sem Acesso à Internet',
+        'perc_sem_computador': 'Sem Computador',
+    })
+    tabela['ANO'] = tabela['ANO'].astype(str)
+    with trava_plotly:
+        fig = px.bar(
+            tabela,
+            x='ANO',
+            y='Percentual',
+            color='Indicador',
+            barmode='group',
+            text=tabela['Percentual'].map(lambda v: f'{v:.1f}%'),
+            title='Desigualdade Digital por Edição',
+            labels={'ANO': 'Edição', 'Percentual': 'Percentual (%)'},
+            template=PLOTLY_TEMPLATE,
+            color_discrete_sequence=px.colors.qualitative.Set2,
+        )
+        fig.update_traces(textposition='outside')
+        fig.update_xaxes(type='category')
+    return fig
+
+
+# -------------------- Desempenho por disciplina --------------------
+
+def figura_matematica_genero(consultas, filtros):
+    return figura_caixas(
+        consultas.histogramas_por('SEXO', 'NU_NOTA_MT', filtros),
+        titulo='Desempenho em Matemática por Gênero',
+        rotulo_x='Gênero',
+        rotulo_y='Nota de Matemática',
+        cores=px.colors.qualitative.Set2,
+        template=PLOTLY_TEMPLATE,
+    )
+
+
+# -------------------- Faltantes --------------------
+
+def faltantes_por_area(consultas, filtros):
+    """Faltantes (presença 0) e percentual sobre os válidos, por área.
+
+    Com consultas aproximadas, 'Margem (%)' é a meia largura do intervalo de 95%
+    do percentual. Retorna `None` se os dados não têm colunas de presença.
+    """
+    stats_faltas = []
+    for col, label in presence_cols.items():
+        if col not in consultas.colunas:
+            continue
+        contagem = consultas.contar(col, filtros)
+        total_validos = contagem[contagem.index.notna()].sum()
+        num_faltantes = contagem.get(0, 0)
+        perc_faltantes = (num_faltantes / total_validos * 100) if total_validos > 0 else 0
+        linha = {
+            'Área': label,
+            'Faltantes': int(num_faltantes),
+            'Percentual': perc_faltantes,
+        }
+        if consultas.aproximada:
+            margem = consultas.margem(col, filtros).get(0, 0)
+            linha['Margem (%)'] = (margem / total_validos * 100) if total_validos > 0 else 0
+        stats_faltas.append(linha)
+    if not stats_faltas:
+        return None
+    return pd.DataFrame(stats_faltas).sort_values('Faltantes', ascending=False)
+
+
+def figura_faltantes(df_faltas, uf):
+    return _barras(df_faltas, 'Área', f'Alunos faltantes por área em {uf}', px.colors.qualitative.Pastel, y='Faltantes')
+
+
+# -------------------- Exploração --------------------
+
+def figura_areas(consultas, filtros):
+    """Caixas das quatro áreas para as linhas selecionadas pelos filtros."""
+    histogramas = consultas.histogramas(list(AREAS_NOTAS.values()), filtros)
+    return figura_caixas(
+        {area: histogramas[col] for area, col in AREAS_NOTAS.items()},
+        titulo='Distribuição das Notas por Área de Conhecimento',
+        rotulo_x='Área',
+        rotulo_y='Nota',
+        cores=px.colors.qualitative.Pastel,
+        template=PLOTLY_TEMPLATE,
+    )
+
+
+def figura_histograma_media(resumo):
+    # 20 faixas reagrupadas do histograma do cubo
+    return figura_histograma(
+        resumo['histograma'],
+        titulo='Histograma da Nota Média do Grupo Selecionado',
+        rotulo_x='NOTA_MEDIA',
+        cor='#636EFA',
+        template=PLOTLY_TEMPLATE,
+        n_faixas=20,
+    )
+
+
+def presenca_por_situacao(resumo, col):
+    """Contagens por situação de presença na área `col`, vindas do cubo."""
+    contagens_presenca = resumo['presencas'][col]
+    tabela = pd.DataFrame({
+        'Situação': contagens_presenca.index.map(mapa_presenca),
+        'Quantidade': contagens_presenca.to_numpy(),
+    }).sort_values('Quantidade', ascending=False)
+    return tabela[tabela['Quantidade'] > 0]
+
+
+def figura_presenca(tabela, col):
+    return _barras(
+        tabela,
+        'Situação',
+        f"Proporção de Presença/Falta - {presence_cols.get(col, col)}",
+        px.colors.qualitative.Set2,
+    )
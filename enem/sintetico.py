@@ -0,0 +1,192 @@
+"""Gerador de microdados sintéticos do ENEM, reprodutível por semente.
+
+Produz um CSV no formato do INEP (separador ";", ISO-8859-1, mesmas colunas
+e códigos) com distribuições próximas às dos microdados reais: participação
+de cada UF, faixas de renda (Q006 A–R), acesso a computador e internet
+(Q024/Q025) condicionados à renda, presença nos dois dias de prova e notas na
+escala do ENEM, correlacionadas entre as áreas e com a renda. Serve para
+medir o dashboard em escalas que a amostra não alcança (`enem.benchmark`).
+
+    python -m enem.sintetico 1000000 sintetico_1m.csv --semente 0
+    python -m enem.sintetico 1000000 sintetico_2022.csv --ano 2022
+
+As linhas são geradas em blocos com sementes derivadas de (semente, bloco),
+então o mesmo arquivo sai idêntico independentemente da memória disponível.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from .esquema import CATEGORIAS, UFS
+from .mapas import ANO_PADRAO, mapa_renda
+
+LINHAS_POR_BLOCO = 500_000
+
+# Participação aproximada de cada UF entre os inscritos (%)
+PESOS_UF = {
+    'AC': 0.6, 'AL': 1.9, 'AM': 2.5, 'AP': 0.6, 'BA': 7.5, 'CE': 5.8, 'DF': 1.6,
+    'ES': 1.9, 'GO': 3.3, 'MA': 3.9, 'MG': 9.8, 'MS': 1.1, 'MT': 1.7, 'PA': 5.2,
+    'PB': 2.6, 'PE': 5.5, 'PI': 2.3, 'PR': 4.4, 'RJ': 6.9, 'RN': 2.0, 'RO': 0.9,
+    'RR': 0.3, 'RS': 4.3, 'SC': 2.2, 'SE': 1.3, 'SP': 16.5, 'TO': 0.8,
+}
+
+# Distribuições marginais (%), na ordem das categorias de `enem.esquema.CATEGORIAS`
+PESOS = {
+    'TP_FAIXA_ETARIA': [6, 17, 19, 11, 7, 5, 4, 3.5, 3, 2.5, 8, 5, 3.5, 2, 1.3, 0.8, 0.4, 0.2, 0.1, 0.05],
+    'TP_SEXO': [61.5, 38.5],
+    'TP_COR_RACA': [1.9, 38.6, 13.0, 43.6, 2.3, 0.6, 0],
+    'TP_ST_CONCLUSAO': [55, 30, 14, 1],
+    'TP_ESCOLA': [68, 26, 5.9, 0.1],
+    'TP_LINGUA': [52, 48],
+    'Q001': [5, 20, 12, 12, 27, 8, 3, 13],
+    'Q002': [3, 15, 11, 13, 33, 11, 5, 9],
+    'Q006': [6, 27, 19, 11, 8, 6, 7, 4, 2.5, 2, 1.3, 1.2, 0.9, 1.3, 0.8, 0.6, 0.6, 0.8],
+    'Q022': [2, 25, 32, 22, 19],
+}
+
+# Média e desvio padrão de cada prova objetiva
+NOTAS_OBJETIVAS = {
+    'NU_NOTA_CN': (491, 80),
+    'NU_NOTA_CH': (519, 95),
+    'NU_NOTA_LC': (502, 80),
+    'NU_NOTA_MT': (535, 110),
+}
+
+# Presença (0 faltou, 1 presente, 2 eliminado) no 1º dia e no 2º dia,
+# condicionada a ter comparecido ao 1º dia
+PRESENCA_DIA1 = [26, 73.8, 0.2]
+PRESENCA_DIA2 = {True: [6, 93.8, 0.2], False: [97, 3, 0]}
+
+COLUNAS = [
+    'NU_INSCRICAO', 'NU_ANO', 'TP_FAIXA_ETARIA', 'TP_SEXO', 'TP_COR_RACA',
+    'TP_ST_CONCLUSAO', 'TP_ESCOLA', 'SG_UF_PROVA', 'TP_PRESENCA_CN',
+    'TP_PRESENCA_CH', 'TP_PRESENCA_LC', 'TP_PRESENCA_MT', 'NU_NOTA_CN',
+    'NU_NOTA_CH', 'NU_NOTA_LC', 'NU_NOTA_MT', 'TP_LINGUA', 'NU_NOTA_REDACAO',
+    'Q001', 'Q002', 'Q006', 'Q022', 'Q024', 'Q025',
+]
+
+
+def _probabilidades(pesos):
+    pesos = np.asarray(pesos, dtype=np.float64)
+    return pesos / pesos.sum()
+
+
+def _sortear(rng, valores, pesos, n):
+    return np.asarray(valores)[rng.choice(len(valores), size=n, p=_probabilidades(pesos))]
+
+
+def _sortear_condicional(rng, grupos, tabela):
+    """Sorteia um índice por linha usando a linha `grupos[i]` de `tabela`
+    (uma distribuição de probabilidade por grupo)."""
+    acumulada = np.cumsum(tabela, axis=1)
+    acumulada[:, -1] = 1.0
+    u = rng.random(len(grupos))
+    return (u[:, None] > acumulada[grupos]).sum(axis=1)
+
+
+def _tabela_computador():
+    # Sem computador é comum nas faixas baixas; mais de um, nas altas
+    linhas = []
+    for i in range(len(CATEGORIAS['Q006'])):
+        nao = max(0.8 * np.exp(-i / 3.5), 0.02)
+        resto = _probabilidades([1, 0.1 + 0.08 * i, 0.03 + 0.04 * i, 0.01 + 0.03 * i]) * (1 - nao)
+        linhas.append([nao, *resto])
+    return np.array(linhas)
+
+
+def _tabela_internet():
+    linhas = []
+    for i in range(len(CATEGORIAS['Q006'])):
+        nao = max(0.25 * np.exp(-i / 2.5), 0.005)
+        linhas.append([nao, 1 - nao])
+    return np.array(linhas)
+
+
+def _primeira_inscricao(ano):
+    # Inscrições do INEP começam pelos dois últimos dígitos do ano
+    return (ano % 100) * 10_000_000_000 + 1
+
+
+def gerar_bloco(n, semente=0, bloco=0, primeira_inscricao=None, ano=ANO_PADRAO):
+    """DataFrame com `n` candidatos sintéticos da edição `ano` (colunas e códigos do INEP)."""
+    rng = np.random.default_rng([semente, bloco])
+    if primeira_inscricao is None:
+        primeira_inscricao = _primeira_inscricao(ano)
+    df = pd.DataFrame({
+        'NU_INSCRICAO': np.arange(primeira_inscricao, primeira_inscricao + n, dtype=np.int64),
+        'NU_ANO': np.full(n, ano, dtype=np.int16),
+    })
+    for col, pesos in PESOS.items():
+        if col != 'Q006':
+            df[col] = _sortear(rng, CATEGORIAS[col], pesos, n)
+    df['SG_UF_PROVA'] = _sortear(rng, UFS, [PESOS_UF[uf] for uf in UFS], n)
+
+    renda = rng.choice(len(CATEGORIAS['Q006']), size=n, p=_probabilidades(PESOS['Q006']))
+    # Edições com menos faixas: as de cima se juntam na última
+    renda = np.minimum(renda, len(mapa_renda(ano)) - 1)
+    df['Q006'] = np.asarray(CATEGORIAS['Q006'])[renda]
+    computador = _sortear_condicional(rng, renda, _tabela_computador())
+    internet = _sortear_condicional(rng, renda, _tabela_internet())
+    df['Q024'] = np.asarray(CATEGORIAS['Q024'])[computador]
+    df['Q025'] = np.asarray(CATEGORIAS['Q025'])[internet]
+
+    dia1 = rng.choice(3, size=n, p=_probabilidades(PRESENCA_DIA1))
+    dia2 = np.where(
+        dia1 == 1,
+        rng.choice(3, size=n, p=_probabilidades(PRESENCA_DIA2[True])),
+        rng.choice(3, size=n, p=_probabilidades(PRESENCA_DIA2[False])),
+    )
+    df['TP_PRESENCA_CH'] = df['TP_PRESENCA_LC'] = dia1
+    df['TP_PRESENCA_CN'] = df['TP_PRESENCA_MT'] = dia2
+
+    # Desempenho: fator comum do candidato, efeito da renda, da escola e do acesso à internet
+    efeito = (
+        10.0 * renda - 30.0
+        + np.where(df['TP_ESCOLA'].to_numpy() == 3, 40.0, 0.0)
+        + np.where(internet == 0, -15.0, 0.0)
+    )
+    comum = rng.standard_normal(n)
+    for col, (media, dp) in NOTAS_OBJETIVAS.items():
+        presenca = dia2 if col in ('NU_NOTA_CN', 'NU_NOTA_MT') else dia1
+        nota = media + efeito + dp * (0.6 * comum + 0.8 * rng.standard_normal(n))
+        nota = np.round(np.clip(nota, 0, 1000), 1)
+        df[col] = np.where(presenca == 1, nota, np.nan)
+    # Redação: múltiplos de 20, com parte das provas zeradas
+    redacao = np.round(np.clip(640 + efeito + 160 * (0.5 * comum + 0.87 * rng.standard_normal(n)), 40, 1000) / 20) * 20
+    redacao = np.where(rng.random(n) < 0.04, 0.0, redacao)
+    df['NU_NOTA_REDACAO'] = np.where(dia1 == 1, redacao, np.nan)
+    return df[COLUNAS]
+
+
+def gerar(n_linhas, semente=0, linhas_por_bloco=LINHAS_POR_BLOCO, ano=ANO_PADRAO):
+    """Blocos (DataFrames) que somam `n_linhas` candidatos."""
+    for bloco, inicio in enumerate(range(0, n_linhas, linhas_por_bloco)):
+        n = min(linhas_por_bloco, n_linhas - inicio)
+        yield gerar_bloco(n, semente, bloco, primeira_inscricao=_primeira_inscricao(ano) + inicio, ano=ano)
+
+
+def gravar_csv(caminho_csv, n_linhas, semente=0, linhas_por_bloco=LINHAS_POR_BLOCO, ano=ANO_PADRAO):
+    """Grava o CSV sintético em `caminho_csv`, bloco a bloco."""
+    with open(caminho_csv, 'w', encoding='ISO-8859-1', newline='') as f:
+        for i, df in enumerate(gerar(n_linhas, semente, linhas_por_bloco, ano)):
+            df.to_csv(f, sep=';', index=False, header=(i == 0), float_format='%.1f')
+    return caminho_csv
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Gera microdados sintéticos do ENEM no formato do INEP.')
+    parser.add_argument('linhas', type=int, help='número de candidatos')
+    parser.add_argument('csv', help='arquivo de saída')
+    parser.add_argument('--semente', type=int, default=0, help='semente do gerador (padrão: 0)')
+    parser.add_argument('--ano', type=int, default=ANO_PADRAO, help=f'edição (NU_ANO; padrão: {ANO_PADRAO})')
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    gravar_csv(args.csv, args.linhas, args.semente, ano=args.ano)
+    print(f"{args.linhas:,} linhas geradas em {time.perf_counter() - inicio:.1f}s -> {args.csv}")
+
+
+if __name__ == '__main__':
+    main()
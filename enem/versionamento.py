@@ -0,0 +1,250 @@
+"""Atualização incremental dos dados convertidos quando a origem muda.
+
+O INEP publica microdados corrigidos, e às vezes chegam correções de um só
+estado. Cada partição (UF) dos dados convertidos tem uma impressão digital
+no manifesto (`ingestao.impressoes_particoes`). `atualizar` lê o arquivo
+novo, calcula as impressões das suas partições e reprocessa só as que
+mudaram:
+
+- os dados (Feather e colunas mapeadas) são regravados partição a
+  partição, com as alteradas vindas do arquivo novo e as demais copiadas
+  dos dados atuais;
+- as células do cubo e os acumuladores das notas das UFs alteradas são
+  removidos e substituídos pelos das linhas novas; os das demais UFs ficam
+  como estão;
+- a amostra estratificada é sorteada de novo (a alocação depende dos totais);
+- o relatório de qualidade é refeito a partir do CSV novo (com uma correção
+  parcial, fica o do arquivo original).
+
+O manifesto registra a atualização (versão anterior, UFs alteradas e tempo
+de cada etapa). Cada processo do dashboard, ao notar a nova versão, leva
+para ela os resultados do cache das UFs não alteradas e descarta os das UFs
+alteradas, os do Brasil inteiro, os da amostra e os que comparam edições
+(`CacheResultados.migrar`). O dashboard faz
+isso sozinho quando o CSV muda; pela linha de comando, uma correção de
+algumas UFs é incorporada sem trocar o CSV original:
+
+    python -m enem.versionamento dados.csv
+    python -m enem.versionamento dados.csv --correcao correcao_sp.csv --relatorios relatorios
+    python -m enem.versionamento dados.csv --impressoes
+"""
+import argparse
+import os
+import sys
+from datetime import datetime, timezone
+
+import numpy as np
+import pyarrow as pa
+
+from .amostra import gravar_amostra
+from .compartilhado import abrir_colunas, gravar_colunas
+from .cubo import Cubo
+from .esquema import UFS
+from .estatisticas import Estatisticas
+from .ingestao import (
+    ARQUIVO_DADOS,
+    SEM_UF,
+    _gravar_manifesto,
+    _ler_manifesto,
+    _manifesto_valido,
+    _origem,
+    derivar_colunas,
+    detectar_ano,
+    diretorio_padrao,
+    impressoes_particoes,
+    ler_csv,
+    ordenar_por_uf,
+    versao_manifesto,
+)
+from .instrumentacao import Execucao
+from .qualidade import PerfilQualidade
+
+
+class AtualizacaoImpossivel(ValueError):
+    """Os dados convertidos não podem ser atualizados por partes: é preciso convertê-los de novo."""
+
+
+def intervalos(particoes, linhas):
+    """{uf: [início, fim)} das partições, com as linhas sem UF (ao final) em `SEM_UF`."""
+    intervalos = dict(particoes)
+    fim = max((f for _, f in intervalos.values()), default=0)
+    if fim < linhas:
+        intervalos[SEM_UF] = [fim, linhas]
+    return intervalos
+
+
+def comparar(antigas, novas, parcial=False):
+    """UFs alteradas (ou novas) e removidas entre dois conjuntos de impressões.
+
+    Em uma correção `parcial`, as UFs ausentes do arquivo novo não mudam.
+    """
+    alteradas = [uf for uf, impressao in novas.items() if antigas.get(uf) != impressao]
+    removidas = [] if parcial else [uf for uf in antigas if uf not in novas]
+    return alteradas, removidas
+
+
+def _ordem(chaves):
+    # Ordem das partições no arquivo: a das UFs, e as linhas sem UF ao final
+    return [uf for uf in UFS if uf in chaves] + ([SEM_UF] if SEM_UF in chaves else [])
+
+
+def _regravar(caminho_dados, atual, intervalos_atuais, novo, intervalos_novos, alteradas, ordem):
+    """Grava os dados com as partições `alteradas` de `novo` e as demais de `atual`.
+
+    Uma partição por vez é convertida para Arrow. Retorna as partições
+    {uf: [início, fim)} e o total de linhas.
+    """
+    esquema = pa.ipc.open_file(pa.memory_map(caminho_dados)).schema
+    temporario = caminho_dados + '.tmp'
+    particoes = {}
+    inicio = 0
+    opcoes = pa.ipc.IpcWriteOptions(compression='lz4')
+    with pa.ipc.new_file(temporario, esquema, options=opcoes) as escritor:
+        for uf in ordem:
+            df, (ini, fim) = (novo, intervalos_novos[uf]) if uf in alteradas else (atual, intervalos_atuais[uf])
+            if fim > ini:
+                escritor.write_table(pa.Table.from_pandas(df.iloc[ini:fim], schema=esquema, preserve_index=False))
+            if uf != SEM_UF:
+                particoes[uf] = [inicio, inicio + fim - ini]
+            inicio += fim - ini
+    # Processos com o arquivo anterior mapeado continuam lendo a versão antiga
+    os.replace(temporario, caminho_dados)
+    return particoes, inicio
+
+
+def atualizar(caminho_csv, correcao=None, destino=None, log=print):
+    """Incorpora aos dados convertidos de `caminho_csv` as partições que mudaram.
+
+    Sem `correcao`, compara o próprio `caminho_csv` (substituído por uma
+    versão corrigida) com os dados convertidos. Com `correcao`, as UFs
+    presentes nesse arquivo substituem as dos dados convertidos e as demais
+    ficam como estão. Retorna o relatório da atualização, também gravado no
+    manifesto.
+    """
+    destino = destino or diretorio_padrao(caminho_csv)
+    manifesto = _ler_manifesto(destino)
+    if not _manifesto_valido(manifesto, destino) or 'impressoes' not in manifesto:
+        raise AtualizacaoImpossivel(f'{destino} não tem dados convertidos no formato atual')
+    fonte = correcao or caminho_csv
+    ano = detectar_ano(fonte)
+    if ano != manifesto['ano']:
+        raise AtualizacaoImpossivel(f"{fonte} é da edição {ano}; os dados convertidos são de {manifesto['ano']}")
+
+    execucao = Execucao('atualização')
+    execucao.secao('atualização')
+    with execucao.etapa('leitura'):
+        bruto = ler_csv(fonte)
+    qualidade = None
+    if correcao is None:
+        # Perfilado antes do esquema, como na conversão
+        with execucao.etapa('qualidade'):
+            qualidade = PerfilQualidade.construir(bruto, ano)
+    with execucao.etapa('derivação'):
+        novo, particoes_novas = ordenar_por_uf(derivar_colunas(bruto, ano))
+        del bruto
+    if novo.columns.tolist() != manifesto['colunas']:
+        raise AtualizacaoImpossivel(f'{fonte} não tem as mesmas colunas dos dados convertidos')
+    with execucao.etapa('impressões'):
+        impressoes_novas = impressoes_particoes(novo, particoes_novas)
+
+    alteradas, removidas = comparar(manifesto['impressoes'], impressoes_novas, parcial=correcao is not None)
+    afetadas = alteradas + removidas
+    log(f"{len(alteradas)} partição(ões) alterada(s), {len(removidas)} removida(s), "
+        f"{len(manifesto['impressoes']) - len(alteradas) - len(removidas)} mantida(s)")
+    versao_anterior = versao_manifesto(manifesto)
+    impressoes = {uf: h for uf, h in manifesto['impressoes'].items() if uf not in removidas}
+    impressoes.update({uf: impressoes_novas[uf] for uf in alteradas})
+    intervalos_novos = intervalos(particoes_novas, len(novo))
+    linhas_alteradas = novo.iloc[
+        np.concatenate([np.arange(*intervalos_novos[uf]) for uf in alteradas] or [np.array([], dtype=np.int64)])
+    ]
+
+    if afetadas:
+        caminho_dados = os.path.join(destino, ARQUIVO_DADOS)
+        with execucao.etapa('dados'):
+            particoes, linhas = _regravar(
+                caminho_dados, abrir_colunas(destino), intervalos(manifesto['particoes'], manifesto['linhas']),
+                novo, intervalos_novos, alteradas, _ordem(impressoes),
+            )
+        with execucao.etapa('colunas'):
+            gravar_colunas(caminho_dados, destino)
+        # As linhas sem UF entram no cubo e nos acumuladores com UF ausente
+        sem = [None if uf == SEM_UF else uf for uf in afetadas]
+        with execucao.etapa('cubo'):
+            cubo = Cubo.carregar(destino)
+            restante = cubo.sem_ufs(sem)
+            partes = [restante] + ([Cubo.construir(linhas_alteradas)] if len(linhas_alteradas) else [])
+            Cubo.combinar(partes).salvar(destino)
+        with execucao.etapa('estatísticas'):
+            partes = [Estatisticas.carregar(destino).sem_ufs(sem)]
+            if len(linhas_alteradas):
+                partes.append(Estatisticas.construir(linhas_alteradas))
+            Estatisticas.combinar(partes).salvar(destino)
+        with execucao.etapa('amostra'):
+            gravar_amostra(caminho_dados, destino)
+        manifesto.update({'linhas': linhas, 'particoes': particoes})
+        log(f"  cubo: {len(cubo.celulas) - len(restante.celulas):,} de {len(cubo.celulas):,} células refeitas")
+    if qualidade is not None:
+        qualidade.salvar(destino, ano)
+
+    manifesto['impressoes'] = impressoes
+    if correcao is None:
+        manifesto['origem'] = _origem(caminho_csv)
+    elif afetadas:
+        manifesto.setdefault('correcoes', []).append({**_origem(correcao), 'ufs': afetadas})
+    execucao.encerrar()
+    relatorio = {
+        'data': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'fonte': os.path.abspath(fonte),
+        'versao_anterior': versao_anterior,
+        'versao': versao_manifesto(manifesto),
+        'ufs': afetadas,
+        'alteradas': alteradas,
+        'removidas': removidas,
+        'mantidas': len(impressoes) - len(alteradas),
+        'linhas_reprocessadas': len(linhas_alteradas),
+        'qualidade': 'refeita' if qualidade is not None else 'mantida',
+        'segundos': execucao.total,
+        'etapas': {e['etapa']: e['segundos'] for e in execucao.etapas},
+    }
+    manifesto['atualizacao'] = relatorio
+    _gravar_manifesto(destino, manifesto)
+    for etapa, segundos in relatorio['etapas'].items():
+        log(f"  {etapa:<14} {segundos:>8.2f}s")
+    if afetadas:
+        log(f"{', '.join(afetadas)} reprocessada(s) em {relatorio['segundos']:.1f}s "
+            f"({relatorio['linhas_reprocessadas']:,} linhas) -> versão {relatorio['versao']}")
+    else:
+        log(f"nada a reprocessar ({relatorio['segundos']:.1f}s)")
+    return relatorio
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Reprocessa só as UFs que mudaram nos dados convertidos.')
+    parser.add_argument('csv', help='CSV de origem dos dados convertidos (ou a sua versão corrigida)')
+    parser.add_argument('--correcao', help='CSV só com as UFs corrigidas (as demais ficam como estão)')
+    parser.add_argument('--destino', help='diretório dos dados convertidos (padrão: .enem_cache/<nome>)')
+    parser.add_argument('--relatorios', help='regera os relatórios (enem.relatorio) do Brasil e das UFs alteradas neste diretório')
+    parser.add_argument('--impressoes', action='store_true', help='só mostra as impressões das partições atuais')
+    args = parser.parse_args(argv)
+
+    if args.impressoes:
+        manifesto = _ler_manifesto(args.destino or diretorio_padrao(args.csv)) or {}
+        for uf, impressao in manifesto.get('impressoes', {}).items():
+            print(f'{uf:<9} {impressao}')
+        return 0
+    try:
+        relatorio = atualizar(args.csv, args.correcao, args.destino)
+    except AtualizacaoImpossivel as erro:
+        print(f'{erro}; converta de novo com python -m enem.ingestao ou python -m enem.etl', file=sys.stderr)
+        return 1
+    ufs = [uf for uf in relatorio['alteradas'] if uf != SEM_UF]
+    if args.relatorios and relatorio['ufs']:
+        from . import relatorio as relatorios
+
+        relatorios.executar(args.csv, args.relatorios, args.destino, ['Todos'] + ufs)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
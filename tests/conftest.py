@@ -0,0 +1,50 @@
+"""Dados sintéticos (`enem.sintetico`) compartilhados pelos testes.
+
+Os CSVs e as conversões são feitos uma vez por sessão em um diretório
+temporário; os testes que alteram os dados convertidos trabalham em cópias.
+"""
+import pandas as pd
+import pytest
+
+from enem import sintetico
+from enem.ingestao import converter_csv, derivar_colunas
+
+LINHAS = 20_000
+
+
+def gravar(df, caminho):
+    """Grava `df` no formato do CSV do INEP, como `sintetico.gravar_csv`."""
+    df.to_csv(caminho, sep=';', index=False, encoding='ISO-8859-1', float_format='%.1f')
+    return str(caminho)
+
+
+@pytest.fixture(scope='session')
+def bruto():
+    """Microdados sintéticos no formato do INEP (antes do esquema)."""
+    return pd.concat(list(sintetico.gerar(LINHAS, semente=0)), ignore_index=True)
+
+
+@pytest.fixture(scope='session')
+def df(bruto):
+    """Os mesmos dados com o esquema compacto e as colunas derivadas."""
+    return derivar_colunas(bruto)
+
+
+@pytest.fixture(scope='session')
+def csv_sintetico(bruto, tmp_path_factory):
+    return gravar(bruto, tmp_path_factory.mktemp('csv') / 'sintetico.csv')
+
+
+@pytest.fixture(scope='session')
+def convertido(csv_sintetico, tmp_path_factory):
+    """Diretório com a conversão completa de `csv_sintetico`."""
+    destino = str(tmp_path_factory.mktemp('convertido'))
+    converter_csv(csv_sintetico, destino)
+    return destino
+
+
+@pytest.fixture(scope='session')
+def correcao_sp():
+    """Linhas de SP refeitas com outra semente (a correção publicada)."""
+    novo = pd.concat(list(sintetico.gerar(LINHAS, semente=1)), ignore_index=True)
+    return novo[novo['SG_UF_PROVA'] == 'SP'].reset_index(drop=True)
@@ -0,0 +1,97 @@
+"""API HTTP (`enem.api`) servida de verdade, numa porta livre."""
+import http.client
+import json
+import shutil
+import threading
+from contextlib import contextmanager
+
+import pytest
+
+from conftest import gravar
+from enem import api
+from enem.ingestao import derivar_colunas
+from enem.versionamento import atualizar
+
+
+@contextmanager
+def servir(caminho_csv, destino):
+    """Porta de um servidor da API rodando em outra thread."""
+    servidor = api.criar_servidor(caminho_csv, destino, porta=0)
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield servidor.server_address[1]
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+
+@pytest.fixture(scope='module')
+def porta(csv_sintetico, convertido):
+    with servir(csv_sintetico, convertido) as porta:
+        yield porta
+
+
+def requisitar(porta, url, **cabecalhos):
+    conexao = http.client.HTTPConnection('127.0.0.1', porta, timeout=60)
+    try:
+        conexao.request('GET', url, headers=cabecalhos)
+        resposta = conexao.getresponse()
+        corpo = resposta.read()
+        return resposta.status, resposta.getheader('ETag'), json.loads(corpo) if corpo else None
+    finally:
+        conexao.close()
+
+
+def test_ufs_e_resumo(porta, df):
+    status, _, documento = requisitar(porta, '/ufs')
+    assert status == 200
+    assert set(documento['filtros']) == set(api.PARAMETROS)
+    uf = documento['filtros']['uf'][0]
+
+    status, etag, documento = requisitar(porta, f'/resumo?uf={uf}')
+    assert status == 200 and etag
+    assert documento['filtros'] == {'SG_UF_PROVA': uf}
+    assert documento['dados']['candidatos'] == int((df['SG_UF_PROVA'] == uf).sum())
+
+
+def test_revalidacao_por_etag(porta):
+    _, etag, _ = requisitar(porta, '/digital?uf=SP')
+    assert requisitar(porta, '/digital?uf=SP', **{'If-None-Match': etag})[:2] == (304, etag)
+    # Outros filtros, outra versão da resposta
+    assert requisitar(porta, '/digital?uf=RJ', **{'If-None-Match': etag})[0] == 200
+
+
+@pytest.mark.parametrize('url, status', [
+    ('/resumo?uf=XX', 400),
+    ('/resumo?ano=2023', 400),
+    ('/inexistente', 404),
+])
+def test_requisicoes_invalidas(porta, url, status):
+    recebido, etag, documento = requisitar(porta, url)
+    assert (recebido, etag) == (status, None)
+    assert 'erro' in documento
+
+
+def test_falha_ao_montar_responde_500_e_segue_servindo(porta, monkeypatch):
+    def falha(cubo, filtros):
+        raise RuntimeError('falha simulada')
+
+    monkeypatch.setitem(api.RECURSOS, '/resumo', falha)
+    status, _, documento = requisitar(porta, '/resumo')
+    assert status == 500
+    assert documento['tipo'] == 'RuntimeError'
+    assert requisitar(porta, '/faltantes')[0] == 200
+
+
+def test_recarrega_os_dados_depois_de_uma_atualizacao(csv_sintetico, convertido, correcao_sp, tmp_path):
+    destino = str(tmp_path / 'dados')
+    shutil.copytree(convertido, destino)
+    with servir(csv_sintetico, destino) as porta:
+        _, etag, antes = requisitar(porta, '/resumo?uf=SP')
+        atualizar(csv_sintetico, correcao=gravar(correcao_sp, tmp_path / 'correcao_sp.csv'),
+                  destino=destino, log=lambda *_: None)
+        status, novo_etag, depois = requisitar(porta, '/resumo?uf=SP', **{'If-None-Match': etag})
+    assert status == 200 and novo_etag != etag
+    assert depois['versao'] != antes['versao']
+    assert depois['dados']['candidatos'] == len(derivar_colunas(correcao_sp))
@@ -0,0 +1,14 @@
+"""Paridade entre as consultas em memória (pandas) e fora dela (Arrow)."""
+from enem.consultas import conferir
+from enem.ingestao import carregar_consultas, ufs_disponiveis
+
+
+def test_backends_pandas_e_arrow_coincidem(csv_sintetico, convertido):
+    pandas_, arrow = (carregar_consultas(csv_sintetico, convertido, b) for b in ['pandas', 'arrow'])
+    ufs = ufs_disponiveis(csv_sintetico, convertido)
+    filtros_lista = [{}] + [{'SG_UF_PROVA': uf} for uf in ufs[:5]] + [
+        {'SG_UF_PROVA': ufs[0], 'SEXO': 'Feminino'},
+        {'RENDA': 'Nenhuma Renda'},
+        {'SEXO': 'Masculino', 'ACESSO_INTERNET': 'Não'},
+    ]
+    assert conferir(pandas_, arrow, filtros_lista, log=lambda *_: None) == []
@@ -0,0 +1,41 @@
+"""Normalizações da `Contingencia` contra o `pd.crosstab`."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from enem.consultas import ConsultasPandas
+from enem.contingencia import Contingencia
+
+CRUZAMENTO = ['RENDA', 'ACESSO_INTERNET']
+CROSSTAB = {'linha': 'index', 'coluna': 'columns', 'total': 'all'}
+
+
+def crosstab(df, linhas, colunas, modo=None):
+    tabela = pd.crosstab(df[linhas], df[colunas], dropna=False, normalize=CROSSTAB.get(modo, False))
+    return tabela * 100 if modo else tabela
+
+
+@pytest.mark.parametrize('modo', [None, 'linha', 'coluna', 'total'])
+def test_duas_dimensoes(df, modo):
+    tabela = ConsultasPandas(df).contingencia(CRUZAMENTO).tabela(modo)
+    esperada = crosstab(df, *CRUZAMENTO, modo)
+    np.testing.assert_allclose(tabela.to_numpy(dtype=float), esperada.to_numpy(dtype=float))
+
+
+@pytest.mark.parametrize('modo', ['linha', 'coluna', 'total'])
+def test_tres_dimensoes_normalizam_cada_camada(df, modo):
+    contingencia = ConsultasPandas(df).contingencia([*CRUZAMENTO, 'SG_UF_PROVA'])
+    for uf in ['SP', 'RJ']:
+        camada = df[df['SG_UF_PROVA'] == uf]
+        esperada = crosstab(camada, *CRUZAMENTO, modo)
+        np.testing.assert_allclose(contingencia.tabela(modo, uf).to_numpy(dtype=float), esperada.to_numpy(dtype=float))
+
+
+def test_linhas_e_colunas_vazias_viram_nan():
+    dtype = pd.CategoricalDtype(['a', 'b', 'c'])
+    contingencia = Contingencia(['x', 'y'], [dtype, dtype], np.array([[2, 0, 2], [0, 0, 0], [1, 0, 3]]))
+    np.testing.assert_array_equal(contingencia.normalizar('linha')[1], [np.nan] * 3)
+    np.testing.assert_array_equal(contingencia.normalizar('coluna')[:, 1], [np.nan] * 3)
+    np.testing.assert_allclose(contingencia.normalizar('linha')[0], [50, 0, 50])
+    assert np.nansum(contingencia.normalizar('total')) == pytest.approx(100)
+    assert contingencia.normalizar() is contingencia.contagens
@@ -0,0 +1,60 @@
+"""Quantis dos histogramas contra os do `pd.Series.quantile`."""
+import numpy as np
+import pytest
+
+from enem.cubo import Cubo
+from enem.esquema import NOTAS
+from enem.quantis import PASSO_MEDIA, Histograma, bins, bins_media, passo_de, por_grupo
+
+QUANTIS = [0, 0.1, 0.25, 0.5, 0.75, 0.9, 1]
+# As notas são float32: os valores da grade diferem dos gravados em ~1e-5
+TOLERANCIA = 1e-4
+
+
+@pytest.mark.parametrize('coluna', NOTAS + ['NOTA_MEDIA'])
+def test_quantis_iguais_aos_do_pandas(df, coluna):
+    histograma = Histograma.de_valores(df[coluna], passo_de(coluna))
+    esperado = df[coluna].quantile(QUANTIS).to_numpy()
+    np.testing.assert_allclose(histograma.quantil(QUANTIS), esperado, rtol=0, atol=TOLERANCIA)
+    assert histograma.n == df[coluna].count()
+
+
+def test_bins_da_media_pela_soma_dos_decimos(df):
+    valida = df['NOTA_MEDIA'].notna().to_numpy()
+    notas = df[NOTAS].to_numpy(dtype=np.float64)[valida]
+    np.testing.assert_array_equal(bins_media(notas), bins(df['NOTA_MEDIA'], PASSO_MEDIA))
+
+
+@pytest.mark.parametrize('grupo', ['RENDA', 'ACESSO_INTERNET'])
+def test_por_grupo_igual_ao_groupby(df, grupo):
+    histogramas = por_grupo(df[grupo], df['NOTA_MEDIA'], PASSO_MEDIA)
+    esperado = df.groupby(grupo, observed=True)['NOTA_MEDIA'].quantile([0.25, 0.5, 0.75]).unstack()
+    assert list(histogramas) == list(esperado.index)
+    for categoria, histograma in histogramas.items():
+        np.testing.assert_allclose(histograma.quartis(), esperado.loc[categoria], rtol=0, atol=TOLERANCIA)
+
+
+@pytest.mark.parametrize('filtros', [{}, {'SG_UF_PROVA': 'SP'}, {'SG_UF_PROVA': 'BA', 'SEXO': 'Feminino'}])
+def test_mediana_do_cubo_igual_a_do_pandas(df, filtros):
+    selecao = np.ones(len(df), dtype=bool)
+    for dim, valor in filtros.items():
+        selecao &= (df[dim] == valor).to_numpy()
+    notas = df['NOTA_MEDIA'][selecao]
+    resumo = Cubo.construir(df).agregar(filtros)
+    assert resumo['n'] == selecao.sum()
+    assert resumo['mediana'] == pytest.approx(notas.median(), abs=TOLERANCIA)
+    assert resumo['media'] == pytest.approx(notas.mean(), abs=TOLERANCIA)
+
+
+def test_resumo_do_cubo_igual_ao_histograma_completo(df):
+    """Quartis, bigodes e outliers lidos por faixa coincidem com os do histograma inteiro."""
+    resumos = Cubo.construir(df).histogramas_por('RENDA', {'SG_UF_PROVA': 'SP'})
+    sp = df[df['SG_UF_PROVA'] == 'SP']
+    completos = por_grupo(sp['RENDA'], sp['NOTA_MEDIA'], PASSO_MEDIA)
+    assert list(resumos) == list(completos)
+    for categoria, resumo in resumos.items():
+        completo = completos[categoria]
+        assert resumo.n == completo.n
+        assert resumo.quartis() == completo.quartis()
+        assert resumo.bigodes() == completo.bigodes()
+        assert resumo.percentual_outliers() == completo.percentual_outliers()
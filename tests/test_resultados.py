@@ -0,0 +1,80 @@
+"""Cache de resultados (`enem.resultados`): orçamento, LRU, cálculo em segundo plano e migração entre versões."""
+import numpy as np
+import pytest
+
+from enem.resultados import CacheResultados, chave_resultado
+
+ITEM = 8_000
+
+
+def valor(i=0):
+    return np.full(ITEM // 8, i, dtype=np.int64)
+
+
+def cache_para(itens):
+    return CacheResultados(orcamento_mb=itens * ITEM / (1024 * 1024))
+
+
+def test_descarta_os_menos_usados_recentemente():
+    cache = cache_para(3)
+    for chave in 'abc':
+        cache.guardar(chave, valor())
+    assert cache.obter('a', lambda: pytest.fail('deveria estar no cache')) is not None
+    cache.guardar('d', valor())
+    assert [c in cache for c in 'abcd'] == [True, False, True, True]
+    assert (cache.despejos, cache.bytes) == (1, 3 * ITEM)
+    assert cache.estatisticas()['acertos'] == 1
+
+
+def test_valor_maior_que_o_orcamento_nao_e_guardado():
+    cache = cache_para(3)
+    cache.guardar('a', valor())
+    cache.guardar('grande', np.zeros(4 * ITEM // 8, dtype=np.int64))
+    assert 'grande' not in cache and 'a' in cache
+    assert len(cache_para(0).obter('a', valor)) == ITEM // 8
+    assert len(cache_para(0)) == 0
+
+
+def test_chave_normaliza_os_filtros():
+    assert chave_resultado(1, valor, {'SG_UF_PROVA': 'SP', 'SEXO': 'Todos', 'RENDA': None}) == \
+        chave_resultado(1, valor, {'SG_UF_PROVA': 'SP'})
+    assert chave_resultado(1, valor, {}) != chave_resultado(2, valor, {})
+
+
+def test_segundo_plano_refaz_depois_de_uma_falha():
+    cache = cache_para(3)
+    tentativas = []
+
+    def calcular():
+        tentativas.append(1)
+        if len(tentativas) == 1:
+            raise RuntimeError('falha simulada')
+        return valor()
+
+    with pytest.raises(RuntimeError):
+        cache.em_segundo_plano('a', calcular).result(timeout=10)
+    assert not cache.pendente('a')
+    futuro = cache.em_segundo_plano('a', calcular)
+    assert len(futuro.result(timeout=10)) == ITEM // 8
+    assert len(tentativas) == 2 and 'a' in cache
+
+
+def test_migrar_mantem_so_o_que_nao_depende_das_ufs_alteradas():
+    cache = cache_para(10)
+    filtros = {
+        'sp': {'SG_UF_PROVA': 'SP'},
+        'rj': {'SG_UF_PROVA': 'RJ', 'SEXO': 'Feminino'},
+        'todas': {'RENDA': 'Nenhuma Renda'},
+        'amostra': {'SG_UF_PROVA': 'RJ', 'AMOSTRA': True},
+        'edicoes': {'SG_UF_PROVA': 'RJ', 'EDICOES': ('v0', 'v1')},
+    }
+    for f in filtros.values():
+        cache.guardar(chave_resultado('v1', valor, f), valor())
+    cache.guardar(chave_resultado('outra', valor, filtros['sp']), valor())
+
+    assert cache.migrar('v1', 'v2', {'SP'}) == (1, 4)
+    assert chave_resultado('v2', valor, filtros['rj']) in cache
+    assert chave_resultado('outra', valor, filtros['sp']) in cache
+    assert not any(chave_resultado(v, valor, f) in cache for v in ['v1', 'v2'] for f in filtros.values()
+                   if f is not filtros['rj'])
+    assert (len(cache), cache.bytes) == (2, 2 * ITEM)
@@ -0,0 +1,72 @@
+"""Atualização incremental (por UF) contra a conversão completa dos mesmos dados."""
+import shutil
+
+import pandas as pd
+import pyarrow as pa
+
+from conftest import gravar
+from enem.cubo import Cubo
+from enem.estatisticas import Estatisticas
+from enem.ingestao import ARQUIVO_DADOS, _ler_manifesto, converter_csv, derivar_colunas
+from enem.versionamento import atualizar
+
+FILTROS = [{}, {'SG_UF_PROVA': 'SP'}, {'SG_UF_PROVA': 'RJ'}]
+
+
+def _ordenadas(tabela, colunas):
+    return tabela.sort_values(colunas).reset_index(drop=True)
+
+
+def assert_cubos_iguais(a, b):
+    dimensoes = [c for c in a.celulas.columns if isinstance(a.celulas[c].dtype, pd.CategoricalDtype)]
+    pd.testing.assert_frame_equal(_ordenadas(a.celulas, dimensoes), _ordenadas(b.celulas, dimensoes))
+    pd.testing.assert_frame_equal(a.histograma, b.histograma)
+    for filtros in FILTROS:
+        ra, rb = a.agregar(filtros), b.agregar(filtros)
+        assert (ra['n'], ra['mediana'], ra['histograma'].quartis()) == (rb['n'], rb['mediana'], rb['histograma'].quartis())
+
+
+def assert_estatisticas_iguais(a, b):
+    for filtros in FILTROS:
+        pd.testing.assert_frame_equal(a.agregar(filtros).descrever(), b.agregar(filtros).descrever())
+        pd.testing.assert_frame_equal(a.agregar(filtros).covariancia(), b.agregar(filtros).covariancia())
+        por_a, por_b = a.por('RENDA', filtros), b.por('RENDA', filtros)
+        assert sorted(por_a) == sorted(por_b)
+        for categoria in por_a:
+            pd.testing.assert_frame_equal(por_a[categoria].descrever(), por_b[categoria].descrever())
+
+
+def test_sem_ufs_e_combinar_refazem_o_cubo_e_as_estatisticas(df):
+    metade = len(df) // 2
+    blocos = [df.iloc[:metade], df.iloc[metade:]]
+    assert_cubos_iguais(Cubo.combinar([Cubo.construir(b) for b in blocos]), Cubo.construir(df))
+
+    sp = df[df['SG_UF_PROVA'] == 'SP']
+    refeito = Cubo.combinar([Cubo.construir(df).sem_ufs(['SP']), Cubo.construir(sp)])
+    assert_cubos_iguais(refeito, Cubo.construir(df))
+
+    estatisticas = Estatisticas.combinar([Estatisticas.construir(df).sem_ufs(['SP']), Estatisticas.construir(sp)])
+    assert_estatisticas_iguais(estatisticas, Estatisticas.construir(df))
+
+
+def test_atualizacao_incremental_igual_a_conversao_completa(bruto, correcao_sp, csv_sintetico, convertido, tmp_path):
+    destino = str(tmp_path / 'incremental')
+    shutil.copytree(convertido, destino)
+    caminho_correcao = gravar(correcao_sp, tmp_path / 'correcao_sp.csv')
+    relatorio = atualizar(csv_sintetico, correcao=caminho_correcao, destino=destino, log=lambda *_: None)
+    assert relatorio['alteradas'] == ['SP']
+
+    completo = pd.concat([bruto[bruto['SG_UF_PROVA'] != 'SP'], correcao_sp], ignore_index=True)
+    referencia = str(tmp_path / 'completo')
+    converter_csv(gravar(completo, tmp_path / 'completo.csv'), referencia)
+
+    dados = [pa.ipc.open_file(pa.memory_map(f'{d}/{ARQUIVO_DADOS}')).read_pandas() for d in (destino, referencia)]
+    pd.testing.assert_frame_equal(*dados)
+    incremental, total = _ler_manifesto(destino), _ler_manifesto(referencia)
+    assert incremental['particoes'] == total['particoes']
+    assert incremental['impressoes'] == total['impressoes']
+    assert_cubos_iguais(Cubo.carregar(destino), Cubo.carregar(referencia))
+    assert_estatisticas_iguais(Estatisticas.carregar(destino), Estatisticas.carregar(referencia))
+    # As linhas de SP do cubo são as da correção
+    sp = derivar_colunas(correcao_sp)
+    assert Cubo.carregar(destino).agregar({'SG_UF_PROVA': 'SP'})['n'] == len(sp)